@@ -2,9 +2,13 @@ import hashlib
 import os
 from pathlib import Path
 
-from agents import ApplyPatchTool
+from agents import AgentHooks, ApplyPatchTool
 from agents.editor import ApplyPatchOperation, ApplyPatchResult
 
+from commandcache import command_cache
+from patchengine import apply_hunks
+from patchtransaction import PatchJournal, PatchTransaction
+
 class ApprovalTracker:
     """Track which apply patch operations have been approved by the user."""
     def __init__(self):
@@ -16,7 +20,7 @@ class ApprovalTracker:
         hasher.update(b"\0")
         hasher.update(relative_path.encode("UTF-8"))
         hasher.update(b"\0")
-        hasher.update(operation.diff.encode("UTF-8"))
+        hasher.update((operation.diff or "").encode("UTF-8"))
         return hasher.hexdigest()
 
     def remember(self, fingerprint: str) -> None:
@@ -29,44 +33,135 @@ class ApprovalTracker:
 class WorkSpaceEditor:
     """Minimal editor for the apply patch tool.
      - keeps all edits under 'root'
-     - optional manual approval required (APPLY_PATCH_AUTO_APPROVE=1 to skip prompts)"""
-
-    def __init__(self, root: Path, approvals: ApprovalTracker, auto_approve: bool = False) -> None:
+     - optional manual approval required (APPLY_PATCH_AUTO_APPROVE=1 to skip prompts)
+     - transactional mode (transactional = True or APPLY_PATCH_TRANSACTIONS=1): the
+       operations of one apply_patch call are committed together or not at all, and can
+       be undone later (see patchtransaction.py). Pass `editor.hooks` as the agent's
+       hooks so each call gets its own transaction; without them every operation is
+       committed on its own."""
+
+    def __init__(self, root: Path, approvals: ApprovalTracker, auto_approve: bool = False,
+                 transactional: bool | None = None) -> None:
         self._root = root.resolve()
         self._approvals = approvals
         self._auto_approve = auto_approve or os.environ.get("APPLY_PATCH_AUTO_APPROVE") == "1"
-    
+        if transactional is None:
+            transactional = os.environ.get("APPLY_PATCH_TRANSACTIONS") == "1"
+        self.journal = PatchJournal(self._root) if transactional else None
+        self._transaction: PatchTransaction | None = None
+        self._depth = 0
+
+    @property
+    def hooks(self) -> "EditorTransactionHooks":
+        return EditorTransactionHooks(self)
+
+    def begin(self) -> None:
+        """Start staging operations; calls nest, and the outermost end() commits."""
+        if self.journal is None:
+            return
+        if self._depth == 0:
+            self._transaction = PatchTransaction(self._root, self.journal)
+        self._depth += 1
+
+    def end(self) -> str | None:
+        """Commit the staged operations, or drop them all if one failed."""
+        if self.journal is None or self._depth == 0:
+            return None
+        self._depth -= 1
+        if self._depth:
+            return None
+        transaction, self._transaction = self._transaction, None
+        if transaction.failed:
+            # A failure before anything was staged has nothing to roll back; the failed
+            # operation's own result already reports it.
+            if transaction.operations:
+                print(f"[apply_patch] rolled back {len(transaction.operations)} staged operation(s)")
+            return None
+        entry = transaction.commit()
+        command_cache.invalidate()
+        return entry.name if entry else None
+
+    def undo(self, count: int = 1, force: bool = False) -> list[str]:
+        """Revert the last `count` committed transactions."""
+        if self.journal is None:
+            raise RuntimeError("Undo needs the editor's transactional mode")
+        command_cache.invalidate()
+        return self.journal.undo(count, force = force)
+
     def create_file(self, operation: ApplyPatchOperation) -> ApplyPatchResult:
+        return self._apply(self._create_file, operation)
+
+    def update_file(self, operation: ApplyPatchOperation) -> ApplyPatchResult:
+        return self._apply(self._update_file, operation)
+
+    def delete_file(self, operation: ApplyPatchOperation) -> ApplyPatchResult:
+        return self._apply(self._delete_file, operation)
+
+    def _create_file(self, operation: ApplyPatchOperation) -> ApplyPatchResult:
         relative = self._relative_path(operation.path)
         self._require_approval(operation, relative)
-        target = self._resolve(operation.path)
-        original = target.read_text(encoding="UTF-8")
+        target = self._resolve(operation.path, ensure_parent = self.journal is None)
         diff = operation.diff or ""
-        patched =  apply_unified_diff(original, diff)
-        target.write_text(patched, encoding="utf-8")
+        patched =  apply_unified_diff("", diff, create = True)
+        self._write(target, patched, f"create {relative}")
         return ApplyPatchResult(output = f"Created {relative}")
     
-    def update_file(self, operation: ApplyPatchOperation) -> ApplyPatchResult:
+    def _update_file(self, operation: ApplyPatchOperation) -> ApplyPatchResult:
 
         relative = self._relative_path(operation.path)
         self._require_approval(operation, relative)
         target = self._resolve(operation.path)
-        original = target.read_text(encoding="UTF-8")
+        original = self._read(target)
         diff = operation.diff or ""
         patched =  apply_unified_diff(original, diff)
-        target.write_text(patched, encoding="utf-8")
+        self._write(target, patched, f"update {relative}")
         return ApplyPatchResult(output = f"Updated {relative}")
     
-    def delete_file(self, operation: ApplyPatchOperation) -> ApplyPatchResult:
+    def _delete_file(self, operation: ApplyPatchOperation) -> ApplyPatchResult:
         relative = self._relative_path(operation.path)
         self._require_approval(operation, relative)
         target = self._resolve(operation.path)
-        target.unlink()
+        if self._transaction is None:
+            target.unlink()
+        else:
+            self._transaction.delete(target, f"delete {relative}")
         return ApplyPatchResult(output = f"Deleted {relative}")
-    
+
+    def _apply(self, fn, operation: ApplyPatchOperation) -> ApplyPatchResult:
+        """Run one operation. In transactional mode it is staged into the open
+        transaction (a failure marks it for rollback), or committed on its own."""
+        # Cached shell output (cat, grep, ...) may show the file as it was.
+        command_cache.invalidate()
+        if self.journal is None:
+            return fn(operation)
+        autocommit = self._transaction is None
+        if autocommit:
+            self.begin()
+        try:
+            return fn(operation)
+        except Exception as e:
+            self._transaction.failed = True
+            if autocommit:
+                raise
+            raise RuntimeError(f"{e}\nNo files were changed: every operation of this patch was rolled back.") from e
+        finally:
+            if autocommit:
+                self.end()
+
+    def _read(self, target: Path) -> str:
+        if self._transaction is not None:
+            return self._transaction.read_text(target)
+        return target.read_text(encoding="UTF-8")
+
+    def _write(self, target: Path, text: str, description: str) -> None:
+        if self._transaction is not None:
+            self._transaction.write_text(target, text, description)
+        else:
+            target.write_text(text, encoding="utf-8")
+
     def _relative_path(self, value: str) -> str:
         resolved = self._resolve(value)
-        return resolved.relative_tool(self._root).as_posix()
+        return resolved.relative_to(self._root).as_posix()
     
     def _resolve(self, relative: str, ensure_parent: bool = False) -> Path:
         candidate =  Path(relative)
@@ -101,41 +196,42 @@ class WorkSpaceEditor:
         return
 
 
+class EditorTransactionHooks(AgentHooks):
+    """Agent hooks that wrap each apply_patch call in one editor transaction."""
+
+    def __init__(self, editor: WorkSpaceEditor):
+        self.editor = editor
+
+    async def on_tool_start(self, context, agent, tool) -> None:
+        if isinstance(tool, ApplyPatchTool):
+            self.editor.begin()
+
+    async def on_tool_end(self, context, agent, tool, result) -> None:
+        if isinstance(tool, ApplyPatchTool):
+            try:
+                self.editor.end()
+            except Exception as e:
+                print(f"[apply_patch] commit failed, workspace left as before this patch: {e}")
+
+
 def apply_unified_diff(original: str, diff: str, create: bool = False) -> str:
     """
-    Simple "diff" applier (adapt this based on your environment)
+    Apply a diff from the apply_patch tool (see patchengine.py).
 
     - For create_file, the diff is can be the full desired file contents,
     optionally with leading + lines to indicate the file should be created.
-    - For update_file, the diff is a unified diff string that should be applied
-    to the original contents.
+    - For update_file, the diff is a unified diff string (or V4A hunks) that should
+    be applied to the original contents; hunks that do not fit raise PatchRejected
+    and leave the file unchanged.
     - For delete_file, the diff is ignored.
     """
     if not diff:
         return original
-    
-    lines = diff.splitlines()
-    body: list[str] = []
-
-    for line in lines:
-        if not line:
-            body.append("")
-            continue
-
-        if line.startswith("@@") or line.startswith("---") or line.startswith("+++"):
-            continue
-        prefix = line[0]
-        content = line[1:]
-
-        if prefix in {"+", " "}:
-            body.append(content)
-        elif prefix in ("-", "\\"):
-            continue
-        else:
-            body.append(line)
-    
-    text = "\n".join(body)
-    if diff.endswith("\n"):
-        text += "\n"
 
-    return text
+    if create and not any(line.startswith("@@") for line in diff.splitlines()):
+        lines = [line for line in diff.splitlines() if not line.startswith(("*** ", "--- ", "+++ "))]
+        if all(line.startswith("+") for line in lines if line):
+            lines = [line[1:] for line in lines]
+        return "\n".join(lines) + "\n"
+
+    return apply_hunks(original, diff).text
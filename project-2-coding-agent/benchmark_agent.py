@@ -0,0 +1,279 @@
+# Offline replay of coding agent tool calls, for measuring tool-execution overhead and
+# catching regressions without the model. Each turn is one tool call the model made,
+# run through the real ShellExecutor and WorkSpaceEditor in a scratch workspace:
+#   {"shell": ["ls -la", "cat app.py"], "timeout_ms": 60000, "max_output_length": null}
+#   {"apply_patch": {"type": "update_file", "path": "app.py", "diff": "@@ ..."}}
+#   {"files": {"app.py": "..."}}     setup, written directly and not timed
+# Turns come from a JSONL script: one recorded by main.py (AGENT_RECORD=turns.jsonl) or
+# written by hand. Without --script, a built-in session runs: create a small Python
+# project, inspect it, test it, fix it, and run some noisy and failing calls.
+# The JSON report has per-tool latency, the bytes of output returned to the model, and
+# wall time (median of --repeat runs). With --compare it is checked against an earlier
+# report, and the exit status is 1 if anything got slower than --max-regression.
+#
+#   python benchmark_agent.py --repeat 5 --report before.json
+#   SHELL_SESSION=1 SHELL_CACHE=1 python benchmark_agent.py --repeat 5 --report after.json --compare before.json
+#   python benchmark_agent.py --script turns.jsonl --workspace ./coding-agent-workspace
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+from agents import ShellActionRequest
+from agents.editor import ApplyPatchOperation
+
+from applypatchtool import ApprovalTracker, WorkSpaceEditor
+from commandcache import command_cache
+from shellexecutor import ShellExecutor
+from shellsession import reset_sessions
+
+# Settings that change how tools run; recorded in the report so runs stay comparable.
+CONFIG_VARS = ["SHELL_SESSION", "SHELL_PARALLEL", "SHELL_CACHE", "SHELL_CACHE_TTL", "SHELL_OUTPUT_HEAD_BYTES",
+               "SHELL_OUTPUT_TAIL_BYTES", "APPLY_PATCH_TRANSACTIONS", "PACKAGE_CACHE"]
+
+STORE = '''import json
+from pathlib import Path
+
+
+class Store:
+    def __init__(self, path):
+        self.path = Path(path)
+        self.items = json.loads(self.path.read_text()) if self.path.exists() else {}
+
+    def add(self, key, value):
+        self.items[key] = value
+        self.save()
+
+    def total(self):
+        return sum(self.items.values()) - 1
+
+    def save(self):
+        self.path.write_text(json.dumps(self.items))
+'''
+
+TEST = '''import tempfile
+import unittest
+from pathlib import Path
+
+from app.store import Store
+
+
+class StoreTest(unittest.TestCase):
+    def test_total(self):
+        store = Store(Path(tempfile.mkdtemp()) / "items.json")
+        store.add("a", 2)
+        store.add("b", 3)
+        self.assertEqual(store.total(), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
+'''
+
+
+def _create(path: str, text: str) -> dict:
+    return {"apply_patch": {"type": "create_file", "path": path,
+                            "diff": "".join(f"+{line}\n" for line in text.splitlines())}}
+
+
+BUILTIN_TURNS = [
+    {"files": {"README.txt": "Inventory service\n"}},
+    {"shell": ["ls -la", "cat README.txt"]},
+    _create("app/__init__.py", ""),
+    _create("app/store.py", STORE),
+    _create("tests/test_store.py", TEST),
+    {"shell": ["find . -name '*.py' -not -path './.*' | sort", "cat app/store.py"]},
+    {"shell": ["python -m compileall -q app tests && echo compiled"]},
+    {"shell": ["python -m unittest discover -s tests -t . 2>&1 | tail -5"]},
+    {"shell": ["grep -n 'def total' -A 2 app/store.py"]},
+    {"apply_patch": {"type": "update_file", "path": "app/store.py",
+                     "diff": "@@ def total(self):\n-        return sum(self.items.values()) - 1\n"
+                             "+        return sum(self.items.values())\n"}},
+    {"shell": ["python -m unittest discover -s tests -t . 2>&1 | tail -3"]},
+    {"shell": ["grep -rn 'def ' app tests", "wc -l app/*.py tests/*.py"]},
+    {"shell": ["seq 1 200000"]},
+    {"shell": ["python -c 'import sys; sys.stderr.write(\"boom\\n\"); sys.exit(3)'"]},
+    # The model guesses at a line that is not there: the editor rejects the hunk.
+    {"apply_patch": {"type": "update_file", "path": "app/store.py",
+                     "diff": "@@\n-        self.items = {}\n+        self.items = dict()\n"}},
+    _create("scratch.txt", "temporary\n"),
+    {"apply_patch": {"type": "delete_file", "path": "scratch.txt"}},
+    {"shell": ["ls", "cat app/store.py"]},
+]
+
+
+def load_turns(path: Path) -> list[dict]:
+    return [json.loads(line) for line in path.read_text().splitlines() if line.strip()]
+
+
+def _summary(turn: dict) -> str:
+    if "shell" in turn:
+        return "; ".join(turn["shell"])[:120]
+    operation = turn["apply_patch"]
+    return f"{operation['type']} {operation['path']}"
+
+
+async def run_turn(turn: dict, executor: ShellExecutor, editor: WorkSpaceEditor) -> dict:
+    """Run one tool call as the agent would; returns its timing and output size."""
+    start = time.perf_counter()
+    if "shell" in turn:
+        action = ShellActionRequest(commands = turn["shell"], timeout_ms = turn.get("timeout_ms"),
+                                    max_output_length = turn.get("max_output_length"))
+        result = await executor(SimpleNamespace(data = SimpleNamespace(action = action)))
+        output_bytes = sum(len(o.stdout.encode()) + len(o.stderr.encode()) for o in result.output)
+        ok = all(o.outcome.type == "exit" and o.outcome.exit_code == 0 for o in result.output)
+        tool = "shell"
+    else:
+        operation = ApplyPatchOperation(**turn["apply_patch"])
+        # Same as EditorTransactionHooks around a real apply_patch call.
+        editor.begin()
+        try:
+            output = getattr(editor, operation.type)(operation).output or ""
+            ok = True
+        except Exception as e:
+            output, ok = str(e), False
+        finally:
+            editor.end()
+        output_bytes = len(output.encode())
+        tool = "apply_patch"
+    return {"tool": tool, "call": _summary(turn), "ms": (time.perf_counter() - start) * 1000,
+            "output_bytes": output_bytes, "ok": ok}
+
+
+async def replay(turns: list[dict], base: Path | None) -> tuple[float, list[dict]]:
+    """One run of the turns in a fresh copy of `base` (or an empty workspace)."""
+    scratch = Path(tempfile.mkdtemp())
+    workspace = scratch / "workspace"
+    if base is not None:
+        shutil.copytree(base, workspace, symlinks = True)
+    else:
+        workspace.mkdir()
+    command_cache.invalidate()
+    executor = ShellExecutor(cwd = workspace)
+    editor = WorkSpaceEditor(workspace, ApprovalTracker(), auto_approve = True)
+    results = []
+    start = time.perf_counter()
+    try:
+        for turn in turns:
+            if "files" in turn:
+                setup_start = time.perf_counter()
+                for name, text in turn["files"].items():
+                    (workspace / name).parent.mkdir(parents = True, exist_ok = True)
+                    (workspace / name).write_text(text)
+                start += time.perf_counter() - setup_start
+                continue
+            results.append(await run_turn(turn, executor, editor))
+        wall = time.perf_counter() - start
+    finally:
+        await reset_sessions()
+        shutil.rmtree(scratch, ignore_errors = True)
+    return wall, results
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(fraction * (len(ordered) - 1)))]
+
+
+def build_report(name: str, walls: list[float], runs: list[list[dict]]) -> dict:
+    tools = {}
+    for tool in sorted({r["tool"] for run in runs for r in run}):
+        calls = [r for run in runs for r in run if r["tool"] == tool]
+        latencies = [r["ms"] for r in calls]
+        tools[tool] = {
+            "calls": len(calls) // len(runs),
+            "failed": sum(not r["ok"] for r in calls) // len(runs),
+            "total_ms": round(statistics.median(sum(r["ms"] for r in run if r["tool"] == tool) for run in runs), 2),
+            "mean_ms": round(statistics.mean(latencies), 2),
+            "p50_ms": round(_percentile(latencies, 0.5), 2),
+            "p95_ms": round(_percentile(latencies, 0.95), 2),
+            "max_ms": round(max(latencies), 2),
+            "output_bytes": sum(r["output_bytes"] for r in calls) // len(runs),
+        }
+    turns = []
+    for index, calls in enumerate(zip(*runs)):
+        first = calls[0]
+        turns.append({"turn": index, "tool": first["tool"], "call": first["call"], "ok": first["ok"],
+                      "ms": round(statistics.median(c["ms"] for c in calls), 2),
+                      "output_bytes": first["output_bytes"]})
+    return {
+        "script": name,
+        "runs": len(runs),
+        "config": {var: os.environ[var] for var in CONFIG_VARS if var in os.environ},
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "wall_s": round(statistics.median(walls), 4),
+        "wall_runs_s": [round(w, 4) for w in walls],
+        "tools": tools,
+        "turns": turns,
+    }
+
+
+def compare(report: dict, baseline: dict, max_regression: float) -> bool:
+    """Print changes against the baseline; False if something regressed past the limit."""
+    print(f"Against baseline ({baseline.get('config') or 'default config'}):")
+    rows = [("wall", baseline["wall_s"] * 1000, report["wall_s"] * 1000)]
+    for tool, stats in report["tools"].items():
+        if tool in baseline["tools"]:
+            rows.append((f"{tool} total", baseline["tools"][tool]["total_ms"], stats["total_ms"]))
+            rows.append((f"{tool} p95", baseline["tools"][tool]["p95_ms"], stats["p95_ms"]))
+    ok = True
+    for label, before, after in rows:
+        change = (after - before) / before if before else 0.0
+        regressed = change > max_regression
+        ok = ok and not regressed
+        print(f"  {label:<18} {before:>9.1f} -> {after:>9.1f} ms  {change:>+7.0%}{'  REGRESSION' if regressed else ''}")
+    for tool, stats in report["tools"].items():
+        before = baseline["tools"].get(tool, {}).get("output_bytes")
+        if before is not None and before != stats["output_bytes"]:
+            print(f"  {tool} output bytes {before:,} -> {stats['output_bytes']:,}")
+    return ok
+
+
+def print_report(report: dict) -> None:
+    print(f"{report['script']}: {len(report['turns'])} tool calls, {report['runs']} run(s), "
+          f"wall {report['wall_s'] * 1000:.0f} ms (median)")
+    print(f"  {'tool':<12} {'calls':>5} {'failed':>6} {'total ms':>9} {'p50 ms':>8} {'p95 ms':>8} {'output bytes':>13}")
+    for tool, stats in report["tools"].items():
+        print(f"  {tool:<12} {stats['calls']:>5} {stats['failed']:>6} {stats['total_ms']:>9.1f} "
+              f"{stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} {stats['output_bytes']:>13,}")
+
+
+async def main(args: argparse.Namespace) -> int:
+    turns = load_turns(args.script) if args.script else BUILTIN_TURNS
+    name = str(args.script) if args.script else "builtin"
+    walls, runs = [], []
+    for _ in range(args.repeat):
+        wall, results = await replay(turns, args.workspace)
+        walls.append(wall)
+        runs.append(results)
+    report = build_report(name, walls, runs)
+    print_report(report)
+    if args.report:
+        args.report.write_text(json.dumps(report, indent = 2) + "\n")
+        print(f"Report written to {args.report}")
+    if args.compare:
+        return 0 if compare(report, json.loads(args.compare.read_text()), args.max_regression) else 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Replay coding agent tool calls offline and report their cost")
+    parser.add_argument("--script", type = Path, help = "JSONL turns (default: built-in session)")
+    parser.add_argument("--workspace", type = Path, help = "Directory copied as the starting workspace")
+    parser.add_argument("--repeat", type = int, default = 3, help = "Runs, each in a fresh workspace")
+    parser.add_argument("--report", type = Path, help = "Write the JSON report here")
+    parser.add_argument("--compare", type = Path, help = "Earlier JSON report to compare against")
+    parser.add_argument("--max-regression", type = float, default = 0.25,
+                        help = "Allowed slowdown against --compare before exiting with 1 (0.25 = 25%%)")
+    args = parser.parse_args()
+    os.environ["SHELL_AUTO_APPROVE"] = "1"
+    sys.exit(asyncio.run(main(args)))
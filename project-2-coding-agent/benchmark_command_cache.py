@@ -0,0 +1,80 @@
+# Repeated inspection commands with and without the read-only command cache. Replays an
+# agent-like sequence over a generated project: the same cat/ls -R/grep -rn commands come
+# back between edits, and an apply_patch edit and a mkdir invalidate the cache part way.
+# Outputs are checked to be identical in both modes.
+#
+#   python benchmark_command_cache.py --files 3000
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+os.environ["SHELL_AUTO_APPROVE"] = "1"
+
+from agents import ShellActionRequest
+from agents.editor import ApplyPatchOperation
+
+from applypatchtool import ApprovalTracker, WorkSpaceEditor
+from commandcache import command_cache
+from shellexecutor import ShellExecutor
+
+INSPECT = [
+    "ls -R src | wc -l",
+    "grep -rn 'def handler_7' src | head -5",
+    "cat src/app.py",
+    "grep -rc render src | tail -3",
+]
+
+
+def make_project(root: Path, files: int) -> None:
+    for i in range(files):
+        folder = root / "src" / f"pkg{i % 30}"
+        folder.mkdir(parents = True, exist_ok = True)
+        (folder / f"mod{i}.py").write_text("".join(f"def handler_{i}_{j}(r):\n    return render(r)\n\n" for j in range(30)))
+    (root / "src" / "app.py").write_text("def main():\n    return 1\n")
+
+
+def sequence(editor: WorkSpaceEditor) -> list:
+    edit = ApplyPatchOperation(type = "update_file", path = "src/app.py",
+                               diff = "@@ -1,2 +1,2 @@\n def main():\n-    return 1\n+    return 2\n")
+    return [*INSPECT, *INSPECT, *INSPECT[:2], lambda: editor.update_file(edit), *INSPECT, *INSPECT,
+            "mkdir -p notes", *INSPECT, *INSPECT]
+
+
+async def replay(root: Path, cache: bool) -> tuple:
+    (root / "src" / "app.py").write_text("def main():\n    return 1\n")
+    executor = ShellExecutor(cwd = root, cache = cache)
+    editor = WorkSpaceEditor(root, ApprovalTracker(), auto_approve = True)
+    outputs = []
+    start = time.perf_counter()
+    for step in sequence(editor):
+        if callable(step):
+            step()
+            continue
+        action = ShellActionRequest(commands = [step], timeout_ms = 60_000)
+        result = await executor(SimpleNamespace(data = SimpleNamespace(action = action)))
+        outputs.append(result.output[0].stdout)
+    return time.perf_counter() - start, outputs
+
+
+async def main(files: int) -> None:
+    root = Path(tempfile.mkdtemp())
+    make_project(root, files)
+    commands = sum(1 for step in sequence(None) if not callable(step))
+    print(f"{commands} inspection commands over {files} files, with one edit and one mkdir in between")
+    plain, expected = await replay(root, cache = False)
+    print(f"  no cache  {plain:.2f} s")
+    command_cache.hits = command_cache.misses = command_cache.invalidations = 0
+    cached, outputs = await replay(root, cache = True)
+    assert outputs == expected, "cached outputs differ"
+    print(f"  cache     {cached:.2f} s  ({command_cache.report()})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Read-only command cache on a repeated inspection sequence")
+    parser.add_argument("--files", type = int, default = 3000, help = "Generated source files")
+    args = parser.parse_args()
+    asyncio.run(main(args.files))
@@ -0,0 +1,65 @@
+# Workspace index: cost of keeping it current, and what it saves per edit.
+#   scan     first scan of a generated project vs a rescan after one file changed
+#   read     characters the agent reads to edit one function of a large file: `cat` of the
+#            whole file vs file_outline + read_lines of that function
+#
+#   python benchmark_index.py --files 2000
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from workspaceindex import WorkspaceIndex
+
+
+def make_project(root: Path, files: int, rng: random.Random) -> None:
+    for i in range(files):
+        folder = root / "src" / f"feature{i % 40}"
+        folder.mkdir(parents = True, exist_ok = True)
+        if i % 2:
+            body = "".join(f"export function handler{i}_{j}(req) {{\n  const v = load(req, {rng.randint(0, 99)});\n"
+                           f"  return render(v);\n}}\n\n" for j in range(20))
+            (folder / f"mod{i}.ts").write_text(body)
+        else:
+            body = "".join(f"def handler_{i}_{j}(request):\n    value = load(request, {rng.randint(0, 99)})\n"
+                           f"    return render(value)\n\n\n" for j in range(20))
+            (folder / f"mod{i}.py").write_text(body)
+    big = "".join(f"def step_{j}(state):\n" + "".join(f"    state = transform_{k}(state)\n" for k in range(25))
+                  + "    return state\n\n\n" for j in range(80))
+    (root / "src" / "pipeline.py").write_text(big)
+
+
+def main(files: int) -> None:
+    root = Path(tempfile.mkdtemp())
+    make_project(root, files, random.Random(3))
+    index = WorkspaceIndex(root)
+
+    start = time.perf_counter()
+    index.refresh()
+    first = time.perf_counter() - start
+    symbols = sum(len(entry.symbols) for entry in index.files.values())
+    (root / "src" / "feature1" / "mod1.ts").write_text("export function changed() {\n  return 1;\n}\n")
+    start = time.perf_counter()
+    before = index.reindexed
+    index.refresh()
+    rescan = time.perf_counter() - start
+    print(f"{len(index.files)} files, {symbols} symbols")
+    print(f"  first scan {first * 1000:.0f} ms; rescan after one edit {rescan * 1000:.0f} ms "
+          f"({index.reindexed - before} file re-read)")
+
+    whole = (root / "src" / "pipeline.py").read_text()
+    outline = index.file_outline("src/pipeline.py")
+    target = next(line for line in outline.splitlines() if "step_57 " in line)
+    start_line, end_line = (int(n) for n in target.rsplit(" ", 1)[1].split("-"))
+    lines = index.read_lines("src/pipeline.py", start_line, end_line)
+    print("Reading one function of src/pipeline.py before editing it:")
+    print(f"  cat                      {len(whole):>8,} chars")
+    print(f"  file_outline + read_lines {len(outline) + len(lines):>7,} chars")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Workspace index scan cost and read savings")
+    parser.add_argument("--files", type = int, default = 2000, help = "Generated source files")
+    args = parser.parse_args()
+    main(args.files)
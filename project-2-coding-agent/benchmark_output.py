@@ -0,0 +1,66 @@
+# Peak memory of capturing a very noisy command: communicate() (the old executor, which
+# buffers everything) vs ShellExecutor's bounded streaming capture. Each mode runs in its
+# own process so ru_maxrss is the peak for that mode alone.
+#
+#   python benchmark_output.py --mb 200
+import argparse
+import asyncio
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+os.environ["SHELL_AUTO_APPROVE"] = "1"
+
+from agents import ShellActionRequest
+
+from shellexecutor import ShellExecutor
+
+
+def noisy_command(mb: int) -> str:
+    return f"yes 'npm WARN deprecated some-package@1.0.0: use another-package' | head -c {mb * 1_000_000}"
+
+
+async def run_communicate(command: str, workspace: Path) -> int:
+    proc = await asyncio.create_subprocess_shell(command, cwd = workspace, stdout = asyncio.subprocess.PIPE,
+                                                 stderr = asyncio.subprocess.PIPE)
+    stdout, _ = await proc.communicate()
+    return len(stdout.decode("utf-8", errors = "ignore"))
+
+
+async def run_streaming(command: str, workspace: Path) -> int:
+    action = ShellActionRequest(commands = [command])
+    result = await ShellExecutor(cwd = workspace)(SimpleNamespace(data = SimpleNamespace(action = action)))
+    return len(result.output[0].stdout)
+
+
+def measure(mode: str, mb: int) -> None:
+    workspace = Path(tempfile.mkdtemp())
+    run = run_communicate if mode == "communicate" else run_streaming
+    start = time.perf_counter()
+    returned = asyncio.run(run(noisy_command(mb), workspace))
+    elapsed = time.perf_counter() - start
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{mode:>12} {elapsed:>7.2f} {peak_mb:>12.0f} {returned:>15}")
+
+
+def main(mb: int) -> None:
+    print(f"Command writes {mb} MB to stdout")
+    print(f"{'mode':>12} {'time s':>7} {'peak RSS MB':>12} {'chars returned':>15}")
+    for mode in ("communicate", "streaming"):
+        subprocess.run([sys.executable, __file__, "--mb", str(mb), "--mode", mode], check = True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Peak memory: communicate() vs bounded streaming capture")
+    parser.add_argument("--mb", type = int, default = 200, help = "Megabytes of output")
+    parser.add_argument("--mode", choices = ["communicate", "streaming"], help = argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.mode:
+        measure(args.mode, args.mb)
+    else:
+        main(args.mb)
@@ -0,0 +1,80 @@
+# Latency of a multi-file inspection turn: one shell call with several read-only
+# commands (cat, grep -rn, wc, find, ls -R) over a generated project, run in order vs
+# with SHELL_PARALLEL concurrency. A mutating command in the middle of the turn keeps its
+# place. Outputs are checked to be identical in both modes.
+# With --io-latency each command first sleeps that long, to model the slow reads of a
+# cold cache or network file system; the second set of rows shows that case. Without it,
+# the gain depends on the number of CPUs available.
+#
+#   python benchmark_parallel_shell.py --files 3000 --parallel 4 --io-latency 0.1
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+os.environ["SHELL_AUTO_APPROVE"] = "1"
+
+from agents import ShellActionRequest
+
+from shellexecutor import ShellExecutor
+
+
+def make_project(root: Path, files: int) -> None:
+    for i in range(files):
+        package = root / "src" / f"pkg{i % 20}"
+        package.mkdir(parents = True, exist_ok = True)
+        body = "".join(f"def handler_{i}_{j}(request):\n    return render(request, 'page_{j}.html')\n\n"
+                       for j in range(40))
+        (package / f"module_{i}.py").write_text(body)
+
+
+TURN = [
+    "grep -rn 'def handler_1' src | wc -l",
+    "grep -rln 'page_7.html' src | head -5",
+    "find src -name '*.py' | wc -l",
+    "cat src/pkg0/module_0.py | head -20",
+    "wc -l src/pkg1/*.py | tail -1",
+    "mkdir -p notes && echo 'checked handlers' > notes/todo.txt",
+    "ls -R src | wc -l",
+    "grep -rc render src/pkg3 | tail -3",
+    "cat notes/todo.txt",
+]
+
+
+async def run_turn(executor: ShellExecutor, io_latency: float = 0.0) -> tuple:
+    commands = [f"sleep {io_latency}; {command}" for command in TURN] if io_latency else TURN
+    action = ShellActionRequest(commands = commands, timeout_ms = 60_000)
+    start = time.perf_counter()
+    result = await executor(SimpleNamespace(data = SimpleNamespace(action = action)))
+    return time.perf_counter() - start, [(o.stdout, o.outcome.exit_code) for o in result.output]
+
+
+async def main(files: int, parallel: int, repeats: int, io_latency: float) -> None:
+    workspace = Path(tempfile.mkdtemp())
+    make_project(workspace, files)
+    print(f"{len(TURN)} commands per turn over {files} files, {os.cpu_count()} CPU(s), best of {repeats}")
+    print(f"{'io latency s':>12} {'mode':>12} {'turn s':>7}")
+    baseline = None
+    for latency in sorted({0.0, io_latency}):
+        for mode, limit in (("serial", 1), (f"parallel={parallel}", parallel)):
+            executor = ShellExecutor(cwd = workspace, parallel = limit)
+            timings = []
+            for _ in range(repeats):
+                elapsed, outputs = await run_turn(executor, latency)
+                timings.append(elapsed)
+            baseline = baseline or outputs
+            assert outputs == baseline, "outputs differ between modes"
+            print(f"{latency:>12.2f} {mode:>12} {min(timings):>7.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Multi-file inspection turn: serial vs concurrent read-only commands")
+    parser.add_argument("--files", type = int, default = 3000, help = "Generated source files")
+    parser.add_argument("--parallel", type = int, default = 4, help = "Concurrency limit for read-only commands")
+    parser.add_argument("--repeats", type = int, default = 3, help = "Turns per mode (best is reported)")
+    parser.add_argument("--io-latency", type = float, default = 0.1, help = "Simulated read latency per command, seconds")
+    args = parser.parse_args()
+    asyncio.run(main(args.files, args.parallel, args.repeats, args.io_latency))
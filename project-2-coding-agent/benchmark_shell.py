@@ -0,0 +1,65 @@
+# Per-command overhead of ShellExecutor: one-shot (a new shell per command) vs session
+# (one long-lived shell per workspace). Runs a 100-command script of the small commands an
+# agent issues while exploring and building (ls, cat, grep, mkdir, echo, test) against a
+# scratch workspace, one command per tool call as the agent does.
+#
+#   python benchmark_shell.py --commands 100
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+os.environ["SHELL_AUTO_APPROVE"] = "1"
+
+from agents import ShellActionRequest
+
+from shellexecutor import ShellExecutor
+
+SCRIPT = [
+    "ls -la",
+    "mkdir -p src",
+    "echo 'print(1)' > src/main.py",
+    "cat src/main.py",
+    "grep -n print src/main.py",
+    "test -f src/main.py && echo present",
+    "wc -l src/main.py",
+    "echo $HOME",
+    "true",
+    "ls src",
+]
+
+
+def request(command: str) -> SimpleNamespace:
+    action = ShellActionRequest(commands = [command], timeout_ms = 10_000)
+    return SimpleNamespace(data = SimpleNamespace(action = action))
+
+
+async def run_script(executor: ShellExecutor, commands: list) -> float:
+    start = time.perf_counter()
+    for command in commands:
+        result = await executor(request(command))
+        assert result.output[0].outcome.exit_code == 0, (command, result.output[0].stderr)
+    return time.perf_counter() - start
+
+
+async def main(n: int) -> None:
+    commands = (SCRIPT * (n // len(SCRIPT) + 1))[:n]
+    print(f"{n} commands, one per call")
+    print(f"{'mode':>8} {'total s':>8} {'per command ms':>15}")
+    for mode in ("one-shot", "session"):
+        workspace = Path(tempfile.mkdtemp())
+        executor = ShellExecutor(cwd = workspace, session = mode == "session")
+        elapsed = await run_script(executor, commands)
+        print(f"{mode:>8} {elapsed:>8.2f} {elapsed / n * 1000:>15.2f}")
+        if executor.session is not None:
+            await executor.session.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "ShellExecutor per-command overhead: one-shot vs session")
+    parser.add_argument("--commands", type = int, default = 100, help = "Commands in the script")
+    args = parser.parse_args()
+    asyncio.run(main(args.commands))
@@ -0,0 +1,91 @@
+# Workspace snapshots against a full copy, on a generated project with a dependency tree
+# whose files have the size spread of a real node_modules (mostly a few KB, some bundles
+# of hundreds of KB).
+#   full copy   shutil.copytree of the workspace, what branching an attempt costs without
+#               snapshots
+#   snapshot    first snapshot, then one after a few edits (only changed files written)
+#   restore     back to the first snapshot after the edits
+# Each line reports the bytes of file data written. Checks that an in-place write in the
+# workspace does not reach a snapshot, and that the restored tree is identical to the
+# snapshotted one.
+#
+#   python benchmark_snapshots.py --packages 300
+import argparse
+import filecmp
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from snapshots import WorkspaceSnapshots
+
+
+def make_project(root: Path, packages: int) -> None:
+    for i in range(packages):
+        package = root / "node_modules" / f"pkg{i}"
+        (package / "lib").mkdir(parents = True)
+        (package / "package.json").write_text(f'{{"name": "pkg{i}", "version": "1.0.{i}"}}\n')
+        for j in range(20):
+            # 1-16 KB modules, and one 256 KB-1 MB bundle in every fifth package.
+            size = (1 << (j % 5)) * 1024 if j or i % 5 else (256 << (i % 3)) * 1024
+            (package / "lib" / f"part{j}.js").write_bytes(os.urandom(size // 2).hex().encode())
+    (root / "node_modules" / ".bin").mkdir()
+    (root / "node_modules" / ".bin" / "pkg0").symlink_to("../pkg0/lib/part0.js")
+    for i in range(40):
+        (root / "src" / f"page{i}.tsx").parent.mkdir(parents = True, exist_ok = True)
+        (root / "src" / f"page{i}.tsx").write_text(f"export default function Page{i}() {{ return null; }}\n")
+
+
+def same_tree(a: Path, b: Path) -> bool:
+    compare = filecmp.dircmp(a, b)
+    if compare.left_only or compare.right_only or compare.funny_files:
+        return False
+    _, mismatch, errors = filecmp.cmpfiles(a, b, compare.common_files, shallow = False)
+    return not mismatch and not errors and all(same_tree(a / d, b / d) for d in compare.common_dirs)
+
+
+def tree_bytes(root: Path) -> int:
+    return sum(path.stat().st_size for path in root.rglob("*") if path.is_file() and not path.is_symlink())
+
+
+def timed(function):
+    start = time.perf_counter()
+    value = function()
+    return time.perf_counter() - start, value
+
+
+def main(packages: int) -> None:
+    root = Path(tempfile.mkdtemp())
+    workspace = root / "workspace"
+    make_project(workspace, packages)
+    snapshots = WorkspaceSnapshots(workspace, store = root / "snapshots")
+
+    copy_time, _ = timed(lambda: shutil.copytree(workspace, root / "full-copy", symlinks = True))
+    _, first = timed(lambda: snapshots.create("base"))
+    expected = root / "full-copy"
+    for i in range(5):
+        with open(workspace / "src" / f"page{i}.tsx", "a") as f:   # in place, same inode
+            f.write("// edited\n")
+    with open(workspace / "node_modules" / "pkg3" / "lib" / "part1.js", "a") as f:   # an install script patching
+        f.write("// patched\n")
+    (workspace / "src" / "page39.tsx").unlink()
+    (workspace / "src" / "new.tsx").write_text("export const x = 1;\n")
+    _, second = timed(lambda: snapshots.create("edited"))
+    assert same_tree(snapshots.path("base"), expected), "in-place edit leaked into the snapshot"
+    _, restored = timed(lambda: snapshots.restore("base"))
+    assert same_tree(workspace, expected), "restored workspace differs from the snapshot"
+
+    print(f"{first.files} files ({packages} packages)")
+    print(f"  full copy          {copy_time * 1000:>7.0f} ms  {tree_bytes(expected) / 1024:,.0f} KB written")
+    print(f"  first snapshot     {first.seconds * 1000:>7.0f} ms  {first}")
+    print(f"  snapshot after edits {second.seconds * 1000:>5.0f} ms  {second}")
+    print(f"  restore            {restored.seconds * 1000:>7.0f} ms  {restored}")
+    shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Workspace snapshot cost against a full copy")
+    parser.add_argument("--packages", type = int, default = 300, help = "Generated node_modules packages")
+    args = parser.parse_args()
+    main(args.packages)
@@ -0,0 +1,119 @@
+# Result cache for read-only shell commands (ShellExecutor with cache = True or
+# SHELL_CACHE=1). An inspection command the agent repeats (cat, ls -R, grep, git diff)
+# returns its previous output at once if nothing it could have read has changed.
+# The key is the command, the directory it runs in, and:
+#   - a fingerprint (size, mtime) of every path named in the command, of the directory
+#     itself, and of .git/HEAD and .git/index for git commands
+#   - the workspace generation, which goes up on every WorkSpaceEditor write and every
+#     command that is not read-only (npm install, mkdir, mv, ...), so recursive scans
+#     like grep -r and ls -R never outlive an edit made through the agent
+# Entries also expire after SHELL_CACHE_TTL seconds, for changes made outside the agent.
+#
+#   SHELL_CACHE        1 to enable in ShellExecutor (default off)
+#   SHELL_CACHE_TTL    seconds an entry stays valid (default 300)
+import glob
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+from readonlycommands import is_read_only, simple_commands
+
+SHELL_CACHE_TTL = float(os.getenv("SHELL_CACHE_TTL", "300"))
+
+# Read-only commands whose output does not depend only on the files they read.
+UNCACHEABLE_PROGRAMS = {"date", "sleep", "which", "type", "whoami", "uname", "printenv", "df", "true", "false"}
+
+
+def certainly_read_only(command: str) -> bool:
+    """
+    True only if `command` parses cleanly into read-only commands. Multi-line commands
+    never count: a line the classifier gets wrong must not be cached, and must not skip
+    invalidation.
+    """
+    return "\n" not in command and "\r" not in command and is_read_only(command)
+
+
+def _stat(path: Path) -> tuple:
+    try:
+        stat = path.stat()
+    except OSError:
+        return (str(path), None)
+    return (str(path), stat.st_size, stat.st_mtime_ns)
+
+
+def _git_dir(cwd: Path) -> Path | None:
+    for directory in (cwd, *cwd.parents):
+        if (directory / ".git").exists():
+            return directory / ".git"
+    return None
+
+
+class CommandCache:
+    def __init__(self, ttl: float = SHELL_CACHE_TTL, max_entries: int = 500):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries: OrderedDict[tuple, tuple[float, Any]] = OrderedDict()
+
+    def key(self, command: str, cwd: Path) -> tuple | None:
+        """Cache key for `command` run in `cwd`, or None if it must not be cached."""
+        if "$" in command:
+            # Variables and globs of the session shell may expand differently next time.
+            return None
+        if not certainly_read_only(command):
+            return None
+        commands = simple_commands(command)
+        cwd = Path(cwd)
+        fingerprint = [_stat(cwd)]
+        for words in commands:
+            if words[0] in UNCACHEABLE_PROGRAMS:
+                return None
+            if words[0] == "git":
+                git_dir = _git_dir(cwd)
+                if git_dir is not None:
+                    fingerprint += [_stat(git_dir / "HEAD"), _stat(git_dir / "index")]
+            for word in words[1:]:
+                if word.startswith("-"):
+                    continue
+                if any(char in word for char in "*?["):
+                    paths = [cwd / match for match in sorted(glob.glob(word, root_dir = cwd))]
+                    fingerprint.append((word, tuple(_stat(path) for path in paths)))
+                elif (cwd / word).exists():
+                    fingerprint.append(_stat(cwd / word))
+        return (command, str(cwd), self.generation, tuple(fingerprint))
+
+    def get(self, key: tuple) -> Any | None:
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: tuple, value: Any) -> None:
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last = False)
+
+    def invalidate(self) -> None:
+        """Something in the workspace changed: no earlier entry is valid any more."""
+        self.generation += 1
+        self.invalidations += 1
+        self._entries.clear()
+
+    def report(self) -> str:
+        lookups = self.hits + self.misses
+        rate = f" ({self.hits / lookups:.0%})" if lookups else ""
+        return f"{self.hits} hits / {lookups} lookups{rate}, {self.invalidations} invalidations"
+
+
+# Shared by every executor and editor in the process, so that edits invalidate it.
+command_cache = CommandCache()
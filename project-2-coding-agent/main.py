@@ -1,13 +1,64 @@
+import argparse
 import asyncio
+import json
+import os
+import re
+import time
 from agents import ItemHelpers, Runner
 from agent import coding_agent
 from updatedagent import updated_coding_agent
+from commandcache import command_cache
+from prequisites import workspace_dir
+from shellexecutor import set_output_logger
+from shellsession import reset_sessions
+from snapshots import WorkspaceSnapshots
+
+
+# JSONL file that shell and apply_patch calls are appended to, for benchmark_agent.py.
+AGENT_RECORD = os.getenv("AGENT_RECORD")
+
+# Names of the snapshots run_speculative_attempts makes: <run id>-base, <run id>-attemptN.
+SPECULATIVE_SNAPSHOT = re.compile(r"^\d{8}-\d{6}-(base|attempt\d+)$")
+
+
+def _field(value, name: str):
+    return value.get(name) if isinstance(value, dict) else getattr(value, name, None)
+
+
+def record_tool_call(raw) -> None:
+    """
+    Append a shell or apply_patch call the model made to AGENT_RECORD, if set.
+    """
+    if not AGENT_RECORD:
+        return
+    call_type = _field(raw, "type")
+    if call_type == "shell_call":
+        action = _field(raw, "action")
+        turn = {"shell": list(_field(action, "commands") or []), "timeout_ms": _field(action, "timeout_ms"),
+                "max_output_length": _field(action, "max_output_length")}
+    elif call_type == "apply_patch_call":
+        operation = _field(raw, "operation")
+        turn = {"apply_patch": {name: _field(operation, name) for name in ("type", "path", "diff")}}
+    else:
+        return
+    with open(AGENT_RECORD, "a") as f:
+        f.write(json.dumps(turn) + "\n")
+
+
+def log_shell_output(stream: str, line: str) -> None:
+    """
+    Print command output live, as the shell tool produces it.
+    """
+    prefix = "[shell]" if stream == "stdout" else "[shell stderr]"
+    print(f"{prefix} {line}")
+
 
 async def run_coding_agent_with_logs(prompt: str):
     """
     Run the coding agent and stream the logs to the console.
     """
     print(f"Running coding agent with prompt: {prompt}")
+    set_output_logger(log_shell_output)
 
     result = Runner.run_streamed(coding_agent, input = prompt)
 
@@ -18,6 +69,7 @@ async def run_coding_agent_with_logs(prompt: str):
             if item.type == "tool_call_item":
                 raw = item.raw_item
                 raw_type_name = type(raw).__name__
+                record_tool_call(raw)
 
 
                 if raw_type_name == "ResponseFunctionWebSearch":
@@ -45,6 +97,8 @@ async def run_coding_agent_with_logs(prompt: str):
                 pass
 
     print("===== Run complete ===== \n")
+    if command_cache.hits + command_cache.misses:
+        print(f"[shell] command cache: {command_cache.report()}\n")
         
     print("Final Answer:")
 
@@ -56,6 +110,7 @@ async def run_updated_coding_agent_with_logs(prompt: str):
     Run the updated coding agent and stream the logs to the console.
     """
     print(f"Running updated coding agent with prompt: {prompt}")
+    set_output_logger(log_shell_output)
 
     apply_patch_seen = False
 
@@ -70,6 +125,7 @@ async def run_updated_coding_agent_with_logs(prompt: str):
         if item.type == "tool_call_item":
             raw = item.raw_item
             raw_type_name = type(raw).__name__
+            record_tool_call(raw)
 
             if raw_type_name == "ResponseFunctionWebSearch":
                 print("[tool] web_search - agent is calling the web search tool")
@@ -80,6 +136,8 @@ async def run_updated_coding_agent_with_logs(prompt: str):
                     print(f"[tool] shell - running commands: {commands}")
                 else:
                     print(f"[tool] shell - running command")
+            elif raw_type_name == "ResponseFunctionToolCall":
+                print(f"[tool] {raw.name} - {raw.arguments}")
             elif "MCP" in raw_type_name or "Mcp" in raw_type_name:
                 tool_name = getattr(raw, "tool_name", None)
                 if tool_name is None:
@@ -123,6 +181,8 @@ async def run_updated_coding_agent_with_logs(prompt: str):
             pass
 
     print("===== Run complete ===== \n")
+    if command_cache.hits + command_cache.misses:
+        print(f"[shell] command cache: {command_cache.report()}\n")
 
     print("Final Answer:")
 
@@ -131,8 +191,74 @@ async def run_updated_coding_agent_with_logs(prompt: str):
         _ = print("\n[apply_patch] One or more apply_patch calls were executed.")
     else:
         print("\n[apply_patch] No apply_patch calls detected in this run.")
+    return result.final_output
+
+
+async def check_workspace(check: str) -> bool:
+    """
+    Run the check command (e.g. "npm run build") in the workspace; True if it passes.
+    """
+    proc = await asyncio.create_subprocess_shell(check, cwd = workspace_dir)
+    return await proc.wait() == 0
+
+
+async def run_speculative_attempts(prompt: str, attempts: int, check: str | None = None):
+    """
+    Run the updated coding agent `attempts` times, each from the same snapshot of the
+    workspace, and keep the best attempt: the first one whose check command passes,
+    or the one picked at the prompt when there is no check or none passed.
+
+    The kept attempt's snapshot stays as the base of the next run, so that run only
+    writes the files changed since; the first run copies the whole workspace (reflinked
+    where the file system supports it). Older speculative snapshots are deleted.
+    """
+    snapshots = WorkspaceSnapshots(workspace_dir)
+    run_id = time.strftime("%Y%m%d-%H%M%S")
+    base = f"{run_id}-base"
+    print(f"[snapshot] {snapshots.create(base)}")
+
+    results = []
+    for attempt in range(1, attempts + 1):
+        print(f"===== Attempt {attempt}/{attempts} =====")
+        print(f"[snapshot] restored {snapshots.restore(base)}")
+        command_cache.invalidate()
+        await reset_sessions()
+        final_output = await run_updated_coding_agent_with_logs(prompt)
+        passed = await check_workspace(check) if check else None
+        name = f"{run_id}-attempt{attempt}"
+        print(f"[snapshot] {snapshots.create(name)}")
+        results.append((name, passed, final_output))
+        if passed:
+            print(f"[check] attempt {attempt} passed: {check}")
+            break
+        if check:
+            print(f"[check] attempt {attempt} failed: {check}")
+
+    keep = next((name for name, passed, _ in results if passed), None)
+    if keep is None:
+        for number, (name, passed, final_output) in enumerate(results, 1):
+            summary = str(final_output).strip().splitlines()[:1] or [""]
+            print(f"  {number}. {name}: {summary[0][:200]}")
+        choice = input(f"Keep which attempt? [1-{len(results)}, 0 for none] ").strip()
+        keep = results[int(choice) - 1][0] if choice.isdigit() and 0 < int(choice) <= len(results) else base
+
+    print(f"[snapshot] kept {snapshots.restore(keep)}")
+    command_cache.invalidate()
+    await reset_sessions()
+    for name in snapshots.names():
+        if name != keep and SPECULATIVE_SNAPSHOT.match(name):
+            snapshots.delete(name)
+    return keep
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Run the coding agent")
+    parser.add_argument("--attempts", type = int, default = 1,
+                        help = "Speculative attempts from the same workspace snapshot; the best is kept")
+    parser.add_argument("--check", help = "Command that passes for a good attempt, e.g. 'npm run build'")
+    args = parser.parse_args()
     prompt = input("Enter a prompt: ")
-    asyncio.run(run_updated_coding_agent_with_logs(prompt))
\ No newline at end of file
+    if args.attempts > 1:
+        asyncio.run(run_speculative_attempts(prompt, args.attempts, args.check))
+    else:
+        asyncio.run(run_updated_coding_agent_with_logs(prompt))
\ No newline at end of file
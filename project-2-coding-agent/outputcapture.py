@@ -0,0 +1,106 @@
+# Bounded capture of a command's output stream for ShellExecutor.
+# Output is consumed chunk by chunk as it arrives instead of being buffered whole by
+# communicate(). Only the first `head_bytes` and the last `tail_bytes` are kept in
+# memory; once a stream outgrows that, everything (from the first byte) is written to a
+# log file in the workspace and the model gets head + tail with a pointer to the file.
+# Complete lines are also handed to a callback as they arrive, for live console output.
+#
+#   SHELL_OUTPUT_HEAD_BYTES   bytes kept from the start of each stream (default 8000)
+#   SHELL_OUTPUT_TAIL_BYTES   bytes kept from the end of each stream (default 8000)
+import os
+import time
+from itertools import count
+from pathlib import Path
+from typing import BinaryIO, Callable
+
+SHELL_OUTPUT_HEAD_BYTES = int(os.getenv("SHELL_OUTPUT_HEAD_BYTES", "8000"))
+SHELL_OUTPUT_TAIL_BYTES = int(os.getenv("SHELL_OUTPUT_TAIL_BYTES", "8000"))
+
+# Workspace subdirectory for full logs of truncated output.
+LOG_DIR = ".shell-logs"
+
+# A line longer than this is passed to the line callback in pieces.
+MAX_LINE_BYTES = 4096
+
+_log_ids = count(1)
+
+
+class OutputCapture:
+    """
+    Head/tail capture of one stream. feed() every chunk, close() at the end, then
+    text() is the view for the model. Memory stays under head + tail + one chunk.
+    """
+
+    def __init__(self, log_dir: Path, name: str, head_bytes: int = SHELL_OUTPUT_HEAD_BYTES,
+                 tail_bytes: int = SHELL_OUTPUT_TAIL_BYTES, on_line: Callable[[str], None] | None = None):
+        self.log_dir = Path(log_dir)
+        self.name = name
+        self.head_bytes = head_bytes
+        self.tail_bytes = tail_bytes
+        self.on_line = on_line
+        self.total = 0
+        self.log_path: Path | None = None
+        self._head = bytearray()
+        self._tail = bytearray()
+        self._log: BinaryIO | None = None
+        self._partial = bytearray()
+
+    @property
+    def truncated(self) -> bool:
+        return self.log_path is not None
+
+    def feed(self, data: bytes) -> None:
+        if not data:
+            return
+        self.total += len(data)
+        if self.on_line is not None:
+            self._emit_lines(data)
+        if self._log is None:
+            self._head += data
+            if len(self._head) <= self.head_bytes + self.tail_bytes:
+                return
+            # Too big to return whole: spill everything so far, keep head and tail.
+            self._open_log()
+            self._log.write(self._head)
+            self._tail = self._head[max(self.head_bytes, len(self._head) - self.tail_bytes):]
+            del self._head[self.head_bytes:]
+            return
+        self._log.write(data)
+        self._tail += data
+        if len(self._tail) > 2 * self.tail_bytes:
+            del self._tail[:-self.tail_bytes]
+
+    def _open_log(self) -> None:
+        self.log_dir.mkdir(parents = True, exist_ok = True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        self.log_path = self.log_dir / f"{stamp}-{next(_log_ids):04d}-{self.name}.log"
+        self._log = open(self.log_path, "wb")
+
+    def _emit_lines(self, data: bytes) -> None:
+        self._partial += data
+        *lines, rest = self._partial.split(b"\n")
+        for line in lines:
+            self.on_line(line.decode("utf-8", errors = "replace"))
+        while len(rest) > MAX_LINE_BYTES:
+            self.on_line(rest[:MAX_LINE_BYTES].decode("utf-8", errors = "replace"))
+            rest = rest[MAX_LINE_BYTES:]
+        self._partial = bytearray(rest)
+
+    def close(self) -> None:
+        if self.on_line is not None and self._partial:
+            self.on_line(self._partial.decode("utf-8", errors = "replace"))
+            self._partial.clear()
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    def text(self) -> str:
+        if not self.truncated:
+            return self._head.decode("utf-8", errors = "ignore")
+        tail = bytes(self._tail[-self.tail_bytes:]) if self.tail_bytes else b""
+        omitted = self.total - len(self._head) - len(tail)
+        return (
+            self._head.decode("utf-8", errors = "ignore")
+            + f"\n... [{omitted} bytes of {self.name} omitted; full output ({self.total} bytes) in {self.log_path}] ...\n"
+            + tail.decode("utf-8", errors = "ignore")
+        )
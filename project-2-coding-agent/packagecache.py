@@ -0,0 +1,123 @@
+# Shared package cache for the projects the coding agent builds. ShellExecutor passes
+# package_env() to every command, so pip/uv and npm/yarn/pnpm in any workspace use one
+# cache directory instead of downloading everything again for each new app:
+#   <cache>/wheels   wheelhouse (find-links) of prefetched wheels, usable with no index
+#   <cache>/pip      pip's HTTP/wheel cache          <cache>/uv     uv's cache
+#   <cache>/npm      npm cache (also used by npx)    <cache>/pnpm   pnpm store
+#   <cache>/yarn     yarn cache
+#
+#   PACKAGE_CACHE       off (default) | shared (use and fill the cache, prefer cached
+#                       versions) | offline (cache and wheelhouse only, no network)
+#   PACKAGE_CACHE_DIR   cache directory (default ~/.cache/coding-agent/packages)
+#
+# Fill the cache ahead of time (for example before an offline CI run):
+#   python packagecache.py prefetch --pip fastapi uvicorn --npm next@latest react
+#   python packagecache.py prefetch --pip-requirements requirements.txt --npm-project ./app
+#   python packagecache.py status
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+PACKAGE_CACHE = os.getenv("PACKAGE_CACHE", "off").lower()
+PACKAGE_CACHE_DIR = Path(os.getenv("PACKAGE_CACHE_DIR", Path.home() / ".cache" / "coding-agent" / "packages"))
+
+MODES = ("off", "shared", "offline")
+
+
+def package_env(mode: str = PACKAGE_CACHE, cache_dir: Path = PACKAGE_CACHE_DIR) -> dict[str, str]:
+    """Environment variables that point package managers at the shared cache."""
+    if mode not in MODES:
+        raise ValueError(f"Unknown PACKAGE_CACHE: {mode!r} (expected off, shared or offline)")
+    if mode == "off":
+        return {}
+    cache_dir = Path(cache_dir).expanduser().resolve()
+    wheels = cache_dir / "wheels"
+    for name in ("wheels", "pip", "uv", "npm", "pnpm", "yarn"):
+        (cache_dir / name).mkdir(parents = True, exist_ok = True)
+    env = {
+        "PIP_CACHE_DIR": str(cache_dir / "pip"),
+        "PIP_FIND_LINKS": str(wheels),
+        "PIP_DISABLE_PIP_VERSION_CHECK": "1",
+        "UV_CACHE_DIR": str(cache_dir / "uv"),
+        "UV_FIND_LINKS": str(wheels),
+        "npm_config_cache": str(cache_dir / "npm"),
+        "npm_config_store_dir": str(cache_dir / "pnpm"),
+        "YARN_CACHE_FOLDER": str(cache_dir / "yarn"),
+        "npm_config_audit": "false",
+        "npm_config_fund": "false",
+        "npm_config_update_notifier": "false",
+    }
+    if mode == "shared":
+        env["npm_config_prefer_offline"] = "true"
+    else:
+        env.update({
+            "PIP_NO_INDEX": "1",
+            "UV_OFFLINE": "1",
+            "npm_config_offline": "true",
+            "YARN_ENABLE_OFFLINE_MODE": "1",
+        })
+    return env
+
+
+def _run(command: list[str], env: dict[str, str], cwd: Path | None = None) -> None:
+    print(f"$ {' '.join(command)}")
+    subprocess.run(command, env = {**os.environ, **env}, cwd = cwd, check = True)
+
+
+def prefetch(pip: list[str], pip_requirements: list[str], npm: list[str], npm_projects: list[str],
+             cache_dir: Path = PACKAGE_CACHE_DIR) -> None:
+    """Download packages (and their dependencies) into the cache while online."""
+    env = package_env("shared", cache_dir)
+    wheels = env["PIP_FIND_LINKS"]
+    if pip or pip_requirements:
+        command = [sys.executable, "-m", "pip", "wheel", "--wheel-dir", wheels, *pip]
+        for requirements in pip_requirements:
+            command += ["-r", requirements]
+        _run(command, env)
+    if npm:
+        _run(["npm", "cache", "add", *npm], env)
+    for project in npm_projects:
+        # Resolve and download the project's full dependency tree without touching it.
+        with tempfile.TemporaryDirectory() as scratch:
+            for name in ("package.json", "package-lock.json"):
+                if (Path(project) / name).exists():
+                    shutil.copy(Path(project) / name, scratch)
+            _run(["npm", "install", "--ignore-scripts"], env, cwd = Path(scratch))
+
+
+def _size(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file()) if path.exists() else 0
+
+
+def status(cache_dir: Path = PACKAGE_CACHE_DIR) -> None:
+    cache_dir = Path(cache_dir).expanduser()
+    print(f"Package cache {cache_dir} (PACKAGE_CACHE={PACKAGE_CACHE})")
+    for name in ("wheels", "pip", "uv", "npm", "pnpm", "yarn"):
+        path = cache_dir / name
+        extra = f", {len(list(path.glob('*.whl')))} wheels" if name == "wheels" and path.exists() else ""
+        print(f"  {name:<7} {_size(path) / 1e6:>9.1f} MB{extra}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description = "Shared package cache for agent-created projects")
+    parser.add_argument("--cache-dir", type = Path, default = PACKAGE_CACHE_DIR, help = "Cache directory")
+    commands = parser.add_subparsers(dest = "command", required = True)
+    fetch = commands.add_parser("prefetch", help = "Download packages into the cache")
+    fetch.add_argument("--pip", nargs = "*", default = [], help = "pip requirement specifiers")
+    fetch.add_argument("--pip-requirements", nargs = "*", default = [], help = "requirements files")
+    fetch.add_argument("--npm", nargs = "*", default = [], help = "npm package specs")
+    fetch.add_argument("--npm-project", nargs = "*", default = [], help = "directories with a package.json")
+    commands.add_parser("status", help = "Show cache sizes")
+    args = parser.parse_args()
+
+    if args.command == "prefetch":
+        prefetch(args.pip, args.pip_requirements, args.npm, args.npm_project, args.cache_dir)
+    status(args.cache_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+# Hunk-based patch engine behind apply_unified_diff.
+# Accepts unified diffs (@@ -a,b +c,d @@ headers) and the apply_patch tool's V4A style
+# (@@ <anchor line> headers, or none). Each hunk's old side (context and - lines) is
+# located in the file:
+#   - near the line number in its header, shifted by the offset of the previous hunk, or
+#     after the anchor line, and never before the end of the previous hunk
+#   - exactly, then ignoring trailing whitespace, then ignoring indentation changes,
+#     then with up to MAX_FUZZ context lines dropped from each end (GNU patch's fuzz)
+# Candidate positions come from an index of the hunk's rarest line, so all hunks apply
+# in one pass over the file. If any hunk cannot be placed nothing is applied, and
+# PatchRejected lists each failed hunk with the line where the file stops matching.
+import re
+from dataclasses import dataclass, field
+from typing import Callable
+
+HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@ ?(.*)$")
+
+# Lines outside hunks that carry no content (git and V4A envelopes).
+ENVELOPE_PREFIXES = ("diff --git ", "index ", "new file mode", "deleted file mode", "similarity index",
+                     "rename from", "rename to", "*** Begin Patch", "*** End Patch", "*** Update File:",
+                     "*** Add File:", "*** Delete File:", "*** End of File", "*** Move to:")
+
+# Context lines that may be dropped from each end of a hunk that does not match otherwise,
+# for hunks with at least MIN_CONTEXT_FOR_FUZZ context lines; at least one always stays.
+MAX_FUZZ = 2
+MIN_CONTEXT_FOR_FUZZ = 3
+
+# Ways of comparing a hunk line with a file line, strictest first.
+MATCH_LEVELS: list[tuple[str, Callable[[str], str]]] = [
+    ("exact", lambda line: line),
+    ("trailing whitespace", str.rstrip),
+    ("whitespace", lambda line: " ".join(line.split())),
+]
+
+
+@dataclass
+class Hunk:
+    header: str
+    old_start: int | None = None
+    anchor: str = ""
+    ops: list[tuple[str, str]] = field(default_factory = list)
+    no_newline_at_end: bool = False
+
+    @property
+    def old(self) -> list[str]:
+        return [text for op, text in self.ops if op != "+"]
+
+    @property
+    def new(self) -> list[str]:
+        return [text for op, text in self.ops if op != "-"]
+
+    def trimmed(self, fuzz: int) -> tuple["Hunk", int]:
+        """The hunk with up to `fuzz` context lines dropped from each end, and how many
+        were dropped from the start."""
+        ops = list(self.ops)
+        for _ in range(fuzz):
+            if ops and ops[0][0] == " ":
+                ops.pop(0)
+        lead = len(self.ops) - len(ops)
+        for _ in range(fuzz):
+            if ops and ops[-1][0] == " ":
+                ops.pop()
+        old_start = self.old_start + lead if self.old_start else self.old_start
+        return Hunk(self.header, old_start, self.anchor, ops, self.no_newline_at_end), lead
+
+
+@dataclass
+class Reject:
+    index: int
+    header: str
+    reason: str
+
+    def __str__(self) -> str:
+        return f"hunk {self.index} ({self.header}): {self.reason}"
+
+
+class PatchRejected(ValueError):
+    def __init__(self, rejects: list[Reject], hunks: int):
+        self.rejects = rejects
+        self.hunks = hunks
+        lines = [f"{len(rejects)} of {hunks} hunk(s) rejected; no changes were applied:"]
+        lines += [f"  - {reject}" for reject in rejects]
+        super().__init__("\n".join(lines))
+
+
+@dataclass
+class PatchResult:
+    text: str
+    hunks: int
+    offsets: list[int]
+    fuzzy: list[str]
+
+
+def parse_hunks(diff: str) -> list[Hunk]:
+    lines = [line.rstrip("\r") for line in diff.split("\n")]
+    if lines and lines[-1] == "":
+        lines.pop()
+    hunks: list[Hunk] = []
+    current: Hunk | None = None
+    for i, line in enumerate(lines):
+        if line.startswith("@@"):
+            match = HUNK_HEADER.match(line)
+            if match:
+                # The text after a unified header's @@ is only a hint (function name), not an anchor.
+                current = Hunk(line, int(match.group(1)))
+            else:
+                current = Hunk(line, None, line[2:].strip().removesuffix("@@").strip())
+            hunks.append(current)
+        elif line.startswith(ENVELOPE_PREFIXES):
+            current = None if not line.startswith("*** End of File") else current
+        elif line.startswith("--- ") and i + 1 < len(lines) and lines[i + 1].startswith("+++ "):
+            current = None
+        elif line.startswith("+++ ") and i > 0 and lines[i - 1].startswith("--- "):
+            continue
+        elif line.startswith("\\"):
+            # "\ No newline at end of file" after a line of the new side
+            if current and current.ops and current.ops[-1][0] != "-":
+                current.no_newline_at_end = True
+        else:
+            if current is None:
+                # V4A chunk at the top of the file, before any @@ line.
+                current = Hunk("@@")
+                hunks.append(current)
+            op, text = (line[0], line[1:]) if line and line[0] in " +-" else (" ", line)
+            current.ops.append((op, text))
+    return [hunk for hunk in hunks if hunk.ops]
+
+
+class _Matcher:
+    """Line positions by normalized text, built per match level on first use."""
+
+    def __init__(self, lines: list[str]):
+        self.lines = lines
+        self._keys: dict[str, list[str]] = {}
+        self._index: dict[str, dict[str, list[int]]] = {}
+
+    def keys(self, level: str, normalize) -> list[str]:
+        if level not in self._keys:
+            self._keys[level] = [normalize(line) for line in self.lines]
+        return self._keys[level]
+
+    def positions(self, level: str, normalize) -> dict[str, list[int]]:
+        if level not in self._index:
+            index: dict[str, list[int]] = {}
+            for i, key in enumerate(self.keys(level, normalize)):
+                index.setdefault(key, []).append(i)
+            self._index[level] = index
+        return self._index[level]
+
+    def find(self, old: list[str], expected: int, lowest: int) -> tuple[int, str] | None:
+        """Start of the match for `old` nearest `expected` at or after `lowest`."""
+        for level, normalize in MATCH_LEVELS:
+            keys = self.keys(level, normalize)
+            index = self.positions(level, normalize)
+            wanted = [normalize(line) for line in old]
+            # Candidates come from the hunk line that occurs least often in the file.
+            pivot = min(range(len(wanted)), key = lambda j: len(index.get(wanted[j], ())))
+            best = None
+            for q in index.get(wanted[pivot], ()):
+                start = q - pivot
+                if start < lowest or start + len(old) > len(keys):
+                    continue
+                if best is not None and abs(start - expected) >= abs(best - expected):
+                    if start > expected:
+                        break
+                    continue
+                if keys[start:start + len(old)] == wanted:
+                    best = start
+            if best is not None:
+                return best, level
+        return None
+
+
+def _mismatch(lines: list[str], old: list[str], start: int) -> str:
+    """Where the file stops matching the hunk when it is placed at `start`."""
+    for j, expected in enumerate(old):
+        i = start + j
+        if i >= len(lines):
+            return f"file ends at line {len(lines)}, hunk expects {expected!r} at line {i + 1}"
+        if lines[i].strip() != expected.strip():
+            return f"line {i + 1} is {lines[i]!r}, hunk expects {expected!r}"
+    return f"context matches at line {start + 1} but overlaps the previous hunk"
+
+
+def apply_hunks(original: str, diff: str) -> PatchResult:
+    crlf = "\r\n" in original
+    text = original.replace("\r\n", "\n") if crlf else original
+    ends_with_newline = text.endswith("\n") or not text
+    lines = text[:-1].split("\n") if text.endswith("\n") else (text.split("\n") if text else [])
+
+    hunks = parse_hunks(diff)
+    matcher = _Matcher(lines)
+    placed: list[tuple[int, Hunk]] = []
+    rejects: list[Reject] = []
+    offsets: list[int] = []
+    fuzzy: list[str] = []
+    cursor = 0
+    offset = 0
+    for number, hunk in enumerate(hunks, start = 1):
+        lowest = cursor
+        if hunk.old_start is not None:
+            expected = max(hunk.old_start - 1 + offset, cursor)
+        elif hunk.anchor:
+            anchor = " ".join(hunk.anchor.split())
+            keys = matcher.keys("whitespace", MATCH_LEVELS[2][1])
+            hit = next((i for i in range(cursor, len(keys)) if keys[i] == anchor), None)
+            if hit is None:
+                rejects.append(Reject(number, hunk.header, f"anchor line {hunk.anchor!r} not found after line {cursor}"))
+                continue
+            # The anchor is usually the line just before the context, but may be its first line.
+            expected = lowest = hit
+        else:
+            expected = cursor
+
+        if not hunk.old:
+            # Pure insertion: after line old_start of a unified diff, after the anchor, or at the cursor.
+            at = hunk.old_start + offset if hunk.old_start is not None else (expected + 1 if hunk.anchor else expected)
+            at = min(max(at, cursor), len(lines))
+            placed.append((at, hunk))
+            cursor = at
+            continue
+
+        found = None
+        context = sum(op == " " for op, _ in hunk.ops)
+        for fuzz in range(MAX_FUZZ + 1):
+            candidate, lead = hunk.trimmed(fuzz) if fuzz else (hunk, 0)
+            if fuzz and (len(candidate.ops) == len(hunk.ops) or context < MIN_CONTEXT_FOR_FUZZ
+                         or not any(op == " " for op, _ in candidate.ops)):
+                break
+            found = matcher.find(candidate.old, expected + lead, lowest)
+            if found:
+                start, level = found
+                if fuzz or level != "exact":
+                    fuzzy.append(f"hunk {number}: matched ignoring {level if level != 'exact' else 'nothing'}"
+                                 + (f", {fuzz} context line(s) trimmed" if fuzz else ""))
+                hunk = candidate
+                break
+        if not found:
+            rejects.append(Reject(number, hunk.header, _mismatch(lines, hunk.old, min(expected, len(lines)))))
+            continue
+
+        if hunk.old_start is not None:
+            offsets.append(start - (hunk.old_start - 1))
+            offset = start - (hunk.old_start - 1)
+        placed.append((start, hunk))
+        cursor = start + len(hunk.old)
+
+    if rejects:
+        raise PatchRejected(rejects, len(hunks))
+
+    out: list[str] = []
+    position = 0
+    for start, hunk in placed:
+        out.extend(lines[position:start])
+        i = start
+        for op, content in hunk.ops:
+            if op == " ":
+                # Keep the file's own context line (it may differ in whitespace).
+                out.append(lines[i])
+                i += 1
+            elif op == "-":
+                i += 1
+            else:
+                out.append(content)
+        position = i
+    out.extend(lines[position:])
+
+    result = "\n".join(out)
+    no_newline = placed and placed[-1][1].no_newline_at_end and position == len(lines)
+    if out and ends_with_newline and not no_newline:
+        result += "\n"
+    if crlf:
+        result = result.replace("\n", "\r\n")
+    return PatchResult(result, len(hunks), offsets, fuzzy)
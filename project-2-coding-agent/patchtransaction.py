@@ -0,0 +1,225 @@
+# Atomic multi-file edits and an undo journal for WorkSpaceEditor's transactional mode.
+# The operations of one apply_patch turn are staged in an in-memory overlay (later
+# operations read earlier ones' results), and nothing on disk changes until commit():
+#   1. every new version is written to a temp file next to its target and fsynced
+#   2. the previous versions are saved to the journal (<workspace>/.patch-journal)
+#   3. temp files are renamed over their targets, removed files are unlinked, and the
+#      directories are fsynced; if a rename fails, the files already replaced are
+#      restored from the journal
+# If any operation fails the overlay is dropped and the workspace is untouched. The last
+# APPLY_PATCH_UNDO_DEPTH transactions stay in the journal and can be reverted:
+#
+#   python patchtransaction.py --list
+#   python patchtransaction.py --undo 2
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+
+APPLY_PATCH_UNDO_DEPTH = int(os.getenv("APPLY_PATCH_UNDO_DEPTH", "20"))
+
+# Workspace subdirectory holding the undo journal.
+JOURNAL_DIR = ".patch-journal"
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _fsync_dir(path: Path) -> None:
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _write_synced(path: Path, data: bytes) -> None:
+    with open(path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _replace_atomically(target: Path, data: bytes) -> None:
+    target.parent.mkdir(parents = True, exist_ok = True)
+    temp = target.with_name(f".{target.name}.{uuid.uuid4().hex[:8]}.tmp")
+    _write_synced(temp, data)
+    os.replace(temp, target)
+    _fsync_dir(target.parent)
+
+
+class PatchJournal:
+    """Previous versions of the files touched by the last `depth` transactions."""
+
+    def __init__(self, root: Path, depth: int = APPLY_PATCH_UNDO_DEPTH):
+        self.root = Path(root)
+        self.dir = self.root / JOURNAL_DIR
+        self.depth = depth
+
+    def entries(self) -> list[Path]:
+        """Transaction directories, oldest first."""
+        if not self.dir.exists():
+            return []
+        return sorted(path for path in self.dir.iterdir() if (path / "manifest.json").exists())
+
+    def record(self, changes: dict[Path, bytes | None], description: str) -> Path:
+        """Save the current version of every path in `changes` before it is replaced."""
+        entries = self.entries()
+        sequence = int(entries[-1].name.split("-")[0]) + 1 if entries else 1
+        entry = self.dir / f"{sequence:06d}-{time.strftime('%Y%m%d-%H%M%S')}"
+        entry.mkdir(parents = True)
+        files = []
+        for i, (path, after) in enumerate(changes.items()):
+            before = f"{i}.orig" if path.exists() else None
+            if before:
+                shutil.copy2(path, entry / before)
+            files.append({
+                "path": path.relative_to(self.root).as_posix(),
+                "before": before,
+                "after_sha256": _sha256(after) if after is not None else None,
+            })
+        manifest = {"description": description, "time": time.time(), "files": files}
+        _write_synced(entry / "manifest.json", json.dumps(manifest, indent = 2).encode())
+        _fsync_dir(entry)
+        return entry
+
+    def prune(self) -> None:
+        for entry in self.entries()[:-self.depth or None]:
+            shutil.rmtree(entry, ignore_errors = True)
+
+    def restore(self, entry: Path, force: bool = False) -> list[str]:
+        """Put back the versions saved in `entry` and drop it from the journal."""
+        manifest = json.loads((entry / "manifest.json").read_text())
+        if not force:
+            changed = []
+            for item in manifest["files"]:
+                path = self.root / item["path"]
+                current = _sha256(path.read_bytes()) if path.exists() else None
+                if current != item["after_sha256"]:
+                    changed.append(item["path"])
+            if changed:
+                raise RuntimeError(f"Cannot undo {entry.name}: changed since the patch: {', '.join(changed)} "
+                                   "(use force to overwrite)")
+        restored = []
+        for item in manifest["files"]:
+            path = self.root / item["path"]
+            if item["before"] is None:
+                path.unlink(missing_ok = True)
+            else:
+                _replace_atomically(path, (entry / item["before"]).read_bytes())
+            restored.append(item["path"])
+        shutil.rmtree(entry)
+        return restored
+
+    def undo(self, count: int = 1, force: bool = False) -> list[str]:
+        """Revert the last `count` transactions, newest first."""
+        restored = []
+        for entry in reversed(self.entries()[-count:]):
+            restored += self.restore(entry, force = force)
+        return restored
+
+
+class PatchTransaction:
+    """Staged edits under `root`; see the module comment for the commit protocol."""
+
+    def __init__(self, root: Path, journal: PatchJournal | None = None):
+        self.root = Path(root)
+        self.journal = journal
+        self.staged: dict[Path, bytes | None] = {}
+        self.operations: list[str] = []
+        self.failed = False
+
+    def exists(self, path: Path) -> bool:
+        if path in self.staged:
+            return self.staged[path] is not None
+        return path.exists()
+
+    def read_text(self, path: Path) -> str:
+        if path in self.staged:
+            if self.staged[path] is None:
+                raise FileNotFoundError(f"{path} was deleted earlier in this patch")
+            return self.staged[path].decode("utf-8")
+        return path.read_text(encoding = "utf-8")
+
+    def write_text(self, path: Path, text: str, operation: str) -> None:
+        self.staged[path] = text.encode("utf-8")
+        self.operations.append(operation)
+
+    def delete(self, path: Path, operation: str) -> None:
+        if not self.exists(path):
+            raise FileNotFoundError(f"{path} does not exist")
+        self.staged[path] = None
+        self.operations.append(operation)
+
+    def commit(self) -> Path | None:
+        """Apply the staged edits; returns the journal entry (None if nothing changed)."""
+        changes = {path: data for path, data in self.staged.items()
+                   if data is not None or path.exists()}
+        if not changes:
+            return None
+        temps: dict[Path, Path] = {}
+        try:
+            for path, data in changes.items():
+                if data is None:
+                    continue
+                path.parent.mkdir(parents = True, exist_ok = True)
+                temp = path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+                temps[path] = temp
+                _write_synced(temp, data)
+            entry = self.journal.record(changes, "; ".join(self.operations)) if self.journal else None
+        except BaseException:
+            for temp in temps.values():
+                temp.unlink(missing_ok = True)
+            raise
+
+        try:
+            for path, data in changes.items():
+                if data is None:
+                    path.unlink()
+                else:
+                    os.replace(temps.pop(path), path)
+            for parent in {path.parent for path in changes}:
+                _fsync_dir(parent)
+        except BaseException:
+            for temp in temps.values():
+                temp.unlink(missing_ok = True)
+            if entry is not None:
+                self.journal.restore(entry, force = True)
+            raise
+        if self.journal:
+            self.journal.prune()
+        return entry
+
+
+def main() -> None:
+    from prequisites import workspace_dir
+
+    parser = argparse.ArgumentParser(description = "List or undo apply_patch transactions in the workspace")
+    parser.add_argument("--root", type = Path, default = workspace_dir, help = "Workspace directory")
+    parser.add_argument("--list", action = "store_true", help = "List journaled transactions")
+    parser.add_argument("--undo", type = int, metavar = "N", help = "Revert the last N transactions")
+    parser.add_argument("--force", action = "store_true", help = "Undo even if files changed since")
+    args = parser.parse_args()
+
+    journal = PatchJournal(args.root.resolve())
+    if args.undo:
+        for path in journal.undo(args.undo, force = args.force):
+            print(f"Restored {path}")
+        return
+    for entry in journal.entries():
+        manifest = json.loads((entry / "manifest.json").read_text())
+        print(f"{entry.name}  {manifest['description']}")
+
+
+if __name__ == "__main__":
+    main()
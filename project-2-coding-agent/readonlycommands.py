@@ -0,0 +1,171 @@
+# Conservative classifier for shell commands that only read: ShellExecutor may run these
+# concurrently. A command counts as read-only only if every part of it (pipelines, &&,
+# ||, ;) is a known inspection command with no writing options, and it has no output
+# redirection, command substitution or background job. Anything unrecognized is treated
+# as mutating and keeps its serial slot.
+import shlex
+
+# Programs that do not write files or change shell state, unless given one of their
+# WRITE_FLAGS or (SINGLE_OPERAND) an output file operand.
+READ_ONLY_PROGRAMS = {
+    "cat", "head", "tail", "ls", "tree", "wc", "stat", "file", "du", "df", "pwd", "echo",
+    "printf", "grep", "egrep", "fgrep", "rg", "ag", "diff", "cmp", "which", "type", "whoami",
+    "uname", "date", "basename", "dirname", "realpath", "readlink", "true", "false", "test",
+    "[", "nl", "cut", "tr", "column", "md5sum", "sha1sum", "sha256sum", "jq", "less", "more",
+    "od", "xxd", "hexdump", "strings", "printenv", "sleep", "sort",
+}
+
+# Options that write a file, run another program or change state. Short options also
+# match when bundled or with the value attached (tree -ao out, sort -oout), long options
+# also when abbreviated (sort --out=x).
+WRITE_FLAGS = {
+    "tree": ("-o", "-R"),           # output file; -R writes 00Tree.html files
+    "file": ("-C", "--compile"),    # compiles magic.mgc
+    "rg": ("--pre",),               # runs a preprocessor program
+    "ag": ("--pager",),
+    "date": ("-s", "--set"),        # sets the clock
+    "printf": ("-v",),              # assigns a shell variable
+    "sort": ("-o", "--output", "--compress-program"),
+    "less": ("-o", "-O", "--log-file", "--LOG-FILE"),
+}
+
+# Programs that write their second operand (xxd in out).
+SINGLE_OPERAND = {"xxd"}
+
+# sed commands that write a file (w, W) or run one (e); the script is rejected if it has
+# these letters anywhere, which also turns away some harmless scripts (/error/p).
+SED_WRITE_COMMANDS = set("wWe")
+
+# Read-only git subcommands.
+READ_ONLY_GIT = {"status", "diff", "log", "show", "ls-files", "rev-parse", "blame", "grep", "describe", "shortlog"}
+
+# find actions that write or run other programs.
+FIND_WRITE_ACTIONS = {"-delete", "-exec", "-execdir", "-ok", "-okdir", "-fprint", "-fprint0", "-fprintf", "-fls"}
+
+# Control operators that separate simple commands. "&" (background) is excluded.
+SEPARATORS = {"|", "||", "&&", ";", ";;"}
+
+
+def _has_flag(args: list[str], flag: str) -> bool:
+    for arg in args:
+        if flag.startswith("--"):
+            name = arg.partition("=")[0]
+            if len(name) > 2 and flag.startswith(name):
+                return True
+        elif arg.startswith("-") and not arg.startswith("--") and flag[1] in arg[1:]:
+            return True
+    return False
+
+
+def _sed_read_only(args: list[str]) -> bool:
+    scripts, operands, rest = [], [], iter(args)
+    for arg in rest:
+        if arg in ("-e", "--expression"):
+            scripts.append(next(rest, ""))
+        elif arg.startswith("--expression="):
+            scripts.append(arg.partition("=")[2])
+        elif arg.startswith("--"):
+            if arg.startswith(("--in-place", "--file")):
+                return False
+        elif arg.startswith("-") and len(arg) > 1:
+            # -i edits in place, -f reads the script from a file; -e with the script
+            # attached (-e1p, -ne 1p) is not worth telling apart.
+            if set(arg[1:]) & set("ief"):
+                return False
+        else:
+            operands.append(arg)
+    scripts = scripts or operands[:1]
+    return "-n" in args and bool(scripts) and not any(set(script) & SED_WRITE_COMMANDS for script in scripts)
+
+
+def _unquoted_newlines_to_separators(command: str) -> str:
+    """Newlines end a command like ";" does, but shlex would read them as spaces."""
+    out, quote, escaped = [], None, False
+    for char in command:
+        if escaped:
+            escaped = False
+        elif char == "\\" and quote != "'":
+            escaped = True
+        elif quote:
+            if char == quote:
+                quote = None
+        elif char in "'\"":
+            quote = char
+        elif char == "\n":
+            char = " ; "
+        out.append(char)
+    return "".join(out)
+
+
+def _simple_read_only(words: list[str]) -> bool:
+    if not words:
+        return False
+    program, args = words[0], words[1:]
+    if program in READ_ONLY_PROGRAMS:
+        if any(_has_flag(args, flag) for flag in WRITE_FLAGS.get(program, ())):
+            return False
+        return program not in SINGLE_OPERAND or len([arg for arg in args if not arg.startswith("-")]) <= 1
+    if program == "find":
+        return not any(arg in FIND_WRITE_ACTIONS for arg in args)
+    if program == "git":
+        # Skip global options and the value of -C <dir>; -c can define aliases that run anything.
+        rest = iter(args)
+        subcommand = None
+        for arg in rest:
+            if arg == "-c":
+                return False
+            if arg == "-C":
+                next(rest, None)
+            elif not arg.startswith("-"):
+                subcommand = arg
+                break
+        # --output writes a file; git grep -O opens matches in a pager or editor.
+        return subcommand in READ_ONLY_GIT and "--output" not in " ".join(args) \
+            and not any(arg == "-O" or arg.startswith("--open-files-in-pager") for arg in args)
+    if program == "sed":
+        return _sed_read_only(args)
+    if program == "uniq":
+        # uniq in out writes out.
+        return len([arg for arg in args if not arg.startswith("-")]) <= 1
+    return False
+
+
+def simple_commands(command: str) -> list[list[str]] | None:
+    """
+    The words of each simple command in `command`, or None if it has anything other
+    than pipes, &&, ||, ; and input redirection (output redirection, substitution,
+    background jobs, VAR=value prefixes) or cannot be parsed.
+    """
+    if any(token in command for token in ("`", "$(", "<(", ">(")):
+        return None
+    lexer = shlex.shlex(_unquoted_newlines_to_separators(command), posix = True, punctuation_chars = True)
+    lexer.whitespace_split = True
+    lexer.commenters = ""
+    try:
+        tokens = list(lexer)
+    except ValueError:
+        return None
+
+    commands: list[list[str]] = []
+    words: list[str] = []
+    for token in tokens:
+        if token in SEPARATORS:
+            commands.append(words)
+            words = []
+        elif set(token) <= set("<>&|;()"):
+            # Redirection or other operator: reading from a file is fine, nothing else is.
+            if token != "<":
+                return None
+        elif not words and "=" in token:
+            # VAR=value prefix
+            return None
+        else:
+            words.append(token)
+    commands.append(words)
+    return commands
+
+
+def is_read_only(command: str) -> bool:
+    """True if `command` can run concurrently with other read-only commands."""
+    commands = simple_commands(command)
+    return commands is not None and all(_simple_read_only(words) for words in commands)
@@ -1,8 +1,9 @@
 import os
 import asyncio
+import signal
 from collections.abc import Sequence
 from pathlib import Path
-from typing import Literal
+from typing import Callable, Literal
 
 from agents import (
     ShellTool,
@@ -12,6 +13,21 @@ from agents import (
     ShellResult
 )
 
+from commandcache import certainly_read_only, command_cache
+from outputcapture import LOG_DIR, SHELL_OUTPUT_HEAD_BYTES, SHELL_OUTPUT_TAIL_BYTES, OutputCapture
+from packagecache import package_env
+from readonlycommands import is_read_only
+from shellsession import ShellSessionError, get_session
+
+# Called as output_logger(stream, line) for each line of command output as it arrives
+# ("stdout" or "stderr"); main.py sets it to print live output to the console.
+output_logger: Callable[[str, str], None] | None = None
+
+
+def set_output_logger(logger: Callable[[str, str], None] | None) -> None:
+    global output_logger
+    output_logger = logger
+
 
 async def require_approval(commands: Sequence[str]) -> None:
     """
@@ -35,58 +51,194 @@ class ShellExecutor:
     """
     Shell executor for notebook cookbook.
     Runs all commands inside a workspace directory.
-    Captures stdout and stderr for each command.
+    Captures stdout and stderr for each command, streaming: output past the head/tail
+    byte caps goes to a log file in the workspace (see outputcapture.py), and each line
+    is passed to output_logger as it arrives.
     Enforces an optionals timeout from action.timeout_ms
     Returns a ShellResult with ShellCommandOutput  entries using Shellcalloutcome
+
+    With session = True (or SHELL_SESSION=1) commands run in one long-lived shell per
+    workspace (see shellsession.py), so cd/export/venv activation persist between
+    commands and calls. If that shell cannot be started the command runs one-shot; if a
+    command ends the shell (exit, set -e) the next command starts a fresh one.
+
+    With parallel = N > 1 (or SHELL_PARALLEL=N) consecutive read-only commands (cat,
+    ls, grep, git status, ...) run up to N at a time; outputs keep the input order and
+    every other command still runs alone, in order.
+
+    With cache = True (or SHELL_CACHE=1) repeated read-only commands return their
+    previous output while nothing they read has changed (see commandcache.py).
     """
 
-    def __init__(self, cwd: Path):
+    def __init__(self, cwd: Path, session: bool | None = None, parallel: int | None = None,
+                 cache: bool | None = None):
         self.cwd = cwd
+        # Child processes see the shared package cache (PACKAGE_CACHE, see packagecache.py).
+        self.package_env = package_env()
+        if session is None:
+            session = os.environ.get("SHELL_SESSION") == "1"
+        self.session = get_session(cwd, env = {**os.environ, **self.package_env}) if session else None
+        self.parallel = parallel if parallel is not None else int(os.environ.get("SHELL_PARALLEL", "1"))
+        if cache is None:
+            cache = os.environ.get("SHELL_CACHE") == "1"
+        self.cache = command_cache if cache else None
 
     async def __call__(self, request: ShellCommandRequest) -> ShellResult:
         action = request.data.action
         await require_approval(action.commands)
 
         outputs: list[ShellCommandOutput] = []
+        timeout = (action.timeout_ms or 0) / 1000 or None
 
-        for command in action.commands:
-            proc = await asyncio.create_subprocess_shell(
-                command,
-                cwd = self.cwd,
-                env =os.environ.copy(),
-                stdout = asyncio.subprocess.PIPE,
-                stderr = asyncio.subprocess.PIPE,
-            )
+        for batch in self._batches(action.commands):
+            if len(batch) == 1:
+                results = [await self._run_command(batch[0], timeout, action.max_output_length)]
+            else:
+                results = await self._run_concurrently(batch, timeout, action.max_output_length)
 
             timed_out = False
-            try:
-                timeout = (action.timeout_ms or 0) / 1000 or None
-                stdout_bytes, stderr_bytes = await asyncio.wait_for(
-                    proc.communicate(),
-                    timeout = timeout,
-                )
-            except asyncio.TimeoutError:
-                proc.kill()
-                stdout_bytes, stderr_bytes = await proc.communicate()
-                timed_out = True
-
-            stdout  = stdout_bytes.decode("utf-8", errors="ignore")
-            stderr = stderr_bytes.decode("utf-8", errors="ignore")
-
-            outcome = ShellCallOutcome(
-                type = "timeout" if timed_out else "exit",
-                exit_code = getattr(proc, "returncode", None),
-            )
-
-            outputs.append(ShellCommandOutput(
-                stdout = stdout,
-                stderr = stderr,
-                outcome = outcome,
-            ))
-
+            for output in results:
+                outputs.append(output)
+                # Same as running in order: nothing after the first timeout is reported.
+                if output.outcome.type == "timeout":
+                    timed_out = True
+                    break
             if timed_out:
                 break
 
-        return ShellResult(output = outputs, provider_data = {"working_dir": str(self.cwd)},
+        working_dir = self.session.cwd if self.session is not None else self.cwd
+        return ShellResult(output = outputs, provider_data = {"working_dir": str(working_dir)},
         )
 
+    def _batches(self, commands: Sequence[str]) -> list[list[str]]:
+        """
+        Group consecutive read-only commands (see readonlycommands.py) so they can run
+        together; every other command is a batch of its own, which keeps it ordered
+        after everything before it and before everything after it.
+        """
+        if self.parallel <= 1:
+            return [[command] for command in commands]
+        batches: list[list[str]] = []
+        for command in commands:
+            if is_read_only(command) and batches and is_read_only(batches[-1][-1]):
+                batches[-1].append(command)
+            else:
+                batches.append([command])
+        return batches
+
+    async def _run_concurrently(self, commands: list[str], timeout: float | None,
+                                max_output_length: int | None) -> list[ShellCommandOutput]:
+        """
+        Run read-only commands at most self.parallel at a time, results in input order.
+        They run one-shot, in the session's current directory when there is a session.
+        """
+        semaphore = asyncio.Semaphore(self.parallel)
+        cwd = self.session.cwd if self.session is not None else self.cwd
+
+        async def run(command: str) -> ShellCommandOutput:
+            async with semaphore:
+                return await self._run_command(command, timeout, max_output_length, cwd = cwd)
+
+        return await asyncio.gather(*(run(command) for command in commands))
+
+    async def _run_command(self, command: str, timeout: float | None, max_output_length: int | None,
+                           cwd: Path | None = None) -> ShellCommandOutput:
+        """Run one command, in the session unless `cwd` asks for a one-shot run there."""
+        key = None
+        if self.cache is not None:
+            key = self.cache.key(command, cwd or (self.session.cwd if self.session is not None else self.cwd))
+            cached = self.cache.get(key) if key is not None else None
+            if cached is not None:
+                print(f"[shell] cached: {command}")
+                return cached
+
+        stdout, stderr = self._captures(max_output_length)
+        try:
+            if self.session is not None and cwd is None:
+                exit_code, timed_out = await self._run_in_session(command, timeout, stdout, stderr)
+            else:
+                exit_code, timed_out = await self._run_oneshot(command, timeout, stdout, stderr, cwd = cwd)
+        finally:
+            stdout.close()
+            stderr.close()
+
+        outcome = ShellCallOutcome(
+            type = "timeout" if timed_out else "exit",
+            exit_code = exit_code,
+        )
+
+        output = ShellCommandOutput(
+            stdout = stdout.text(),
+            stderr = stderr.text(),
+            outcome = outcome,
+        )
+        if key is not None and not timed_out:
+            self.cache.put(key, output)
+        elif not certainly_read_only(command):
+            # The command may have changed files (or we cannot tell): cached results of
+            # any executor are stale.
+            command_cache.invalidate()
+        return output
+
+    def _captures(self, max_output_length: int | None) -> tuple[OutputCapture, OutputCapture]:
+        """
+        Bounded stdout/stderr captures for one command. Each keeps head + tail bytes
+        (half of max_output_length each when the model asks for a limit) and spills
+        anything longer to a log under <workspace>/.shell-logs.
+        """
+        if max_output_length:
+            head = tail = max_output_length // 2
+        else:
+            head, tail = SHELL_OUTPUT_HEAD_BYTES, SHELL_OUTPUT_TAIL_BYTES
+        log_dir = Path(self.cwd) / LOG_DIR
+
+        def line_logger(stream: str):
+            if output_logger is None:
+                return None
+            return lambda line: output_logger(stream, line)
+
+        return (
+            OutputCapture(log_dir, "stdout", head, tail, on_line = line_logger("stdout")),
+            OutputCapture(log_dir, "stderr", head, tail, on_line = line_logger("stderr")),
+        )
+
+    async def _run_oneshot(self, command: str, timeout: float | None,
+                           stdout: OutputCapture, stderr: OutputCapture, cwd: Path | None = None):
+        proc = await asyncio.create_subprocess_shell(
+            command,
+            cwd = cwd or self.cwd,
+            env = {**os.environ, **self.package_env},
+            stdout = asyncio.subprocess.PIPE,
+            stderr = asyncio.subprocess.PIPE,
+            start_new_session = True,
+        )
+
+        async def pump(stream: asyncio.StreamReader, capture: OutputCapture) -> None:
+            while chunk := await stream.read(65536):
+                capture.feed(chunk)
+
+        done = asyncio.gather(pump(proc.stdout, stdout), pump(proc.stderr, stderr), proc.wait())
+        timed_out = False
+        try:
+            await asyncio.wait_for(asyncio.shield(done), timeout = timeout)
+        except asyncio.TimeoutError:
+            # Kill the whole process group, so children holding the pipes go too.
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            await done
+            timed_out = True
+
+        return getattr(proc, "returncode", None), timed_out
+
+    async def _run_in_session(self, command: str, timeout: float | None,
+                              stdout: OutputCapture, stderr: OutputCapture):
+        try:
+            result = await self.session.run(command, timeout = timeout, on_stdout = stdout.feed, on_stderr = stderr.feed)
+        except ShellSessionError as e:
+            print(f"[shell] session unavailable ({e}); running one-shot")
+            return await self._run_oneshot(command, timeout, stdout, stderr)
+        if result.session_died:
+            print(f"[shell] session shell exited (code {result.exit_code}); the next command starts a new one")
+        return result.exit_code, result.timed_out
@@ -0,0 +1,202 @@
+# Persistent shell for ShellExecutor's session mode (SHELL_SESSION=1).
+# One bash process per workspace runs every command, so state set by one command (cd,
+# export, source venv/bin/activate) is still there for the next, and a command costs a
+# pipe write instead of a fork/exec of a fresh shell.
+import asyncio
+import os
+import shlex
+import signal
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+
+class ShellSessionError(RuntimeError):
+    """The session shell could not be started."""
+
+
+@dataclass
+class SessionCommandResult:
+    stdout: bytes
+    stderr: bytes
+    exit_code: int | None
+    timed_out: bool = False
+    session_died: bool = False
+
+
+class _SessionDied(Exception):
+    pass
+
+
+async def read_until_marker(stream: asyncio.StreamReader, marker: bytes, sink: Callable[[bytes], None],
+                            chunk_size: int = 65536) -> bytes:
+    """
+    Pass everything before `marker` to `sink` as it arrives and return the rest of the
+    marker line. Bytes that could be the start of the marker are held back until the
+    next read decides. Raises _SessionDied on EOF.
+    """
+    pending = b""
+    while True:
+        chunk = await stream.read(chunk_size)
+        if not chunk:
+            if pending:
+                sink(pending)
+            raise _SessionDied()
+        pending += chunk
+        index = pending.find(marker)
+        if index >= 0:
+            if index:
+                sink(pending[:index])
+            rest = pending[index + len(marker):]
+            while b"\n" not in rest:
+                more = await stream.read(chunk_size)
+                if not more:
+                    raise _SessionDied()
+                rest += more
+            return rest.split(b"\n", 1)[0]
+        keep = len(marker) - 1
+        if len(pending) > keep:
+            sink(pending[:-keep])
+            pending = pending[-keep:]
+
+
+class ShellSession:
+    """
+    Long-lived bash process for one workspace.
+     - `cd`, exported variables and activated virtualenvs carry over between commands
+     - each command is framed by sentinel lines carrying its exit code and the new $PWD
+     - on timeout the command gets SIGINT (the shell traps it and survives); if it is
+       still running after `interrupt_grace` seconds the whole session is killed and the
+       next command starts a fresh shell
+    """
+
+    def __init__(self, root: Path, shell: str = "/bin/bash", interrupt_grace: float = 2.0,
+                 env: dict[str, str] | None = None):
+        self.root = Path(root)
+        self.env = env
+        self.cwd = self.root
+        self.shell = shell
+        self.interrupt_grace = interrupt_grace
+        self.commands_run = 0
+        self.restarts = 0
+        self._proc: asyncio.subprocess.Process | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._lock: asyncio.Lock | None = None
+
+    @property
+    def alive(self) -> bool:
+        return self._proc is not None and self._proc.returncode is None
+
+    async def _ensure_started(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self.alive and self._loop is loop:
+            return
+        if self._proc is not None:
+            # Died, or belongs to an event loop that is gone (each asyncio.run is a new loop).
+            self.kill()
+            self.restarts += 1
+        try:
+            self._proc = await asyncio.create_subprocess_exec(
+                self.shell, "--noprofile", "--norc",
+                cwd = self.root,
+                env = self.env if self.env is not None else os.environ.copy(),
+                stdin = asyncio.subprocess.PIPE,
+                stdout = asyncio.subprocess.PIPE,
+                stderr = asyncio.subprocess.PIPE,
+                start_new_session = True,
+            )
+        except OSError as e:
+            self._proc = None
+            raise ShellSessionError(f"cannot start {self.shell}: {e}") from e
+        self._loop = loop
+        self.cwd = self.root
+        # The shell survives SIGINT; the command it runs does not (traps are not inherited).
+        self._proc.stdin.write(b"trap ':' INT\n")
+        await self._proc.stdin.drain()
+
+    async def run(self, command: str, timeout: float | None = None,
+                  on_stdout: Callable[[bytes], None] | None = None,
+                  on_stderr: Callable[[bytes], None] | None = None) -> SessionCommandResult:
+        """
+        Run one command in the session. Output goes to on_stdout/on_stderr as it arrives
+        when given, otherwise it is collected into the result.
+        """
+        if self._lock is None or self._loop is not asyncio.get_running_loop():
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            await self._ensure_started()
+            return await self._run(command, timeout, on_stdout, on_stderr)
+
+    async def _run(self, command, timeout, on_stdout, on_stderr) -> SessionCommandResult:
+        proc = self._proc
+        marker = f"__SHELL_SESSION_{uuid.uuid4().hex}__".encode()
+        stdout, stderr = bytearray(), bytearray()
+        script = (
+            f"eval {shlex.quote(command)} </dev/null\n"
+            f"builtin printf '\\n%s %d %s\\n' '{marker.decode()}' \"$?\" \"$PWD\"; "
+            f"builtin printf '\\n%s\\n' '{marker.decode()}' >&2\n"
+        )
+        proc.stdin.write(script.encode())
+        await proc.stdin.drain()
+        self.commands_run += 1
+
+        reader = asyncio.gather(
+            read_until_marker(proc.stdout, b"\n" + marker, on_stdout or stdout.extend),
+            read_until_marker(proc.stderr, b"\n" + marker, on_stderr or stderr.extend),
+        )
+        timed_out = False
+        done, _ = await asyncio.wait({reader}, timeout = timeout)
+        if not done:
+            timed_out = True
+            self._signal(signal.SIGINT)
+            done, _ = await asyncio.wait({reader}, timeout = self.interrupt_grace)
+            if not done:
+                self.kill()
+        try:
+            status, _ = await reader
+        except _SessionDied:
+            exit_code = await proc.wait()
+            return SessionCommandResult(bytes(stdout), bytes(stderr), exit_code, timed_out, session_died = True)
+
+        exit_text, _, pwd = status.decode("utf-8", errors = "replace").strip().partition(" ")
+        if pwd:
+            self.cwd = Path(pwd)
+        return SessionCommandResult(bytes(stdout), bytes(stderr), int(exit_text), timed_out)
+
+    def _signal(self, sig: int) -> None:
+        try:
+            os.killpg(self._proc.pid, sig)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    def kill(self) -> None:
+        if self._proc is not None and self._proc.returncode is None:
+            self._signal(signal.SIGKILL)
+
+    async def close(self) -> None:
+        if self.alive:
+            self._proc.stdin.write(b"exit 0\n")
+            try:
+                await asyncio.wait_for(self._proc.wait(), timeout = 2)
+            except asyncio.TimeoutError:
+                self.kill()
+        self._proc = None
+
+
+_sessions: dict[Path, ShellSession] = {}
+
+
+def get_session(root: Path, env: dict[str, str] | None = None) -> ShellSession:
+    """One session per workspace directory, shared by every executor for that workspace.
+    `env` is the environment of the shell (os.environ when None)."""
+    root = Path(root).resolve()
+    if root not in _sessions:
+        _sessions[root] = ShellSession(root, env = env)
+    return _sessions[root]
+
+
+async def reset_sessions() -> None:
+    """Close every session; each starts again, fresh and in its root, on its next command."""
+    for session in _sessions.values():
+        await session.close()
@@ -0,0 +1,217 @@
+# Copy-on-write snapshots of the workspace, so that a run can be retried or branched
+# from a known state without copying node_modules every time.
+#   create   a file unchanged since the previous snapshot (same size and mtime) is
+#            hardlinked to that snapshot's copy; other files are reflinked where the file
+#            system supports it (btrfs, xfs) and copied elsewhere. After the first
+#            snapshot, new data is only written for changed files.
+#   restore  makes the workspace equal to a snapshot, touching only files that differ
+# Hardlinks only ever join snapshots to each other, never to the workspace, so an
+# in-place write in the workspace (echo >> file, an install script patching a file)
+# cannot reach a snapshot.
+# Snapshots live next to the workspace (same file system, so links work):
+#
+#   WORKSPACE_SNAPSHOT_DIR   default <workspace parent>/.workspace-snapshots/<workspace name>
+#
+#   python snapshots.py list | create [name] | restore <name> | delete <name>
+import argparse
+import errno
+import fcntl
+import os
+import shutil
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from stat import S_IFMT, S_ISDIR, S_ISLNK, S_ISREG
+
+# ioctl that clones a file's extents (Linux reflink).
+FICLONE = 0x40049409
+
+
+@dataclass
+class SnapshotStats:
+    name: str
+    files: int = 0
+    unchanged: int = 0
+    reflinked: int = 0
+    copied: int = 0
+    removed: int = 0
+    written: int = 0        # bytes of file data copied (reflinks and links share data)
+    seconds: float = 0.0
+
+    def __str__(self) -> str:
+        parts = [f"{self.files} files", f"{self.unchanged} unchanged"]
+        parts += [f"{n} {label}" for n, label in ((self.reflinked, "reflinked"), (self.copied, "copied"),
+                                                   (self.removed, "removed")) if n]
+        parts.append(f"{self.written / 1024:,.0f} KB written")
+        return f"{self.name}: {', '.join(parts)} in {self.seconds:.2f}s"
+
+
+def _same(a: os.stat_result, b: os.stat_result) -> bool:
+    return a.st_size == b.st_size and a.st_mtime_ns == b.st_mtime_ns
+
+
+def _tree(root: Path) -> dict[Path, os.stat_result]:
+    """lstat of every directory, file and symlink under root, by relative path; parents
+    come before their contents."""
+    tree = {}
+    pending = [Path(".")]
+    while pending:
+        relative = pending.pop()
+        with os.scandir(root / relative) as entries:
+            for entry in entries:
+                path = relative / entry.name
+                tree[path] = entry.stat(follow_symlinks = False)
+                if entry.is_dir(follow_symlinks = False):
+                    pending.append(path)
+    return tree
+
+
+class WorkspaceSnapshots:
+    def __init__(self, workspace: Path, store: Path | None = None):
+        self.workspace = Path(workspace).resolve()
+        default = self.workspace.parent / ".workspace-snapshots" / self.workspace.name
+        self.store = Path(store or os.getenv("WORKSPACE_SNAPSHOT_DIR") or default)
+        self._reflink = True
+
+    def names(self) -> list[str]:
+        """Snapshot names, oldest first."""
+        if not self.store.exists():
+            return []
+        return [p.name for p in sorted(self.store.iterdir(), key = lambda p: p.stat().st_mtime_ns)
+                if p.is_dir() and not p.name.startswith(".")]
+
+    def path(self, name: str) -> Path:
+        path = self.store / name
+        if not path.is_dir():
+            raise ValueError(f"No snapshot {name!r} (have: {', '.join(self.names()) or 'none'})")
+        return path
+
+    def _materialize(self, source: Path, target: Path, stats: SnapshotStats) -> None:
+        """Put a copy of source at target that shares no inode with it."""
+        if self._reflink:
+            try:
+                with open(source, "rb") as src, open(target, "wb") as dst:
+                    fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+                shutil.copystat(source, target)
+                stats.reflinked += 1
+                return
+            except OSError as e:
+                target.unlink(missing_ok = True)
+                if e.errno not in (errno.EOPNOTSUPP, errno.ENOTTY, errno.EXDEV, errno.EINVAL, errno.ENOSYS):
+                    raise
+                self._reflink = False
+        shutil.copy2(source, target)
+        stats.copied += 1
+        stats.written += os.path.getsize(target)
+
+    def create(self, name: str | None = None) -> SnapshotStats:
+        start = time.perf_counter()
+        previous = self.names()
+        name = name or time.strftime("%Y%m%d-%H%M%S")
+        target_root = self.store / name
+        if target_root.exists():
+            raise ValueError(f"Snapshot {name!r} already exists")
+        base = self.store / previous[-1] if previous else None
+        base_tree = _tree(base) if base is not None else {}
+        stats = SnapshotStats(name)
+        partial = self.store / f".{name}.partial"
+        shutil.rmtree(partial, ignore_errors = True)
+        partial.mkdir(parents = True)
+        try:
+            for relative, stat in _tree(self.workspace).items():
+                source, target = self.workspace / relative, partial / relative
+                if S_ISDIR(stat.st_mode):
+                    target.mkdir()
+                    continue
+                stats.files += 1
+                if S_ISLNK(stat.st_mode):
+                    os.symlink(os.readlink(source), target)
+                    continue
+                old = base_tree.get(relative)
+                if old is not None and S_ISREG(old.st_mode) and _same(old, stat):
+                    os.link(base / relative, target)
+                    stats.unchanged += 1
+                    continue
+                self._materialize(source, target, stats)
+            partial.rename(target_root)
+        except BaseException:
+            shutil.rmtree(partial, ignore_errors = True)
+            raise
+        stats.seconds = time.perf_counter() - start
+        return stats
+
+    def restore(self, name: str) -> SnapshotStats:
+        """Make the workspace match snapshot `name`."""
+        start = time.perf_counter()
+        snapshot = self.path(name)
+        stats = SnapshotStats(name)
+        current = _tree(self.workspace)
+        wanted = _tree(snapshot)
+        # Remove what the snapshot does not have (or has as another kind of entry).
+        for relative, stat in current.items():
+            want = wanted.get(relative)
+            if want is not None and S_IFMT(want.st_mode) == S_IFMT(stat.st_mode):
+                continue
+            path = self.workspace / relative
+            if not os.path.lexists(path):
+                continue    # inside a directory removed already
+            if S_ISDIR(stat.st_mode):
+                shutil.rmtree(path)
+            else:
+                path.unlink()
+            stats.removed += 1
+        for relative, want in wanted.items():
+            source, target = snapshot / relative, self.workspace / relative
+            have = current.get(relative)
+            if have is not None and S_IFMT(have.st_mode) != S_IFMT(want.st_mode):
+                have = None
+            if S_ISDIR(want.st_mode):
+                if have is None:
+                    target.mkdir()
+                continue
+            stats.files += 1
+            if S_ISLNK(want.st_mode):
+                if have is not None and os.readlink(source) == os.readlink(target):
+                    stats.unchanged += 1
+                    continue
+                target.unlink(missing_ok = True)
+                os.symlink(os.readlink(source), target)
+                stats.copied += 1
+                continue
+            if have is not None:
+                if _same(have, want):
+                    stats.unchanged += 1
+                    continue
+                target.unlink()
+            self._materialize(source, target, stats)
+        stats.seconds = time.perf_counter() - start
+        return stats
+
+    def delete(self, name: str) -> None:
+        shutil.rmtree(self.path(name))
+
+
+def main() -> None:
+    from prequisites import workspace_dir
+
+    parser = argparse.ArgumentParser(description = "Copy-on-write snapshots of the coding agent workspace")
+    parser.add_argument("command", choices = ["list", "create", "restore", "delete"])
+    parser.add_argument("name", nargs = "?")
+    args = parser.parse_args()
+
+    snapshots = WorkspaceSnapshots(workspace_dir)
+    if args.command == "list":
+        for name in snapshots.names():
+            print(name)
+    elif args.command == "create":
+        print(snapshots.create(args.name))
+    elif not args.name:
+        parser.error(f"{args.command} needs a snapshot name")
+    elif args.command == "restore":
+        print(snapshots.restore(args.name))
+    else:
+        snapshots.delete(args.name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+from commandcache import CommandCache, certainly_read_only
+
+
+def test_multiline_commands_are_never_cached(tmp_path):
+    cache = CommandCache()
+    assert cache.key("cat a.txt", tmp_path) is not None
+    assert cache.key("cat a.txt\ntouch b", tmp_path) is None
+    assert cache.key("ls\ncat a.txt", tmp_path) is None
+    assert not certainly_read_only("ls\ncat a.txt")
+    assert not certainly_read_only("cat <(ls)")
@@ -0,0 +1,35 @@
+from readonlycommands import is_read_only, simple_commands
+
+
+def test_newline_separates_commands():
+    assert simple_commands("ls\nrm -rf build") == [["ls"], ["rm", "-rf", "build"]]
+    assert not is_read_only("ls\nrm -rf build")
+    assert not is_read_only("cat a.txt\ntouch b")
+    assert is_read_only("ls\ncat a.txt")
+
+
+def test_quoted_newline_stays_in_argument():
+    assert simple_commands("grep 'a\nb' f.txt") == [["grep", "a\nb", "f.txt"]]
+    assert not is_read_only("echo 'x\n' \nrm f")
+
+
+def test_write_flags():
+    for command in ("tree -o out.txt", "tree -ao out.txt", "xxd in.bin out.txt", "file -C -m magic",
+                    "rg --pre ./x foo", "rg --pre=./x foo", "date -s 12:00", "printf -v x hi",
+                    "sed -n 1wout f", "sed -n -e 's/a/b/w out' f", "sed -ne 1p f", "sed -n -f s.sed f",
+                    "git grep -O foo", "sort -o out.txt in.txt", "sort -uo out.txt in.txt",
+                    "sort -oout.txt in.txt", "sort --output=out.txt in.txt", "sort --out=out.txt in.txt",
+                    "sort --compress-program=sh f", "less -o log.txt f", "less -Olog.txt f",
+                    "less --log-file=log.txt f", "uniq in.txt out.txt"):
+        assert not is_read_only(command), command
+    for command in ("tree -L 2", "xxd in.bin", "file app.py", "rg --pretty foo", "date -u",
+                    "printf '%s' hi", "sed -n 1,20p app.py", "sed -n -e 1p app.py",
+                    "sort -u -k2 in.txt", "sort -t, -n in.txt", "less -N f", "uniq -c in.txt"):
+        assert is_read_only(command), command
+
+
+def test_sort_output_is_not_batched_with_reads():
+    from shellexecutor import ShellExecutor
+    executor = ShellExecutor.__new__(ShellExecutor)
+    executor.parallel = 4
+    assert executor._batches(["sort -uo out.txt in.txt", "cat out.txt"]) == [["sort -uo out.txt in.txt"], ["cat out.txt"]]
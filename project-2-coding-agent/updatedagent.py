@@ -4,6 +4,7 @@ from applypatchtool import WorkSpaceEditor, ApprovalTracker
 from agents import ApplyPatchTool
 from prequisites import workspace_dir
 from shellexecutor import ShellExecutor
+from workspaceindex import make_index_tools
 
 CONTEXT7_API_KEY = ""
 
@@ -26,7 +27,7 @@ context7_tool = HostedMCPTool(
 
 approvals = ApprovalTracker()
 
-editor = WorkSpaceEditor(root = workspace_dir, approvals = approvals, auto_approve = True)
+editor = WorkSpaceEditor(root = workspace_dir, approvals = approvals, auto_approve = True, transactional = True)
 
 apply_patch_tool = ApplyPatchTool(editor = editor)
 
@@ -36,8 +37,11 @@ You are a coding assistant helping a user with an existing project.
 Use the apply_patch tool to edit files based on their feedback. 
 When editing files:
 - Never edit code via shell commands.
-- Always read the file first using `cat` with the shell tool.
-- Then generate a unified diff relative to EXACTLY that content.
+- Always read the code you change first: use file_outline to find the function or class
+  and read_lines to read just those lines (use workspace_files to find files; `cat`
+  only small files).
+- Then generate a unified diff relative to EXACTLY that content, with the line numbers
+  from read_lines in the @@ headers.
 - Use apply_patch only once per edit attempt.
 - If apply_patch fails, stop and report the error; do NOT retry.
 You can search the web to find which command you should use based on the technical stack, and use commands to install dependencies if needed.
@@ -47,9 +51,12 @@ For example, if they want to use the OpenAI API, search docs for the openai-pyth
 
 shell_tool = ShellTool(executor = ShellExecutor(cwd = workspace_dir))
 
+index_tools = make_index_tools(workspace_dir)
+
 updated_coding_agent =  Agent(
     name = "Updated Coding Agent",
     model = "gpt-5.1",
     instructions = UPDATED_INSTRUCTIONS,
-    tools = [apply_patch_tool, context7_tool, WebSearchTool(), shell_tool],
+    tools = [apply_patch_tool, context7_tool, WebSearchTool(), shell_tool, *index_tools],
+    hooks = editor.hooks,
 )
\ No newline at end of file
@@ -0,0 +1,233 @@
+# Index of the workspace for the coding agent: file tree with sizes and content hashes,
+# and a symbol outline per file (functions, classes and methods with their line ranges).
+# The agent gets it through three tools, so that it can look up where something is and
+# read just those lines instead of cat-ing whole files before every edit:
+#   workspace_files(prefix)        files with size, hash and symbol count
+#   file_outline(path)             symbols of one file with line ranges
+#   read_lines(path, start, end)   numbered lines of one file
+# The index is kept up to date by an mtime scan before each lookup: files whose size
+# and mtime are unchanged are not read again, so a scan costs one stat per file.
+import ast
+import hashlib
+import os
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from agents import function_tool
+
+# Directories never indexed (dependencies, build output, VCS, tool state).
+IGNORED_DIRS = {
+    ".git", "node_modules", ".venv", "venv", "__pycache__", ".next", "dist", "build", ".cache",
+    ".mypy_cache", ".pytest_cache", ".turbo", "coverage", ".shell-logs", ".patch-journal",
+}
+
+# Files larger than this are listed and hashed but not outlined.
+MAX_OUTLINE_BYTES = 1_000_000
+
+# Lines returned by one read_lines call.
+MAX_READ_LINES = 400
+
+BRACE_LANGUAGES = {
+    ".js": "javascript", ".jsx": "javascript", ".mjs": "javascript", ".cjs": "javascript",
+    ".ts": "typescript", ".tsx": "typescript", ".go": "go", ".rs": "rust", ".java": "java",
+    ".kt": "kotlin", ".cs": "csharp", ".swift": "swift", ".c": "c", ".h": "c", ".cpp": "cpp",
+}
+
+# Declarations in brace languages; group "name" is the symbol.
+BRACE_PATTERNS = [
+    ("class", re.compile(r"^\s*(?:export\s+)?(?:default\s+)?(?:abstract\s+)?(?:public\s+|private\s+)?"
+                         r"(?:class|interface|struct|enum|trait|impl)\s+(?P<name>[A-Za-z_$][\w$]*)")),
+    ("function", re.compile(r"^\s*(?:export\s+)?(?:default\s+)?(?:async\s+)?function\s*\*?\s*(?P<name>[A-Za-z_$][\w$]*)")),
+    ("function", re.compile(r"^\s*(?:export\s+)?(?:const|let|var)\s+(?P<name>[A-Za-z_$][\w$]*)\s*(?::[^=]+)?="
+                            r"\s*(?:async\s+)?(?:\([^)]*\)|[A-Za-z_$][\w$]*)\s*(?::[^=]+)?=>")),
+    ("function", re.compile(r"^\s*func\s+(?:\([^)]*\)\s*)?(?P<name>\w+)")),
+    ("function", re.compile(r"^\s*(?:pub(?:\([^)]*\))?\s+)?(?:async\s+)?fn\s+(?P<name>\w+)")),
+]
+
+
+@dataclass
+class Symbol:
+    kind: str
+    name: str
+    start: int
+    end: int
+
+
+@dataclass
+class FileEntry:
+    size: int
+    mtime_ns: int
+    sha256: str
+    symbols: list[Symbol] = field(default_factory = list)
+
+
+def python_outline(text: str) -> list[Symbol]:
+    try:
+        tree = ast.parse(text)
+    except (SyntaxError, ValueError):
+        return [Symbol(m.group(1), m.group(2), text.count("\n", 0, m.start()) + 1, text.count("\n", 0, m.start()) + 1)
+                for m in re.finditer(r"^[ \t]*(def|class)\s+(\w+)", text, re.MULTILINE)]
+    symbols: list[Symbol] = []
+
+    def visit(node, prefix: str) -> None:
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                kind = "class" if isinstance(child, ast.ClassDef) else "function"
+                start = min([child.lineno] + [d.lineno for d in child.decorator_list])
+                symbols.append(Symbol(kind, prefix + child.name, start, child.end_lineno or child.lineno))
+                if isinstance(child, ast.ClassDef):
+                    visit(child, f"{prefix}{child.name}.")
+
+    visit(tree, "")
+    return symbols
+
+
+def _block_end(lines: list[str], start: int) -> int:
+    """Last line (0-based) of the brace block opened on or after line `start`."""
+    depth = 0
+    opened = False
+    for i in range(start, len(lines)):
+        line = re.sub(r"(\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*'|`[^`]*`|//.*$)", "", lines[i])
+        for char in line:
+            if char == "{":
+                depth += 1
+                opened = True
+            elif char == "}":
+                depth -= 1
+        if opened and depth <= 0:
+            return i
+        if not opened and (line.rstrip().endswith(";") or i - start > 3):
+            return i
+    return len(lines) - 1
+
+
+def brace_outline(text: str) -> list[Symbol]:
+    lines = text.split("\n")
+    symbols: list[Symbol] = []
+    for i, line in enumerate(lines):
+        for kind, pattern in BRACE_PATTERNS:
+            match = pattern.match(line)
+            if match:
+                symbols.append(Symbol(kind, match.group("name"), i + 1, _block_end(lines, i) + 1))
+                break
+    return symbols
+
+
+def outline(path: Path, data: bytes) -> list[Symbol]:
+    if len(data) > MAX_OUTLINE_BYTES or b"\0" in data[:8192]:
+        return []
+    text = data.decode("utf-8", errors = "replace")
+    if path.suffix == ".py":
+        return python_outline(text)
+    if path.suffix in BRACE_LANGUAGES:
+        return brace_outline(text)
+    return []
+
+
+class WorkspaceIndex:
+    def __init__(self, root: Path):
+        self.root = Path(root).resolve()
+        self.files: dict[str, FileEntry] = {}
+        self.scans = 0
+        self.reindexed = 0
+
+    def refresh(self) -> None:
+        """Bring the index up to date; only new or modified files are read."""
+        seen = set()
+        for directory, dirs, names in os.walk(self.root):
+            dirs[:] = sorted(d for d in dirs if d not in IGNORED_DIRS)
+            for name in names:
+                path = Path(directory) / name
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                relative = path.relative_to(self.root).as_posix()
+                seen.add(relative)
+                entry = self.files.get(relative)
+                if entry and entry.size == stat.st_size and entry.mtime_ns == stat.st_mtime_ns:
+                    continue
+                try:
+                    data = path.read_bytes()
+                except OSError:
+                    continue
+                self.files[relative] = FileEntry(stat.st_size, stat.st_mtime_ns, hashlib.sha256(data).hexdigest(),
+                                                 outline(path, data))
+                self.reindexed += 1
+        for relative in set(self.files) - seen:
+            del self.files[relative]
+        self.scans += 1
+
+    def resolve(self, relative: str) -> Path:
+        path = (self.root / relative).resolve()
+        if not path.is_relative_to(self.root):
+            raise ValueError(f"Path outside workspace: {relative}")
+        return path
+
+    def listing(self, prefix: str = "", max_files: int = 300) -> str:
+        self.refresh()
+        prefix = prefix.strip("/")
+        matches = [(name, entry) for name, entry in sorted(self.files.items())
+                   if not prefix or name == prefix or name.startswith(prefix + "/")]
+        lines = [f"{name}  {entry.size} B  sha256:{entry.sha256[:12]}"
+                 + (f"  {len(entry.symbols)} symbols" if entry.symbols else "")
+                 for name, entry in matches[:max_files]]
+        if len(matches) > max_files:
+            lines.append(f"... {len(matches) - max_files} more files; narrow the prefix")
+        return "\n".join(lines) or f"No files under {prefix or 'the workspace'}"
+
+    def file_outline(self, relative: str) -> str:
+        self.refresh()
+        relative = self.resolve(relative).relative_to(self.root).as_posix()
+        entry = self.files.get(relative)
+        if entry is None:
+            return f"{relative} is not in the workspace index"
+        lines = [f"{relative}  {entry.size} B  sha256:{entry.sha256[:12]}"]
+        lines += [f"  {s.kind} {s.name}  lines {s.start}-{s.end}" for s in entry.symbols]
+        if not entry.symbols:
+            lines.append("  (no symbols; use read_lines)")
+        return "\n".join(lines)
+
+    def read_lines(self, relative: str, start: int, end: int) -> str:
+        path = self.resolve(relative)
+        lines = path.read_text(encoding = "utf-8", errors = "replace").split("\n")
+        start = max(start, 1)
+        end = min(end, len(lines), start + MAX_READ_LINES - 1)
+        body = "\n".join(f"{n:>6}  {lines[n - 1]}" for n in range(start, end + 1))
+        return f"{relative} lines {start}-{end} of {len(lines)}\n{body}"
+
+
+def make_index_tools(root: Path) -> list:
+    index = WorkspaceIndex(root)
+
+    @function_tool
+    def workspace_files(prefix: str = "") -> str:
+        """List workspace files with size, content hash and symbol count.
+
+        Args:
+            prefix: Only list files under this directory (relative to the workspace).
+        """
+        return index.listing(prefix)
+
+    @function_tool
+    def file_outline(path: str) -> str:
+        """Show the functions, classes and methods of a file with their line ranges.
+
+        Args:
+            path: File path relative to the workspace.
+        """
+        return index.file_outline(path)
+
+    @function_tool
+    def read_lines(path: str, start: int, end: int) -> str:
+        """Read lines start..end (1-based, inclusive) of a file, with line numbers.
+
+        Args:
+            path: File path relative to the workspace.
+            start: First line to read.
+            end: Last line to read.
+        """
+        return index.read_lines(path, start, end)
+
+    return [workspace_files, file_outline, read_lines]
@@ -6,7 +6,14 @@ from text2sql_agent import text2sql_node
 from charting_agent import chart_generator_node
 from chart_summary_agent import chart_summary_node
 from synthesizer_agent import synthesizer_node  
+from final_stage import final_merge_node
+from llm_registry import usage_report
+from telemetry import instrument_node, run_span
+from checkpointing import get_checkpointer, new_thread_id, resume_run, run_config, thread_id_of
 from dotenv import load_dotenv
+from functools import lru_cache
+import argparse
+import asyncio
 import os
 import streamlit as st
 
@@ -14,27 +21,64 @@ _ = load_dotenv(override=True)
 openai_api_key = os.getenv("OPENAI_API_KEY")
 os.environ["OPENAI_API_KEY"] = openai_api_key
 
-workflow = StateGraph(State)
-workflow.add_node("planner", planner_node)
-workflow.add_node("executor", executor_node)
-workflow.add_node("text2sql_agent", text2sql_node)
-workflow.add_node("chart_generator", chart_generator_node)
-workflow.add_node("chart_summarizer", chart_summary_node)
-workflow.add_node("synthesizer", synthesizer_node)
+@lru_cache(maxsize=None)
+def get_graph():
+    """Compile the graph on first use. The nodes build their LLM clients, agents and
+    MongoDB connections lazily as well, so importing this module needs no network. With a checkpointer
+    (see checkpointing.py) every step is saved and a failed run can be resumed."""
+    workflow = StateGraph(State)
+    workflow.add_node("planner", instrument_node("planner", planner_node))
+    workflow.add_node("executor", instrument_node("executor", executor_node))
+    workflow.add_node("text2sql_agent", instrument_node("text2sql_agent", text2sql_node))
+    workflow.add_node("chart_generator", instrument_node("chart_generator", chart_generator_node))
+    workflow.add_node("chart_summarizer", instrument_node("chart_summarizer", chart_summary_node))
+    workflow.add_node("synthesizer", instrument_node("synthesizer", synthesizer_node))
+    workflow.add_node("final_merge", instrument_node("final_merge", final_merge_node))
 
-workflow.add_edge(START, "planner")
+    workflow.add_edge(START, "planner")
 
-graph = workflow.compile()
+    return workflow.compile(checkpointer=get_checkpointer())
 
-png_bytes = graph.get_graph().draw_png()
+def draw_graph(path="agent_graph.png"):
+    """Render the graph diagram to a PNG (requires pygraphviz)."""
+    png_bytes = get_graph().get_graph().draw_png()
 
-with open("agent_graph.png", "wb") as f:
-    f.write(png_bytes)
+    with open(path, "wb") as f:
+        f.write(png_bytes)
+    return path
 
 
 from langchain_core.messages import HumanMessage
 import os
 
+DEFAULT_ENABLED_AGENTS = ["text2sql_agent", "chart_generator", "chart_summarizer", "synthesizer"]
+
+def build_initial_state(query, enabled_agents=None):
+    return {
+        "messages": [HumanMessage(content=query)],
+        "user_query": query,
+        "enabled_agents": list(enabled_agents or DEFAULT_ENABLED_AGENTS),
+    }
+
+async def arun_query(query, enabled_agents=None, thread_id=None):
+    """Async entry point: runs one query through the graph without holding a thread
+    for the whole multi-step run, so concurrent sessions interleave on one event loop.
+    The run is checkpointed under `thread_id` (a new id by default); if it fails,
+    aresume_query(thread_id) continues from the last successful step."""
+    config = run_config(thread_id)
+    try:
+        with run_span(thread_id_of(config), query=query[:200]):
+            return await get_graph().ainvoke(build_initial_state(query, enabled_agents), config)
+    except Exception:
+        if get_checkpointer() is not None:
+            print(f"Run {thread_id_of(config)} failed; resume it with: python agent_graph.py --resume {thread_id_of(config)}")
+        raise
+
+async def aresume_query(thread_id):
+    """Finish a checkpointed run, reusing the steps that already succeeded."""
+    with run_span(thread_id, resumed=True):
+        return await resume_run(get_graph(), thread_id)
+
 def _extract_chart_meta(messages):
     chart_path = None
     chart_notes = None
@@ -60,32 +104,153 @@ def _pick_final_answer(result):
             return getattr(msg, "content", "")
     return getattr(messages[-1], "content", "No response available.") if messages else "No response available."
 
+STREAMED_ANSWER_NODES = ("synthesizer", "chart_summarizer")
+STREAMED_STEP_NODES = ("text2sql_agent", "chart_generator")
+
+async def astream_query(query, enabled_agents=None, thread_id=None):
+    """Streaming entry point. Yields ``(kind, payload)`` events as the graph runs instead
+    of waiting for the synthesizer to finish:
+      - ("plan", plan)              the planner produced or revised the plan
+      - ("step", (node, content))   text2sql_agent / chart_generator finished a step
+      - ("chart", (path, notes))    chart_generator reported CHART_PATH
+      - ("token", text)             answer tokens from the synthesizer / chart summarizer
+      - ("final", state)            the final graph state, same shape as arun_query()
+    The run is checkpointed under `thread_id`, like arun_query().
+    """
+    final_state = None
+    # In the parallel final stage chart_summarizer and synthesizer stream at the same time;
+    # only the first one to start is streamed, the merged answer arrives with "final".
+    streaming_node = None
+    config = run_config(thread_id)
+    with run_span(thread_id_of(config), query=query[:200], streamed=True):
+        async for namespace, mode, chunk in get_graph().astream(
+            build_initial_state(query, enabled_agents),
+            config,
+            stream_mode=["updates", "messages", "values"],
+            subgraphs=True,
+        ):
+            if mode == "messages":
+                # Tokens from create_agent subgraphs (chart summarizer) are only visible with
+                # subgraphs=True; attribute them to the outer node via the checkpoint namespace.
+                message, metadata = chunk
+                node = metadata.get("langgraph_checkpoint_ns", "").split(":", 1)[0]
+                if node in STREAMED_ANSWER_NODES and type(message).__name__ == "AIMessageChunk":
+                    streaming_node = streaming_node or node
+                    if node == streaming_node and isinstance(message.content, str) and message.content:
+                        yield "token", message.content
+                continue
+            if namespace:
+                continue
+            if mode == "values":
+                final_state = chunk
+                continue
+            for node, update in (chunk or {}).items():
+                if not update:
+                    continue
+                if node == "planner" and update.get("plan"):
+                    yield "plan", update["plan"]
+                elif node in STREAMED_STEP_NODES:
+                    messages = update.get("messages") or []
+                    if messages:
+                        yield "step", (node, getattr(messages[-1], "content", ""))
+                    if node == "chart_generator":
+                        chart_path, chart_notes = _extract_chart_meta(messages)
+                        if chart_path:
+                            yield "chart", (chart_path, chart_notes)
+    yield "final", final_state or {}
+
+def _render_usage():
+    with st.expander("LLM usage by node (this process)", expanded=False):
+        st.json(usage_report())
+
+def _render_chart(chart_path, chart_notes):
+    if os.path.exists(chart_path):
+        st.image(chart_path, caption=chart_notes or "Chart", use_column_width=True)
+    else:
+        st.info(f"Chart path reported but file not found: {chart_path}")
+
+async def _stream_to_ui(query, thread_id=None):
+    progress = st.container()
+    st.subheader("Answer")
+    answer_slot = st.empty()
+    chart_slot = st.empty()
+    streamed = ""
+    chart_shown = False
+    async for kind, payload in astream_query(query, thread_id=thread_id):
+        if kind == "plan":
+            with progress.expander("Plan", expanded=False):
+                st.json(payload)
+        elif kind == "step":
+            node, content = payload
+            with progress.expander(f"{node} result", expanded=False):
+                st.markdown(content)
+        elif kind == "chart":
+            with chart_slot.container():
+                _render_chart(*payload)
+            chart_shown = True
+        elif kind == "token":
+            streamed += payload
+            answer_slot.markdown(streamed)
+        elif kind == "final":
+            answer_slot.write(_pick_final_answer(payload))
+            if not chart_shown:
+                chart_path, chart_notes = _extract_chart_meta(payload.get("messages", []))
+                if chart_path:
+                    with chart_slot.container():
+                        _render_chart(chart_path, chart_notes)
+
+def _render_result(result):
+    messages = result.get("messages", []) or []
+
+    final_answer = _pick_final_answer(result)
+    chart_path, chart_notes = _extract_chart_meta(messages)
+
+    st.subheader("Answer")
+    st.write(final_answer)
+
+    if chart_path:
+        _render_chart(chart_path, chart_notes)
+
 def main():
     st.title("Email Insights Assistant")
     query = st.text_input("Enter your query")
+    stream = st.checkbox("Stream partial results", value=True)
     if st.button("Submit"):
-        state = {
-            "messages": [HumanMessage(content=query)],
-            "user_query": query,
-            "enabled_agents": ["text2sql_agent", "chart_generator", "chart_summarizer", "synthesizer"],
-        }
-        result = graph.invoke(state)
-        messages = result.get("messages", []) or []
-
-        final_answer = _pick_final_answer(result)
-        chart_path, chart_notes = _extract_chart_meta(messages)
-
-        st.subheader("Answer")
-        st.write(final_answer)
-
-        if chart_path:
-            if os.path.exists(chart_path):
-                st.image(chart_path, caption=chart_notes or "Chart", use_column_width=True)
+        thread_id = new_thread_id()
+        try:
+            if stream:
+                asyncio.run(_stream_to_ui(query, thread_id))
             else:
-                st.info(f"Chart path reported but file not found: {chart_path}")
+                _render_result(asyncio.run(arun_query(query, thread_id=thread_id)))
+            st.session_state.pop("failed_thread", None)
+        except Exception as e:
+            st.session_state["failed_thread"] = thread_id
+            st.error(f"The run failed: {e}. The steps that finished are saved; resume to continue from there.")
+        _render_usage()
+        return
+
+    failed_thread = st.session_state.get("failed_thread")
+    if failed_thread and st.button("Resume last failed run"):
+        _render_result(asyncio.run(aresume_query(failed_thread)))
+        st.session_state.pop("failed_thread", None)
+        _render_usage()
 
 if __name__ == "__main__":
-    main()
+    # `streamlit run agent_graph.py` starts the app; `python agent_graph.py --draw-graph`
+    # only renders the diagram and `python agent_graph.py --resume THREAD_ID` finishes a
+    # failed run from its checkpoint.
+    parser = argparse.ArgumentParser(description="Email Insights Assistant")
+    parser.add_argument("--draw-graph", nargs="?", const="agent_graph.png", metavar="PATH",
+                        help="Write the graph diagram to PATH (default: agent_graph.png) and exit.")
+    parser.add_argument("--resume", metavar="THREAD_ID",
+                        help="Resume a failed run from its last checkpoint, print the answer and exit.")
+    args, _ = parser.parse_known_args()
+    if args.draw_graph:
+        print(f"Graph diagram written to {draw_graph(args.draw_graph)}")
+    elif args.resume:
+        print(_pick_final_answer(asyncio.run(aresume_query(args.resume))))
+    else:
+        main()
 # def main():
 #     st.title("Email Insights Assistant")
 #     query = st.text_input("Enter your query")
@@ -0,0 +1,180 @@
+# Typed artifact store for tables handed from the data agents to chart_generator.
+# A data agent registers a table once and passes its id along in the graph state; the
+# chart code loads it with load_artifact("<id>") instead of the model re-typing numbers
+# from earlier messages, so large results never go through the chart prompt.
+#
+# Tables are written as uncompressed Arrow IPC files and read back memory-mapped, so
+# numeric columns reach the pandas DataFrame without a copy. Ids are content hashes of
+# the table, so files are immutable, re-registering the same result reuses its file and
+# an id is enough to key anything derived from the data (see chart_cache.py).
+#
+#   ARTIFACT_DIR   directory for artifact files (default .artifacts)
+#   ARTIFACT_TTL   seconds before old artifact files are pruned at startup (default 86400, 0 = never)
+import hashlib
+import os
+import re
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, List
+
+_ID_PATTERN = re.compile(r"^tbl_[0-9a-f]{12}$")
+
+
+def _to_arrow(data: Any):
+    """DataFrame, list of records (nested dicts are flattened to dotted columns),
+    dict of columns or pyarrow.Table -> pyarrow.Table."""
+    import pandas as pd
+    import pyarrow as pa
+
+    if isinstance(data, pa.Table):
+        return data
+    if isinstance(data, pd.DataFrame):
+        frame = data
+    elif isinstance(data, list):
+        frame = pd.json_normalize(data)
+    else:
+        frame = pd.DataFrame(data)
+    try:
+        return pa.Table.from_pandas(frame, preserve_index = False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        # Mixed or driver-specific values (ObjectId, lists of mixed types): keep them as text.
+        frame = frame.copy()
+        for column in frame.columns:
+            try:
+                pa.array(frame[column])
+            except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+                frame[column] = frame[column].map(lambda value: None if value is None else str(value))
+        return pa.Table.from_pandas(frame, preserve_index = False)
+
+
+def table_fingerprint(table) -> str:
+    """sha256 of the table's schema and values (Arrow IPC stream, schema metadata excluded)."""
+    import pyarrow as pa
+
+    table = table.combine_chunks()
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema.remove_metadata()) as writer:
+        writer.write_table(table)
+    return hashlib.sha256(sink.getvalue()).hexdigest()
+
+
+class ArtifactStore:
+    def __init__(self, root: str | Path = ".artifacts"):
+        self.root = Path(root).resolve()
+        self.root.mkdir(parents = True, exist_ok = True)
+
+    def path(self, artifact_id: str) -> Path:
+        if not _ID_PATTERN.match(artifact_id):
+            raise KeyError(f"invalid artifact id: {artifact_id!r}")
+        return self.root / f"{artifact_id}.arrow"
+
+    def put_table(self, data: Any, name: str, source: str = "", description: str = "") -> Dict[str, Any]:
+        """Write a table and return its reference: the small dict that travels in the state."""
+        import pyarrow as pa
+
+        table = _to_arrow(data).replace_schema_metadata(None)
+        artifact_id = f"tbl_{table_fingerprint(table)[:12]}"
+        path = self.path(artifact_id)
+        if path.exists():
+            os.utime(path)  # keep it from being pruned
+        else:
+            table = table.replace_schema_metadata({"name": name, "source": source, "description": description})
+            tmp = path.with_suffix(f".{os.getpid()}.tmp")
+            with pa.OSFile(str(tmp), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+            os.replace(tmp, path)
+        return {
+            "artifact_id": artifact_id,
+            "name": name,
+            "source": source,
+            "description": description,
+            "rows": table.num_rows,
+            "columns": {field.name: str(field.type) for field in table.schema},
+        }
+
+    def load_table(self, artifact_id: str):
+        """The table as a pyarrow.Table backed by a memory map of the artifact file."""
+        import pyarrow as pa
+
+        try:
+            return pa.ipc.open_file(pa.memory_map(str(self.path(artifact_id)))).read_all()
+        except FileNotFoundError:
+            raise KeyError(f"unknown artifact id: {artifact_id!r}") from None
+
+    def load(self, artifact_id: str):
+        """The table as a pandas DataFrame; numeric columns without nulls are not copied."""
+        return self.load_table(artifact_id).to_pandas(split_blocks = True)
+
+    def prune(self, max_age: float) -> int:
+        cutoff = time.time() - max_age
+        removed = 0
+        for path in self.root.glob("tbl_*.arrow"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+
+@lru_cache(maxsize = None)
+def get_artifact_store() -> ArtifactStore:
+    store = ArtifactStore(os.getenv("ARTIFACT_DIR", ".artifacts"))
+    ttl = float(os.getenv("ARTIFACT_TTL", "86400"))
+    if ttl:
+        store.prune(ttl)
+    return store
+
+
+@lru_cache(maxsize = 32)
+def _cached_table(artifact_id: str):
+    # Artifact files never change, so the memory-mapped table is safe to share.
+    return get_artifact_store().load_table(artifact_id)
+
+
+def load_artifact(artifact_id: str):
+    """Available to chart code as `load_artifact("<id>")`; returns a pandas DataFrame.
+    The Arrow table is opened once per process, but every call gets a new DataFrame, so
+    a snippet that edits its frame (df["c"] = ..., inplace=True) cannot affect the next."""
+    return _cached_table(artifact_id).to_pandas(split_blocks = True)
+
+
+def collect_artifacts(messages: Iterable[Any]) -> List[Dict[str, Any]]:
+    """Artifact references attached to tool messages (ToolMessage.artifact) by the data tools."""
+    refs = []
+    for message in messages:
+        artifact = getattr(message, "artifact", None)
+        if getattr(message, "type", None) == "tool" and isinstance(artifact, dict) and "artifact_id" in artifact:
+            refs.append(artifact)
+    return refs
+
+
+def describe_artifacts(refs: List[Dict[str, Any]], preview_rows: int = 5) -> str:
+    """Prompt block listing the available tables: id, schema, size and the first few rows."""
+    lines = ["Data tables from earlier steps (load them in your code with load_artifact(\"<artifact_id>\")):"]
+    store = get_artifact_store()
+    for ref in refs:
+        columns = ", ".join(f"{name} ({dtype})" for name, dtype in ref["columns"].items())
+        lines.append(f"- {ref['artifact_id']}: {ref['name']} from {ref['source'] or 'unknown'}, {ref['rows']} rows")
+        if ref.get("description"):
+            lines.append(f"  description: {ref['description']}")
+        lines.append(f"  columns: {columns}")
+        try:
+            preview = store.load_table(ref["artifact_id"]).slice(0, preview_rows).to_pandas()
+        except KeyError:
+            lines.append("  (artifact file is missing)")
+            continue
+        lines.append("  first rows:")
+        lines.extend("    " + row for row in preview.to_string(index = False).splitlines())
+    return "\n".join(lines)
+
+
+def save_table(name: str, columns: List[str], rows: List[List[Any]], source: str = "",
+               description: str = "") -> Dict[str, Any]:
+    """Register a table given as column names plus rows (the shape tools receive from a model)."""
+    import pandas as pd
+
+    frame = pd.DataFrame(rows, columns = columns)
+    return get_artifact_store().put_table(frame, name = name, source = source, description = description)
@@ -0,0 +1,86 @@
+# End-of-pipeline benchmark for the final stage after a chart:
+#   summary + synthesis   chart summary then synthesis, both over the whole state
+#   sequential            FINAL_STAGE=sequential (chart summary over the whole state only)
+#   parallel              FINAL_STAGE=parallel (both at once on minimal inputs, merged)
+# All models are stubs whose latency is a fixed cost plus a cost per 1000 prompt characters,
+# so both the fan-out and the smaller final-stage prompts show up in the numbers. The data
+# step returns --context-kb of text to stand in for a long query result.
+#
+#   python benchmark_final_stage.py --latency 0.3 --per-1k-chars 0.02 --context-kb 40
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+
+from agent_graph import build_initial_state, get_graph
+from checkpointing import run_config
+import benchmark_async
+import chart_summary_agent
+import final_stage
+from chart_summary_agent import chart_summary_node
+from synthesizer_agent import synthesizer_node
+from llm_registry import override_llm
+from stub_llm import StubAgent, StubChatModel, data_reply, summary_reply
+
+
+QUERY = "Chart the number of emails per sender this week"
+
+
+async def end_stage_seconds() -> float:
+    """Time from chart_generator's update to the end of the run."""
+    chart_done = None
+    async for update in get_graph().astream(build_initial_state(QUERY), run_config(), stream_mode = "updates"):
+        if "chart_generator" in update:
+            chart_done = time.perf_counter()
+    return time.perf_counter() - chart_done
+
+
+async def summary_then_synthesis_seconds(state) -> float:
+    """Both final calls one after the other, each reading the whole state."""
+    start = time.perf_counter()
+    await chart_summary_node(state)
+    await synthesizer_node(state)
+    return time.perf_counter() - start
+
+
+async def main(latency: float, per_1k_chars: float, context_kb: int, runs: int) -> None:
+    benchmark_async.install_stubs(0.0)
+    padding = "Source notes: " + "x" * (context_kb * 1024)
+    benchmark_async.text2sql_agent.get_text2sql_agent = lambda: StubAgent(lambda m: data_reply(m) + "\n" + padding)
+    stubs = {
+        "chart_summarizer (agent)": StubAgent(summary_reply, latency, per_1k_chars),
+        "chart_summarizer": StubChatModel(summary_reply, latency, per_1k_chars),
+        "synthesizer": StubChatModel(summary_reply, latency, per_1k_chars),
+    }
+    chart_summary_agent.get_chart_summary_agent = lambda: stubs["chart_summarizer (agent)"]
+    override_llm("chart_summarizer", stubs["chart_summarizer"])
+    override_llm("synthesizer", stubs["synthesizer"])
+
+    print(f"Stub latency {latency:.2f}s + {per_1k_chars:.3f}s per 1k prompt chars; data step returns {context_kb} KB")
+    print(f"{'mode':>20} {'end stage median s':>19} {'calls':>6} {'prompt chars/run':>17}")
+    final_stage.FINAL_STAGE = "sequential"
+    state = await get_graph().ainvoke(build_initial_state(QUERY), run_config())
+    for mode in ("summary + synthesis", "sequential", "parallel"):
+        final_stage.FINAL_STAGE = mode
+        for stub in stubs.values():
+            stub.calls = stub.prompt_chars = 0
+        if mode == "summary + synthesis":
+            timings = [await summary_then_synthesis_seconds(state) for _ in range(runs)]
+        else:
+            timings = [await end_stage_seconds() for _ in range(runs)]
+        calls = sum(stub.calls for stub in stubs.values()) / runs
+        chars = sum(stub.prompt_chars for stub in stubs.values()) / runs
+        print(f"{mode:>20} {statistics.median(timings):>19.3f} {calls:>6.0f} {chars:>17,.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Final-stage latency with stub LLMs")
+    parser.add_argument("--latency", type = float, default = 0.3, help = "Fixed seconds per stub call")
+    parser.add_argument("--per-1k-chars", type = float, default = 0.02, help = "Extra seconds per 1000 prompt characters")
+    parser.add_argument("--context-kb", type = int, default = 40, help = "Size of the data step's output")
+    parser.add_argument("--runs", type = int, default = 3)
+    args = parser.parse_args()
+    asyncio.run(main(args.latency, args.per_1k_chars, args.context_kb, args.runs))
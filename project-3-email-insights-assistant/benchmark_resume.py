@@ -0,0 +1,94 @@
+# Cost of a late failure with and without checkpoint resume. The synthesizer stub fails on
+# its first call, after planning, queries and charting have run:
+#   rerun    the failed run, then the query started again from scratch (the old behaviour)
+#   resume   the failed run, then aresume_query(thread_id) from the last checkpoint
+# Every model and agent is a fixed-latency stub; the checkpoints go to a temporary SQLite file.
+#
+#   python benchmark_resume.py --latency 0.3
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+os.environ["CHECKPOINTER"] = "sqlite"
+os.environ["CHECKPOINT_PATH"] = os.path.join(tempfile.mkdtemp(), "checkpoints.sqlite")
+
+import agent_graph
+import chart_summary_agent
+import charting_agent
+import text2sql_agent
+from llm_registry import override_llm
+from stub_llm import StubAgent, StubChatModel, chart_reply, data_reply, executor_reply, make_planner_reply, summary_reply
+
+QUERY = "Chart the number of emails per sender this week"
+
+
+class FailOnce:
+    """Reply function that raises on its first call, like a transient API error."""
+
+    def __init__(self, reply):
+        self.reply = reply
+        self.failed = False
+
+    def __call__(self, messages):
+        if not self.failed:
+            self.failed = True
+            raise RuntimeError("synthesizer: upstream API error")
+        return self.reply(messages)
+
+
+def install_stubs(latency: float) -> dict:
+    stubs = {
+        "planner": StubChatModel(make_planner_reply("text2sql_agent"), latency),
+        "executor": StubChatModel(executor_reply, latency),
+        "synthesizer": StubChatModel(FailOnce(summary_reply), latency),
+        "chart_summarizer": StubChatModel(summary_reply, latency),
+        "text2sql_agent": StubAgent(data_reply, latency),
+        "chart_generator": StubAgent(chart_reply, latency),
+        "chart_summarizer (agent)": StubAgent(summary_reply, latency),
+    }
+    for node in ("planner", "executor", "synthesizer", "chart_summarizer"):
+        override_llm(node, stubs[node])
+    text2sql_agent.get_text2sql_agent = lambda: stubs["text2sql_agent"]
+    charting_agent.get_chart_agent = lambda: stubs["chart_generator"]
+    chart_summary_agent.get_chart_summary_agent = lambda: stubs["chart_summarizer (agent)"]
+    return stubs
+
+
+async def attempt(stubs: dict, resume: bool) -> tuple:
+    for stub in stubs.values():
+        stub.calls = 0
+    stubs["synthesizer"].reply = FailOnce(summary_reply)
+    thread_id = agent_graph.new_thread_id()
+    start = time.perf_counter()
+    try:
+        await agent_graph.arun_query(QUERY, thread_id = thread_id)
+    except RuntimeError:
+        pass
+    failed_at = time.perf_counter() - start
+    calls_before = sum(stub.calls for stub in stubs.values())
+    if resume:
+        state = await agent_graph.aresume_query(thread_id)
+    else:
+        state = await agent_graph.arun_query(QUERY)
+    assert state.get("final_answer"), "run did not finish"
+    total = time.perf_counter() - start
+    return failed_at, total - failed_at, sum(stub.calls for stub in stubs.values()) - calls_before
+
+
+async def main(latency: float) -> None:
+    stubs = install_stubs(latency)
+    print(f"Stub latency {latency:.2f}s per call; synthesizer fails once at the end of the run")
+    print(f"{'mode':>7} {'until failure s':>16} {'recovery s':>11} {'recovery calls':>15}")
+    for mode in ("rerun", "resume"):
+        failed_at, recovery, calls = await attempt(stubs, resume = mode == "resume")
+        print(f"{mode:>7} {failed_at:>16.2f} {recovery:>11.2f} {calls:>15}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Late failure: rerun from scratch vs resume from checkpoint")
+    parser.add_argument("--latency", type = float, default = 0.3, help = "Seconds per stub call")
+    args = parser.parse_args()
+    asyncio.run(main(args.latency))
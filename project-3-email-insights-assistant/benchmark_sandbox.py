@@ -0,0 +1,69 @@
+# Chart execution benchmark: in-process PythonREPL vs the pre-warmed sandbox pool.
+# Runs a typical bar-chart snippet repeatedly with each backend, then checks that a
+# runaway snippet times out without affecting the next chart.
+#
+#   python benchmark_sandbox.py --runs 10 --think 2
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+CHART_CODE = """
+import matplotlib.pyplot as plt
+import pandas as pd
+df = pd.DataFrame({"bank": ["A", "B", "C", "D", "E"], "cap": [540, 310, 280, 190, 150]})
+plt.figure(figsize=(6, 4))
+plt.bar(df["bank"], df["cap"])
+plt.title("Market cap")
+plt.savefig("bench_chart.png")
+print("saved")
+"""
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def report(name: str, first: float, rest: list[float]) -> None:
+    print(f"{name:>10} first {first:7.3f}s   steady median {statistics.median(rest):7.3f}s   max {max(rest):7.3f}s")
+
+
+def main(runs: int, think: float, timeout: float) -> None:
+    os.chdir(tempfile.mkdtemp(prefix = "chart-bench-"))
+
+    from langchain_experimental.utilities.python import PythonREPL
+    repl = PythonREPL()
+    first = timed(lambda: repl.run(CHART_CODE))
+    report("inprocess", first, [timed(lambda: repl.run(CHART_CODE)) for _ in range(runs)])
+
+    from sandbox_pool import SandboxError, SandboxPool
+    pool = SandboxPool(size = 2, timeout = timeout)
+    pool.start()
+    # The chart agent starts the pool when it is built, so workers warm up while the
+    # model produces its first tool call; --think simulates that model latency.
+    time.sleep(think)
+    first = timed(lambda: pool.run(CHART_CODE))
+    report("sandbox", first, [timed(lambda: pool.run(CHART_CODE)) for _ in range(runs)])
+
+    start = time.perf_counter()
+    try:
+        pool.run("while True:\n    pass")
+        outcome = "completed?!"
+    except SandboxError as exc:
+        outcome = str(exc)
+    print(f"  runaway: {outcome} after {time.perf_counter() - start:.2f}s")
+    result = pool.run(CHART_CODE)
+    print(f"  next chart after runaway: ok={result['ok']} in {result['duration_s']:.3f}s")
+    pool.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Chart snippet latency: in-process REPL vs sandbox pool")
+    parser.add_argument("--runs", type = int, default = 10)
+    parser.add_argument("--think", type = float, default = 2.0, help = "Simulated LLM time before the first tool call")
+    parser.add_argument("--timeout", type = float, default = 3.0, help = "Sandbox timeout used for the runaway check")
+    args = parser.parse_args()
+    main(args.runs, args.think, args.timeout)
@@ -0,0 +1,71 @@
+# Synthesizer prompt size and latency on a long run: SYNTH_CONTEXT=full vs condensed.
+# The state is synthetic: planner/executor JSON, several data steps with raw tool outputs
+# (a large query result and search results), agent answers that repeat each other, and
+# a chart step. The model is a stub whose latency grows with the prompt size.
+#
+#   python benchmark_synthesizer.py --steps 4 --rows 500 --latency 0.3 --per-1k-chars 0.02
+import argparse
+import asyncio
+import json
+import os
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+import synthesizer_agent
+from llm_registry import override_llm
+from stub_llm import StubChatModel, summary_reply
+from text2sql_agent import query_result_content
+
+DATA_AGENT = "text2sql_agent"
+
+
+def long_run_state(steps: int, rows: int) -> dict:
+    question = "Which senders and sources account for most of the activity, and how did it change?"
+    messages = [HumanMessage(content = question)]
+    plan = {str(i): {"agent": DATA_AGENT, "action": f"Fetch slice {i} of the data."} for i in range(1, steps + 1)}
+    messages.append(HumanMessage(content = json.dumps(plan), name = "initial_plan"))
+    for step in range(1, steps + 1):
+        messages.append(HumanMessage(content = json.dumps({"replan": False, "goto": DATA_AGENT, "reason": "Following the plan " * 10, "query": f"slice {step}"}), name = "executor"))
+        messages.append(HumanMessage(content = f"Fetch slice {step}"))
+        messages.append(AIMessage(content = "", tool_calls = [{"name": "mongodb_schema", "args": {}, "id": f"s{step}"}]))
+        messages.append(ToolMessage(content = "Collection emails: " + "field: string\n" * 200, name = "mongodb_schema", tool_call_id = f"s{step}"))
+        records = [{"_id": {"sender": f"sender{i % 40}@example.com"}, "count": (i * 7) % 97, "week": {"$date": "2026-10-12T00:00:00Z"}, "subject": "Quarterly update " * 5} for i in range(rows)]
+        # As text2sql_agent's register_query_results frames it: the first rows and an artifact note.
+        ref = {"artifact_id": f"art-emails-{step}", "rows": rows}
+        content = query_result_content(json.dumps(records, indent = 2), records, ref)
+        messages.append(ToolMessage(content = content, name = "mongodb_query", tool_call_id = f"q{step}"))
+        search = {"query": f"slice {step}", "results": [{"title": f"Report {i}", "url": f"https://example.com/{step}/{i}", "content": "Lorem ipsum dolor sit amet. " * 60, "score": 1 - i / 10} for i in range(5)]}
+        messages.append(ToolMessage(content = json.dumps(search), name = "tavily_search", tool_call_id = f"t{step}"))
+        answer = "Results:\n| sender | count |\n|---|---|\n" + "\n".join(f"| sender{i}@example.com | {i * 3} |" for i in range(40))
+        answer += "\n\nMost activity comes from a handful of senders."
+        messages.append(HumanMessage(content = answer, name = DATA_AGENT))
+    messages.append(HumanMessage(content = "Chart saved.\nCHART_PATH: chart.png\nCHART_NOTES: sender39 has the highest count.", name = "chart_generator"))
+    return {"messages": messages, "user_query": question}
+
+
+async def main(steps: int, rows: int, latency: float, per_1k_chars: float) -> None:
+    stub = StubChatModel(summary_reply, latency, per_1k_chars)
+    override_llm("synthesizer", stub)
+    state = long_run_state(steps, rows)
+    print(f"{steps} data steps, {rows} rows per query result, stub {latency:.2f}s + {per_1k_chars:.3f}s per 1k chars")
+    print(f"{'mode':>10} {'prompt chars':>13} {'~tokens':>9} {'latency s':>10}")
+    for mode in ("full", "condensed"):
+        synthesizer_agent.SYNTH_CONTEXT = mode
+        stub.prompt_chars = 0
+        start = time.perf_counter()
+        await synthesizer_agent.synthesizer_node(state)
+        elapsed = time.perf_counter() - start
+        print(f"{mode:>10} {stub.prompt_chars:>13,} {stub.prompt_chars // 4:>9,} {elapsed:>10.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Synthesizer prompt size: full vs condensed context")
+    parser.add_argument("--steps", type = int, default = 4)
+    parser.add_argument("--rows", type = int, default = 500)
+    parser.add_argument("--latency", type = float, default = 0.3)
+    parser.add_argument("--per-1k-chars", type = float, default = 0.02)
+    args = parser.parse_args()
+    asyncio.run(main(args.steps, args.rows, args.latency, args.per_1k_chars))
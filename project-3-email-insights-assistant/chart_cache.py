@@ -0,0 +1,131 @@
+# Content-addressed store for chart images.
+# A chart is keyed by a hash of what determines it, known before it is drawn: the chart
+# spec, or for the code-writing agent the request plus the ids of the tables it is drawn
+# from (artifact ids are content hashes, so the key covers the data). A repeat request is
+# served from the stored image without running the agent. A chart the agent draws without
+# tables is stored under a hash of its code, which only dedupes storage (the code is not
+# known until the agent has run). Generated charts live in one size-bounded directory
+# instead of piling up in the working directory; least recently used images are evicted
+# past CHART_CACHE_MAX_MB.
+#
+#   CHART_CACHE_DIR      directory for chart images (default .charts)
+#   CHART_CACHE_MAX_MB   total size limit of the directory (default 200)
+#
+# CHART_PATH keeps pointing at a plain PNG file (inside CHART_CACHE_DIR), so the chart
+# summarizer and the Streamlit app read it as before.
+import hashlib
+import json
+import os
+import shutil
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Optional, Tuple
+
+
+def chart_key(**parts: Any) -> str:
+    """Stable hash of the inputs that determine a chart (spec or code, artifact ids, ...)."""
+    payload = json.dumps(parts, sort_keys = True, separators = (",", ":"), default = str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ChartCache:
+    def __init__(self, root: str | Path = ".charts", max_bytes: int = 200 * 1024 * 1024):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.root.mkdir(parents = True, exist_ok = True)
+
+    def path(self, key: str) -> Path:
+        return self.root / f"{key[:32]}.png"
+
+    def _notes_path(self, key: str) -> Path:
+        return self.root / f"{key[:32]}.notes"
+
+    def staging_path(self, key: str) -> Path:
+        """Where to render a new chart before put(); same directory, so put() is a rename."""
+        return self.root / f"{key[:32]}.{os.getpid()}.{threading.get_ident()}.tmp.png"
+
+    def get(self, key: str) -> Optional[Tuple[str, str]]:
+        """(image path, notes) for a stored chart, or None. A hit refreshes its LRU position."""
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        notes_path = self._notes_path(key)
+        notes = notes_path.read_text(encoding = "utf-8") if notes_path.exists() else ""
+        self.hits += 1
+        return str(path), notes
+
+    def put(self, key: str, image: str | Path, notes: str = "", move: bool = True) -> str:
+        """Store the image file under `key` (moved, or copied with move=False) and return its path."""
+        path = self.path(key)
+        if notes:
+            self._notes_path(key).write_text(notes, encoding = "utf-8")
+        if move:
+            shutil.move(str(image), str(path))
+        else:
+            tmp = self.staging_path(key)
+            shutil.copyfile(image, tmp)
+            os.replace(tmp, path)
+        self.evict()
+        return str(path)
+
+    def evict(self) -> int:
+        """Delete least recently used charts until the directory fits in max_bytes."""
+        with self._lock:
+            entries = []
+            total = 0
+            for path in self.root.glob("*.png"):
+                if path.name.endswith(".tmp.png"):
+                    continue
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+            removed = 0
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                for victim in (path, path.with_suffix(".notes")):
+                    try:
+                        victim.unlink()
+                    except FileNotFoundError:
+                        pass
+                total -= size
+                removed += 1
+            return removed
+
+
+@lru_cache(maxsize = None)
+def get_chart_cache() -> ChartCache:
+    return ChartCache(
+        os.getenv("CHART_CACHE_DIR", ".charts"),
+        max_bytes = int(float(os.getenv("CHART_CACHE_MAX_MB", "200")) * 1024 * 1024),
+    )
+
+
+def read_chart_path(content: str) -> Optional[str]:
+    for line in content.splitlines():
+        if line.startswith("CHART_PATH:"):
+            return line.split(":", 1)[1].strip()
+    return None
+
+
+def read_chart_notes(content: str) -> str:
+    for line in content.splitlines():
+        if line.startswith("CHART_NOTES:"):
+            return line.split(":", 1)[1].strip()
+    return ""
+
+
+def replace_chart_path(content: str, path: str) -> str:
+    return "\n".join(
+        f"CHART_PATH: {path}" if line.startswith("CHART_PATH:") else line for line in content.splitlines()
+    )
@@ -0,0 +1,228 @@
+# Declarative chart specs and a deterministic renderer for the common chart types.
+# chart_generator asks the model for a small JSON spec over a table in the artifact store
+# and renders it here, without a tool loop or model-written code. Requests the spec cannot
+# express fall back to the free-form python_repl_tool agent.
+#
+# Spec (JSON):
+#   {"chart_type": "bar" | "barh" | "line" | "pie" | "hist" | "scatter",
+#    "artifact_id": "tbl_...", "x": "<column>", "y": "<column>" | ["<column>", ...],
+#    "aggregation": "none" | "sum" | "mean" | "count" | "min" | "max",
+#    "sort": "none" | "asc" | "desc", "limit": <int>, "bins": <int>,
+#    "title": "...", "xlabel": "...", "ylabel": "..."}
+#
+# Rendering uses matplotlib's object API (no pyplot state) on figures that are created
+# once per chart type and cleared between renders, under a lock per figure.
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+CHART_TYPES = ("bar", "barh", "line", "pie", "hist", "scatter")
+AGGREGATIONS = ("none", "sum", "mean", "count", "min", "max")
+SORTS = ("none", "asc", "desc")
+
+
+class ChartSpecError(ValueError):
+    """The spec is malformed or does not fit the table; the caller falls back to free-form code."""
+
+
+@dataclass
+class ChartSpec:
+    chart_type: str
+    artifact_id: str
+    y: List[str]
+    x: Optional[str] = None
+    aggregation: str = "none"
+    sort: str = "none"
+    limit: Optional[int] = None
+    bins: int = 20
+    title: str = ""
+    xlabel: str = ""
+    ylabel: str = ""
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ChartSpec":
+        if not isinstance(data, dict):
+            raise ChartSpecError("spec must be a JSON object")
+        chart_type = str(data.get("chart_type", "")).lower()
+        if chart_type not in CHART_TYPES:
+            raise ChartSpecError(f"unsupported chart_type {chart_type!r}")
+        y = data.get("y")
+        y = [y] if isinstance(y, str) else list(y or [])
+        if not y or not all(isinstance(column, str) for column in y):
+            raise ChartSpecError("y must name at least one column")
+        x = data.get("x") or None
+        if chart_type != "hist" and not x:
+            raise ChartSpecError(f"{chart_type} needs an x column")
+        if chart_type in ("pie", "hist") and len(y) != 1:
+            raise ChartSpecError(f"{chart_type} takes exactly one y column")
+        aggregation = str(data.get("aggregation") or "none").lower()
+        if aggregation not in AGGREGATIONS:
+            raise ChartSpecError(f"unsupported aggregation {aggregation!r}")
+        sort = str(data.get("sort") or "none").lower()
+        if sort not in SORTS:
+            raise ChartSpecError(f"unsupported sort {sort!r}")
+        try:
+            limit = int(data["limit"]) if data.get("limit") else None
+            bins = int(data.get("bins") or 20)
+        except (TypeError, ValueError):
+            raise ChartSpecError("limit and bins must be integers") from None
+        return cls(
+            chart_type = chart_type,
+            artifact_id = str(data.get("artifact_id", "")),
+            y = y,
+            x = x,
+            aggregation = aggregation,
+            sort = sort,
+            limit = limit,
+            bins = bins,
+            title = str(data.get("title") or ""),
+            xlabel = str(data.get("xlabel") or ""),
+            ylabel = str(data.get("ylabel") or ""),
+        )
+
+
+def prepare_frame(spec: ChartSpec, frame):
+    """Select, aggregate, sort and limit the table as the spec says."""
+    import pandas as pd
+
+    columns = ([spec.x] if spec.x else []) + spec.y
+    missing = [column for column in columns if column not in frame.columns]
+    if missing:
+        raise ChartSpecError(f"unknown columns {missing}; table has {list(frame.columns)}")
+    data = frame[columns]
+    if spec.aggregation == "count":
+        data = data.groupby(spec.x, sort = False).size().rename(spec.y[0]).reset_index()
+    elif spec.aggregation != "none":
+        data = data.groupby(spec.x, sort = False)[spec.y].agg(spec.aggregation).reset_index()
+    for column in spec.y:
+        if spec.aggregation != "count" and not pd.api.types.is_numeric_dtype(data[column]):
+            converted = pd.to_numeric(data[column], errors = "coerce")
+            if converted.isna().all():
+                raise ChartSpecError(f"column {column!r} is not numeric")
+            data = data.assign(**{column: converted})
+    if spec.sort != "none":
+        data = data.sort_values(spec.y[0], ascending = spec.sort == "asc")
+    elif spec.chart_type == "line" and spec.x:
+        data = data.sort_values(spec.x)
+    if spec.limit:
+        data = data.head(spec.limit)
+    if data.empty:
+        raise ChartSpecError("no rows to plot")
+    return data
+
+
+class _FigureTemplate:
+    """One reusable figure + Agg canvas per chart type."""
+
+    def __init__(self, figsize = (8, 5), dpi = 100):
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        self.figure = Figure(figsize = figsize, dpi = dpi, layout = "tight")
+        FigureCanvasAgg(self.figure)
+        self.lock = threading.Lock()
+
+
+@lru_cache(maxsize = None)
+def _template(chart_type: str) -> _FigureTemplate:
+    return _FigureTemplate(figsize = (6, 6) if chart_type == "pie" else (8, 5))
+
+
+def _draw(spec: ChartSpec, data, ax) -> None:
+    y = spec.y
+    if spec.chart_type in ("bar", "barh"):
+        labels = data[spec.x].astype(str)
+        width = 0.8 / len(y)
+        positions = range(len(data))
+        for i, column in enumerate(y):
+            offsets = [p - 0.4 + width * (i + 0.5) for p in positions]
+            draw = ax.bar if spec.chart_type == "bar" else ax.barh
+            draw(offsets, data[column], width if len(y) > 1 else 0.8, label = column)
+        if spec.chart_type == "bar":
+            ax.set_xticks(list(positions), labels, rotation = 45 if len(data) > 6 else 0, ha = "right" if len(data) > 6 else "center")
+        else:
+            ax.set_yticks(list(positions), labels)
+            ax.invert_yaxis()
+    elif spec.chart_type == "line":
+        for column in y:
+            ax.plot(data[spec.x], data[column], marker = "o" if len(data) <= 30 else None, label = column)
+    elif spec.chart_type == "scatter":
+        for column in y:
+            ax.scatter(data[spec.x], data[column], label = column)
+    elif spec.chart_type == "pie":
+        ax.pie(data[y[0]], labels = data[spec.x].astype(str), autopct = "%1.1f%%", startangle = 90)
+        ax.axis("equal")
+    elif spec.chart_type == "hist":
+        ax.hist(data[y[0]].dropna(), bins = spec.bins)
+    if spec.chart_type != "pie":
+        ax.set_xlabel(spec.xlabel or (y[0] if spec.chart_type in ("barh", "hist") else spec.x or ""))
+        ax.set_ylabel(spec.ylabel or (spec.x if spec.chart_type == "barh" else "count" if spec.chart_type == "hist" else y[0] if len(y) == 1 else ""))
+        ax.grid(axis = "x" if spec.chart_type == "barh" else "y", alpha = 0.3)
+    if len(y) > 1:
+        ax.legend()
+    if spec.title:
+        ax.set_title(spec.title)
+
+
+def render_chart(spec: ChartSpec, frame, path: str) -> str:
+    """Render `spec` over `frame` to a PNG at `path`; returns the one-sentence chart notes."""
+    data = prepare_frame(spec, frame)
+    template = _template(spec.chart_type)
+    with template.lock:
+        template.figure.clear()
+        ax = template.figure.add_subplot()
+        _draw(spec, data, ax)
+        template.figure.savefig(path, format = "png")
+    return chart_notes(spec, data)
+
+
+def _fmt(value: Any) -> str:
+    if hasattr(value, "item"):  # numpy scalar
+        value = value.item()
+    if isinstance(value, float):
+        return f"{value:,.2f}".rstrip("0").rstrip(".")
+    return f"{value:,}" if isinstance(value, int) else str(value)
+
+
+def chart_notes(spec: ChartSpec, data) -> str:
+    """A factual one-line insight computed from the plotted data (not from the model)."""
+    column = spec.y[0]
+    values = data[column].reset_index(drop = True)
+    if spec.chart_type == "hist":
+        return (f"{column} ranges from {_fmt(values.min())} to {_fmt(values.max())} "
+                f"with a median of {_fmt(values.median())} across {len(values)} values.")
+    labels = data[spec.x].reset_index(drop = True)
+    top, bottom = values.idxmax(), values.idxmin()
+    if spec.chart_type == "pie":
+        share = 100 * values[top] / values.sum() if values.sum() else 0
+        return f"{labels[top]} is the largest share of {column} at {share:.1f}%."
+    if spec.chart_type in ("line", "scatter"):
+        return (f"{column} goes from {_fmt(values.iloc[0])} at {labels.iloc[0]} to {_fmt(values.iloc[-1])} "
+                f"at {labels.iloc[-1]}, peaking at {_fmt(values[top])} at {labels[top]}.")
+    if values[top] == values[bottom]:
+        return f"All {len(values)} {spec.x} values have the same {column} ({_fmt(values[top])})."
+    return (f"{labels[top]} has the highest {column} ({_fmt(values[top])}) and "
+            f"{labels[bottom]} the lowest ({_fmt(values[bottom])}).")
+
+
+def spec_prompt(request: str, catalog: str) -> str:
+    return f"""
+        You turn a chart request into a JSON chart spec over one of the data tables below.
+        Respond with a JSON object with these keys:
+          "chart_type": one of {list(CHART_TYPES)},
+          "artifact_id": the id of the table to plot,
+          "x": category / time column (omit for hist),
+          "y": value column, or a list of value columns for grouped bars or multiple lines,
+          "aggregation": one of {list(AGGREGATIONS)} (group rows by x first; "count" counts rows),
+          "sort": one of {list(SORTS)} (by the first y column), "limit": max rows to plot or null,
+          "bins": histogram bins, "title", "xlabel", "ylabel".
+        Use only column names that appear in the table schema.
+        If the request cannot be drawn as one of these chart types from a single table
+        (e.g. it needs derived columns, joins, annotations or several subplots), respond with
+        {{"chart_type": null, "reason": "<why>"}}.
+
+        Request: {request}
+
+        {catalog}
+    """
@@ -1,26 +1,55 @@
 
 from langchain.agents import create_agent
-from langchain_openai import ChatOpenAI
 from prompts import agent_system_prompt
 from agent_state import State 
 from langgraph.constants import END
 from langgraph.types import Command
 from langchain_core.messages import HumanMessage
 from typing import Literal
+from functools import lru_cache
+from llm_registry import get_llm
+from artifact_store import describe_artifacts
 
-llm = ChatOpenAI(model = "gpt-5.1", temperature = 0)
-
-chart_summary_agent = create_agent(
-    llm,
-    tools=[],  # Add image processing tools if available/needed.
-    system_prompt=agent_system_prompt(
-        "You can only generate image captions. You are working with a researcher colleague and a chart generator colleague. "
-        + "Your task is to generate a standalone, concise summary for the provided chart image saved at a local PATH, where the PATH should be and only be provided by your chart generator colleague. The summary should be no more than 3 sentences and should not mention the chart itself."
-    ),
+CHART_SUMMARY_INSTRUCTIONS = (
+    "You can only generate image captions. You are working with a researcher colleague and a chart generator colleague. "
+    + "Your task is to generate a standalone, concise summary for the provided chart image saved at a local PATH, where the PATH should be and only be provided by your chart generator colleague. The summary should be no more than 3 sentences and should not mention the chart itself."
 )
 
-def chart_summary_node(state: State) -> Command[Literal[END]]:
-    result = chart_summary_agent.invoke(state)
+@lru_cache(maxsize = None)
+def get_chart_summary_agent():
+    llm = get_llm("chart_summarizer", temperature = 0)
+
+    return create_agent(
+        llm,
+        tools=[],  # Add image processing tools if available/needed.
+        system_prompt=agent_system_prompt(
+            CHART_SUMMARY_INSTRUCTIONS
+        ),
+    )
+
+async def summarize_chart(state) -> str:
+    """Final-stage summary from the chart notes and table previews only (see final_stage.py)."""
+    context = [
+        f"User question: {state.get('user_query', '')}",
+        f"CHART_PATH: {state.get('chart_path') or 'unknown'}",
+        f"CHART_NOTES: {state.get('chart_notes') or 'none'}",
+    ]
+    if state.get("artifacts"):
+        context.append(describe_artifacts(state["artifacts"]))
+    prompt = [HumanMessage(content = CHART_SUMMARY_INSTRUCTIONS + "\n\n" + "\n".join(context))]
+    reply = await get_llm("chart_summarizer", temperature = 0).ainvoke(prompt)
+    return reply.content.strip()
+
+async def chart_summary_node(state: State) -> Command[Literal["final_merge", END]]:
+    if state.get("final_stage"):
+        summary = await summarize_chart(state)
+        print(f'Chart Summarizer answer: {summary}')
+        return Command(update = {
+            "messages": [HumanMessage(content = summary, name = "chart_summarizer")],
+            "chart_summary": summary,
+        }, goto = "final_merge")
+
+    result = await get_chart_summary_agent().ainvoke(state)
     print(f'Chart Summarizer answer: {result["messages"][-1].content}')
 
     goto = END
@@ -2,40 +2,147 @@
 # NOTE: THIS PERFORMS ARBITRARY CODE EXECUTION, 
 # WHICH CAN BE UNSAFE WHEN NOT SANDBOXED
 from langchain.agents import create_agent
-from langchain_openai import ChatOpenAI
 from helper import python_repl_tool
 from prompts import agent_system_prompt
 from agent_state import State
 from langgraph.types import Command
 from langchain_core.messages import HumanMessage
 from typing import Literal
+from functools import lru_cache
+from llm_registry import get_llm
+from sandbox_pool import get_sandbox_pool
+from artifact_store import describe_artifacts, load_artifact
+from chart_spec import ChartSpec, ChartSpecError, render_chart, spec_prompt
+from chart_cache import chart_key, get_chart_cache, read_chart_notes, read_chart_path, replace_chart_path
+from dataclasses import asdict
+from final_stage import final_stage_goto
+from planner import JSON_MODE
+from telemetry import get_tool_middleware
+import asyncio
+import json
+import os
 
-llm = ChatOpenAI(model = "gpt-5.1", temperature = 0)
-
-chart_agent = create_agent(
-    llm,
-    tools = [python_repl_tool],
-    system_prompt=agent_system_prompt(
-        """
-        You can only generate charts. You are working with a researcher 
-        colleague.
-        1) Print the chart first.
-        2) Save the chart to a file in the current working directory.
-        3) At the very end of your message, output EXACTLY two lines 
-        so the summarizer can find them:
-           CHART_PATH: <relative_path_to_chart_file>
-           CHART_NOTES: <one concise sentence summarizing the main insight in the chart>
-        Do not include any other trailing text after these two lines.
-        """
-    ),
-)
-
-
-
-def chart_generator_node(state: State) -> Command[Literal["chart_summarizer"]]:
-    result = chart_agent.invoke(state)
-    result["messages"][-1] = HumanMessage(content = result["messages"][-1].content, name="chart_generator")
-    goto = "chart_summarizer"
+# Plain bar/line/pie/histogram/scatter charts over a saved table are drawn from a JSON spec
+# (one model call, no generated code); CHART_SPEC=off always uses the code-writing agent.
+CHART_SPEC_ENABLED = os.getenv("CHART_SPEC", "on") != "off"
+
+@lru_cache(maxsize = None)
+def get_chart_agent():
+    llm = get_llm("chart_generator", temperature = 0)
+    # Warm the python_repl_tool workers while the model writes its first tool call.
+    get_sandbox_pool().start()
+
+    return create_agent(
+        llm,
+        tools = [python_repl_tool],
+        middleware = [get_tool_middleware()],
+        system_prompt=agent_system_prompt(
+            """
+            You can only generate charts. You are working with a researcher 
+            colleague.
+            If the request lists data tables, load them in your code with
+            df = load_artifact("<artifact_id>") and plot from the DataFrame.
+            Never retype their values as Python literals.
+            Each python_repl_tool call starts from scratch, so load the data and
+            plot it in the same snippet.
+            1) Print the chart first.
+            2) Save the chart to a file in the current working directory.
+            3) At the very end of your message, output EXACTLY two lines 
+            so the summarizer can find them:
+               CHART_PATH: <relative_path_to_chart_file>
+               CHART_NOTES: <one concise sentence summarizing the main insight in the chart>
+            Do not include any other trailing text after these two lines.
+            """
+        ),
+    )
+
+
+async def chart_from_spec(request: str, artifacts, catalog: str):
+    """Ask for a chart spec and render it. Returns the chart_generator reply, or None when
+    the request needs free-form code."""
+    llm = get_llm("chart_spec", temperature = 0, model_kwargs = JSON_MODE)
+    reply = await llm.ainvoke([HumanMessage(content = spec_prompt(request, catalog))])
+    try:
+        data = json.loads(reply.content)
+        if isinstance(data, dict) and not data.get("chart_type"):
+            print(f"Chart spec declined: {data.get('reason', 'no reason given')}")
+            return None
+        spec = ChartSpec.from_dict(data)
+        if spec.artifact_id not in {ref["artifact_id"] for ref in artifacts}:
+            raise ChartSpecError(f"unknown artifact_id {spec.artifact_id!r}")
+        cache = get_chart_cache()
+        key = chart_key(spec = asdict(spec))
+        hit = cache.get(key)
+        if hit is not None:
+            path, notes = hit
+        else:
+            staging = cache.staging_path(key)
+            notes = await asyncio.to_thread(render_chart, spec, load_artifact(spec.artifact_id), staging)
+            path = cache.put(key, staging, notes)
+    except Exception as e:
+        print(f"Chart spec failed, falling back to code: {e}")
+        return None
+    return (
+        f"Rendered a {spec.chart_type} chart of {', '.join(spec.y)} from {spec.artifact_id}.\n"
+        f"CHART_PATH: {path}\n"
+        f"CHART_NOTES: {notes}"
+    )
+
+
+def request_chart_key(request: str, artifacts) -> str:
+    """Cache key for a chart the agent draws from saved tables, known before it runs."""
+    return chart_key(request = request, artifacts = sorted(ref["artifact_id"] for ref in artifacts))
+
+
+def store_generated_chart(messages, key = None) -> str:
+    """Move the image the agent wrote into the chart cache and point CHART_PATH at it.
+    Without a request key (no saved tables) it is stored under a hash of its plotting
+    code, which only dedupes storage. Returns the final message content."""
+    content = messages[-1].content
+    path = read_chart_path(content) if isinstance(content, str) else None
+    if not path or not os.path.isfile(path):
+        return content
+    if key is None:
+        code = [
+            call["args"].get("code", "")
+            for message in messages
+            for call in getattr(message, "tool_calls", None) or []
+            if call["name"] == python_repl_tool.name
+        ]
+        key = chart_key(code = code)
+    try:
+        stored = get_chart_cache().put(key, path, read_chart_notes(content))
+    except OSError as e:
+        print(f"Could not store chart {path} in the chart cache: {e}")
+        return content
+    return replace_chart_path(content, stored)
+
+
+async def chart_generator_node(state: State) -> Command[Literal["chart_summarizer", "synthesizer"]]:
+    artifacts = state.get("artifacts") or []
+    reply = key = None
+    if artifacts:
+        # The data is handed over by id: the model sees the request and the table schemas
+        # (plus a few preview rows) and writes a spec or plotting code, never the values.
+        request = state.get("agent_query") or state.get("user_query") or state["messages"][0].content
+        catalog = describe_artifacts(artifacts)
+        if CHART_SPEC_ENABLED:
+            reply = await chart_from_spec(request, artifacts, catalog)
+        key = request_chart_key(request, artifacts)
+        hit = get_chart_cache().get(key) if reply is None else None
+        if hit is not None:
+            path, notes = hit
+            reply = f"Reused the chart drawn earlier for this request and data.\nCHART_PATH: {path}\nCHART_NOTES: {notes}"
+        agent_input = {"messages": [HumanMessage(content = f"{request}\n\n{catalog}")]}
+    else:
+        agent_input = state
+    if reply is not None:
+        result = {"messages": [HumanMessage(content = reply, name = "chart_generator")]}
+    else:
+        result = await get_chart_agent().ainvoke(agent_input)
+        content = store_generated_chart(result["messages"], key)
+        result["messages"][-1] = HumanMessage(content = content, name="chart_generator")
+    goto = final_stage_goto(state, result["messages"][-1].content)
     return Command(
         update = {
             "messages": result["messages"],
@@ -0,0 +1,216 @@
+# Builds the synthesizer's context from the graph messages without another model call:
+#   1. select   keep agent answers and data tool outputs; drop planner/executor JSON,
+#               tool-call stubs, schema/listing tools and the question itself
+#   2. condense tool outputs locally: JSON records and markdown tables become a compact
+#               table of the top-k rows (+ row count and column totals), search results
+#               become title/url/snippet lines (a one-line header and a trailing note such
+#               as text2sql's artifact line are kept), paragraphs already seen are dropped
+#   3. budget   fit the result into a token budget, agent answers first, then tool
+#               outputs in order, cutting the last one that does not fit
+#
+#   SYNTH_CONTEXT_TOKENS   token budget for the context (default 3000, ~4 chars per token)
+#   SYNTH_TOP_K_ROWS       rows kept per table (default 20)
+import json
+import os
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+SYNTH_CONTEXT_TOKENS = int(os.getenv("SYNTH_CONTEXT_TOKENS", "3000"))
+SYNTH_TOP_K_ROWS = int(os.getenv("SYNTH_TOP_K_ROWS", "20"))
+
+CHARS_PER_TOKEN = 4
+
+# Messages that only steer the graph, and tools whose output is metadata, not data.
+CONTROL_MESSAGE_NAMES = ("initial_plan", "replan", "executor")
+SKIP_TOOL_NAMES = ("mongodb_list_collections", "mongodb_schema", "mongodb_query_checker", "save_table_tool")
+
+
+def _text(content: Any) -> str:
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "\n".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+    return str(content)
+
+
+def select_messages(messages: Iterable[Any]) -> List[Tuple[str, str, Any]]:
+    """(kind, label, message) for the messages worth showing the synthesizer.
+    kind is "answer" (an agent's reply) or "tool" (raw tool output)."""
+    selected = []
+    first_human_seen = False
+    for message in messages:
+        kind = getattr(message, "type", "")
+        name = getattr(message, "name", None) or ""
+        if kind == "human" and not name and not first_human_seen:
+            first_human_seen = True  # the user question; passed separately
+            continue
+        if name in CONTROL_MESSAGE_NAMES or name == "synthesizer":
+            continue
+        if kind == "tool":
+            if name in SKIP_TOOL_NAMES or getattr(message, "status", "success") == "error":
+                continue
+            selected.append(("tool", name or "tool", message))
+        elif kind == "ai":
+            if getattr(message, "tool_calls", None) and not _text(message.content).strip():
+                continue
+            selected.append(("answer", name or "agent", message))
+        elif kind == "human" and name:
+            selected.append(("answer", name, message))
+    return selected
+
+
+def _scalar(value: Any) -> Any:
+    """Unwrap extended-JSON values ({"$oid": ...}, {"$date": ...}) and flatten for a table cell."""
+    if isinstance(value, dict) and len(value) == 1:
+        key, inner = next(iter(value.items()))
+        if key.startswith("$"):
+            return _scalar(inner)
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, separators = (",", ":"), default = str)
+    return value
+
+
+def _flatten(record: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
+    flat = {}
+    for key, value in record.items():
+        column = f"{prefix}{key}"
+        if isinstance(value, dict) and not (len(value) == 1 and next(iter(value)).startswith("$")):
+            flat.update(_flatten(value, f"{column}."))
+        else:
+            flat[column] = _scalar(value)
+    return flat
+
+
+def _cell(value: Any, width: int = 60) -> str:
+    text = "" if value is None else str(value).replace("\n", " ").replace("|", "/")
+    return text if len(text) <= width else text[: width - 1] + "…"
+
+
+def records_table(records: List[Dict[str, Any]], top_k: int) -> str:
+    """Markdown table of the first top_k records, with the row count and numeric column totals."""
+    rows = [_flatten(record) for record in records]
+    columns: List[str] = []
+    for row in rows:
+        columns.extend(column for column in row if column not in columns)
+    lines = ["| " + " | ".join(columns) + " |", "|" + "---|" * len(columns)]
+    for row in rows[:top_k]:
+        lines.append("| " + " | ".join(_cell(row.get(column)) for column in columns) + " |")
+    if len(rows) > top_k:
+        lines.append(f"({len(rows) - top_k} more rows, {len(rows)} total)")
+        totals = []
+        for column in columns:
+            values = [row.get(column) for row in rows]
+            if values and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+                totals.append(f"{column} sum={sum(values):,.4g} min={min(values):,.4g} max={max(values):,.4g}")
+        if totals:
+            lines.append("All rows: " + "; ".join(totals))
+    return "\n".join(lines)
+
+
+def _search_results(data: Dict[str, Any], top_k: int) -> Optional[str]:
+    results = data.get("results")
+    if not isinstance(results, list) or not all(isinstance(r, dict) for r in results):
+        return None
+    results = sorted(results, key = lambda r: r.get("score") or 0, reverse = True)[:top_k]
+    lines = []
+    if data.get("answer"):
+        lines.append(f"Search answer: {data['answer']}")
+    for result in results:
+        snippet = re.sub(r"\s+", " ", str(result.get("content", ""))).strip()
+        lines.append(f"- {result.get('title', '')} ({result.get('url', '')}): {_cell(snippet, 400)}")
+    return "\n".join(lines)
+
+
+def _condense_markdown_tables(text: str, top_k: int) -> str:
+    """Keep the header and the first top_k rows of every markdown table."""
+    out, table = [], []
+
+    def flush():
+        if len(table) > top_k + 2:
+            out.extend(table[: top_k + 2])
+            out.append(f"({len(table) - top_k - 2} more rows)")
+        else:
+            out.extend(table)
+        table.clear()
+
+    for line in text.splitlines():
+        if line.lstrip().startswith("|"):
+            table.append(line)
+            continue
+        if table:
+            flush()
+        out.append(line)
+    if table:
+        flush()
+    return "\n".join(out)
+
+
+def _split_json(text: str) -> Optional[Tuple[str, Any, str]]:
+    """(header, data, footer) for a JSON document at the start of the text or after a
+    one-line header, e.g. a query result framed as "N documents; the first 50:" ...
+    "Full result saved as artifact ..."; None if there is none."""
+    first_line_end = text.find("\n")
+    for start in (0, first_line_end + 1 if first_line_end >= 0 else -1):
+        if start < 0 or text[start:start + 1] not in ("[", "{"):
+            continue
+        try:
+            data, end = json.JSONDecoder().raw_decode(text, start)
+        except ValueError:
+            continue
+        return text[:start].strip(), data, text[end:].strip()
+    return None
+
+
+def condense_tool_output(text: str, top_k: int = SYNTH_TOP_K_ROWS) -> str:
+    parsed = _split_json(text.strip())
+    if parsed is not None:
+        header, data, footer = parsed
+        condensed = None
+        if isinstance(data, list) and data and all(isinstance(r, dict) for r in data):
+            condensed = records_table(data, top_k)
+        elif isinstance(data, dict):
+            condensed = _search_results(data, top_k)
+        if condensed is not None:
+            return "\n".join(part for part in (header, condensed, footer) if part)
+    return _condense_markdown_tables(text, top_k)
+
+
+def _dedupe_paragraphs(text: str, seen: set) -> str:
+    kept = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        key = re.sub(r"\W+", " ", paragraph).strip().lower()
+        if not key or key in seen:
+            continue
+        seen.add(key)
+        kept.append(paragraph.strip())
+    return "\n\n".join(kept)
+
+
+def build_context(messages: Iterable[Any], budget_tokens: int = SYNTH_CONTEXT_TOKENS,
+                  top_k: int = SYNTH_TOP_K_ROWS, include_tools: bool = True) -> str:
+    """Selected, condensed and budgeted context for the synthesizer prompt.
+    include_tools=False keeps only the agents' answers."""
+    seen: set = set()
+    blocks = []
+    for kind, label, message in select_messages(messages):
+        if kind == "tool" and not include_tools:
+            continue
+        text = _text(message.content)
+        if kind == "tool":
+            text = condense_tool_output(text, top_k)
+        text = _dedupe_paragraphs(text, seen)
+        if text:
+            blocks.append((kind, f"[{label}]\n{text}"))
+
+    # Agent answers carry the conclusions, so they get the budget first.
+    remaining = budget_tokens * CHARS_PER_TOKEN
+    keep = [""] * len(blocks)
+    for priority in ("answer", "tool"):
+        for i, (kind, block) in enumerate(blocks):
+            if kind != priority or remaining <= 0:
+                continue
+            if len(block) > remaining:
+                block = block[: max(remaining - 20, 0)].rstrip() + "\n…[truncated]"
+            keep[i] = block
+            remaining -= len(block)
+    return "\n\n".join(block for block in keep if block)
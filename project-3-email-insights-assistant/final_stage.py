@@ -0,0 +1,60 @@
+# Final stage after a chart: the chart summary and the text answer are produced in
+# parallel, each from the few inputs it needs, and merged into final_answer.
+#
+#   FINAL_STAGE=parallel     (default) chart_generator fans out to chart_summarizer and
+#                            synthesizer in the same step; final_merge joins them.
+#                            The summarizer gets the question, CHART_PATH/CHART_NOTES and
+#                            the table previews; the synthesizer gets the question and the
+#                            data messages, without planner/executor chatter.
+#   FINAL_STAGE=sequential   chart_summarizer reads the whole state and its reply is the
+#                            final answer (the previous behaviour).
+import os
+from typing import Optional
+
+from langgraph.constants import END
+from langgraph.types import Command, Send
+
+from agent_state import State
+from chart_cache import read_chart_notes, read_chart_path
+
+FINAL_STAGE = os.getenv("FINAL_STAGE", "parallel")
+
+# Control messages that only matter for routing, not for answering the question.
+CONTROL_MESSAGE_NAMES = ("initial_plan", "replan", "executor")
+
+
+def final_stage_goto(state: State, chart_reply: str):
+    """Where chart_generator goes next: chart_summarizer, or both final-stage nodes via Send."""
+    if FINAL_STAGE != "parallel":
+        return "chart_summarizer"
+    messages = state.get("messages", [])
+    user_query = state.get("user_query") or (messages[0].content if messages else "")
+    targets = [Send("chart_summarizer", {
+        "final_stage": True,
+        "user_query": user_query,
+        "chart_path": read_chart_path(chart_reply),
+        "chart_notes": read_chart_notes(chart_reply),
+        "artifacts": state.get("artifacts") or [],
+    })]
+    if "synthesizer" in (state.get("enabled_agents") or ["synthesizer"]):
+        targets.append(Send("synthesizer", {
+            "final_stage": True,
+            "user_query": user_query,
+            "messages": [m for m in messages if getattr(m, "name", None) not in CONTROL_MESSAGE_NAMES],
+        }))
+    return targets
+
+
+def merge_final_answer(synthesis: Optional[str], chart_summary: Optional[str]) -> str:
+    parts = []
+    if synthesis and synthesis.strip():
+        parts.append(synthesis.strip())
+    if chart_summary and chart_summary.strip():
+        parts.append(f"**Chart:** {chart_summary.strip()}" if parts else chart_summary.strip())
+    return "\n\n".join(parts)
+
+
+async def final_merge_node(state: State) -> Command:
+    answer = merge_final_answer(state.get("synthesis"), state.get("chart_summary"))
+    print(f"Final answer: {answer}")
+    return Command(update = {"final_answer": answer}, goto = END)
@@ -0,0 +1,157 @@
+# Response caches for deterministic LLM calls, plugged into the chat models built by
+# llm_registry through LangChain's `cache=` hook (BaseCache). Entries are keyed by the
+# model + call parameters (LangChain's llm_string, which includes bound tools and
+# response_format) and a hash of the canonicalized messages.
+#
+#   LRUResponseCache      in-memory, bounded by entry count, optional TTL
+#   SQLiteResponseCache   on-disk, survives restarts, bounded by entry count, optional TTL;
+#                         a recorded file also serves as an offline replay of earlier runs
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional, Sequence
+
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+
+# Per-response fields that differ between otherwise identical calls (request ids,
+# timestamps, token counts) and must not leak into the key of the next turn.
+_VOLATILE_MESSAGE_FIELDS = ("id", "response_metadata", "usage_metadata")
+
+
+def canonical_prompt(prompt: str) -> str:
+    """Normalize LangChain's serialized message list so equivalent conversations hash the same."""
+    try:
+        messages = json.loads(prompt)
+    except ValueError:
+        return prompt
+    if isinstance(messages, list):
+        for message in messages:
+            kwargs = message.get("kwargs") if isinstance(message, dict) else None
+            if isinstance(kwargs, dict):
+                for field in _VOLATILE_MESSAGE_FIELDS:
+                    kwargs.pop(field, None)
+    return json.dumps(messages, sort_keys = True, separators = (",", ":"))
+
+
+def cache_key(prompt: str, llm_string: str) -> str:
+    hasher = hashlib.sha256()
+    hasher.update(llm_string.encode("utf-8"))
+    hasher.update(b"\0")
+    hasher.update(canonical_prompt(prompt).encode("utf-8"))
+    return hasher.hexdigest()
+
+
+class LRUResponseCache(BaseCache):
+    """In-process LRU cache with an entry limit and an optional TTL (seconds, 0 = never)."""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, tuple[float, Sequence[Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Any]]:
+        key = cache_key(prompt, llm_string)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl and time.time() - entry[0] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Any]) -> None:
+        key = cache_key(prompt, llm_string)
+        with self._lock:
+            self._entries[key] = (time.time(), return_val)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last = False)
+
+    async def alookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Any]]:
+        return self.lookup(prompt, llm_string)
+
+    async def aupdate(self, prompt: str, llm_string: str, return_val: Sequence[Any]) -> None:
+        self.update(prompt, llm_string, return_val)
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteResponseCache(BaseCache):
+    """SQLite-backed cache; least recently used entries are evicted past `max_entries`."""
+
+    def __init__(self, path: str | Path = ".llm_cache.sqlite", max_entries: int = 10000, ttl: float = 0):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents = True, exist_ok = True)
+        self._conn = sqlite3.connect(self.path, check_same_thread = False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                   key TEXT PRIMARY KEY,
+                   llm_string TEXT NOT NULL,
+                   generations TEXT NOT NULL,
+                   created_at REAL NOT NULL,
+                   accessed_at REAL NOT NULL
+               )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+        self._conn.commit()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Any]]:
+        key = cache_key(prompt, llm_string)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT generations, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self.ttl and now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return [loads(generation, allowed_objects = "core") for generation in json.loads(row[0])]
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Any]) -> None:
+        key = cache_key(prompt, llm_string)
+        payload = json.dumps([dumps(generation) for generation in return_val])
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, llm_string, generations, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, llm_string, payload, now, now),
+            )
+            self._conn.execute(
+                """DELETE FROM responses WHERE key IN (
+                       SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                   )""",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
@@ -0,0 +1,240 @@
+# Pool of pre-warmed Python worker subprocesses for python_repl_tool.
+# NOTE: this isolates the agent process from chart code (crashes, hangs, memory blowups)
+# and bounds CPU/memory per run; it is not a security sandbox for hostile code.
+#
+# Each worker imports numpy/pandas/pyarrow/matplotlib (Agg backend) once at start, then
+# runs snippets in a fresh namespace that provides load_artifact (see artifact_store.py).
+# Unlike the in-process PythonREPL, nothing carries over between snippets (a run may go
+# to either worker); python_repl_tool's description tells the model so.
+# Per run: wall-clock timeout (worker is killed and replaced), CPU-seconds limit
+# (RLIMIT_CPU) and address-space limit (RLIMIT_AS).
+# Workers are recycled after SANDBOX_MAX_RUNS runs.
+#
+#   SANDBOX_WORKERS       pool size (default 2)
+#   SANDBOX_TIMEOUT       wall-clock seconds per run (default 60)
+#   SANDBOX_CPU_SECONDS   CPU seconds per run (default 30)
+#   SANDBOX_MEMORY_MB     address-space limit per worker (default 2048, 0 = unlimited)
+#   SANDBOX_MAX_RUNS      runs before a worker is recycled (default 50)
+import json
+import os
+import queue
+import selectors
+import signal
+import subprocess
+import sys
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+class SandboxError(RuntimeError):
+    """The worker could not produce a result (timeout, crash, protocol error)."""
+
+
+class _Worker:
+    def __init__(self, memory_mb: int):
+        env = os.environ.copy()
+        env.update({"MPLBACKEND": "Agg", "OPENBLAS_NUM_THREADS": "1", "OMP_NUM_THREADS": "1"})
+        self.proc = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--worker", str(memory_mb)],
+            stdin = subprocess.PIPE,
+            stdout = subprocess.PIPE,
+            env = env,
+            cwd = os.getcwd(),
+        )
+        self.runs = 0
+        self.ready = False
+        self._buffer = b""
+
+    def _read_message(self, deadline: float) -> Dict[str, Any]:
+        selector = selectors.DefaultSelector()
+        selector.register(self.proc.stdout, selectors.EVENT_READ)
+        try:
+            while b"\n" not in self._buffer:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError
+                if not selector.select(remaining):
+                    continue
+                chunk = os.read(self.proc.stdout.fileno(), 65536)
+                if not chunk:
+                    code = self.proc.wait()
+                    if code == -getattr(signal, "SIGXCPU", 0):
+                        raise SandboxError("CPU time limit exceeded")
+                    raise SandboxError(f"worker exited with code {code}")
+                self._buffer += chunk
+        finally:
+            selector.close()
+        line, self._buffer = self._buffer.split(b"\n", 1)
+        return json.loads(line)
+
+    def wait_ready(self, timeout: float) -> None:
+        if not self.ready:
+            message = self._read_message(time.monotonic() + timeout)
+            if message.get("ready") is not True:
+                raise SandboxError(f"unexpected worker handshake: {message}")
+            self.ready = True
+
+    def run(self, code: str, timeout: float, cpu_seconds: int) -> Dict[str, Any]:
+        request = json.dumps({"code": code, "cpu_seconds": cpu_seconds}) + "\n"
+        self.proc.stdin.write(request.encode("utf-8"))
+        self.proc.stdin.flush()
+        self.runs += 1
+        return self._read_message(time.monotonic() + timeout)
+
+    def kill(self) -> None:
+        if self.proc.poll() is None:
+            self.proc.kill()
+        self.proc.wait()
+        for pipe in (self.proc.stdin, self.proc.stdout):
+            try:
+                pipe.close()
+            except OSError:
+                pass
+
+
+class SandboxPool:
+    def __init__(
+        self,
+        size: int = 2,
+        timeout: float = 60,
+        cpu_seconds: int = 30,
+        memory_mb: int = 2048,
+        max_runs: int = 50,
+        startup_timeout: float = 60,
+    ):
+        self.size = size
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self.max_runs = max_runs
+        self.startup_timeout = startup_timeout
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._started = False
+        self._closed = False
+
+    def start(self) -> None:
+        """Spawn the workers without waiting for them; they warm up in the background."""
+        with self._lock:
+            if not self._started:
+                for _ in range(self.size):
+                    self._idle.put(_Worker(self.memory_mb))
+                self._started = True
+
+    def _replace(self, worker: _Worker) -> None:
+        worker.kill()
+        if not self._closed:
+            # Start the replacement right away so it warms up before the next run.
+            self._idle.put(_Worker(self.memory_mb))
+
+    def run(self, code: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Run `code` in a warm worker. Returns {"ok", "stdout", "error", "duration_s"}."""
+        self.start()
+        worker = self._idle.get()
+        started = time.monotonic()
+        try:
+            worker.wait_ready(self.startup_timeout)
+            result = worker.run(code, timeout or self.timeout, self.cpu_seconds)
+        except TimeoutError:
+            self._replace(worker)
+            raise SandboxError(f"execution timed out after {timeout or self.timeout:.0f}s") from None
+        except (SandboxError, OSError, ValueError) as exc:
+            self._replace(worker)
+            raise SandboxError(f"worker failed: {exc}") from None
+        except BaseException:
+            self._replace(worker)
+            raise
+        result["duration_s"] = time.monotonic() - started
+        if worker.runs >= self.max_runs:
+            self._replace(worker)
+        else:
+            self._idle.put(worker)
+        return result
+
+    def close(self) -> None:
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().kill()
+            except queue.Empty:
+                break
+
+
+@lru_cache(maxsize = None)
+def get_sandbox_pool() -> SandboxPool:
+    pool = SandboxPool(
+        size = _env_int("SANDBOX_WORKERS", 2),
+        timeout = _env_int("SANDBOX_TIMEOUT", 60),
+        cpu_seconds = _env_int("SANDBOX_CPU_SECONDS", 30),
+        memory_mb = _env_int("SANDBOX_MEMORY_MB", 2048),
+        max_runs = _env_int("SANDBOX_MAX_RUNS", 50),
+    )
+    import atexit
+    atexit.register(pool.close)
+    return pool
+
+
+def _worker_main(memory_mb: int) -> None:
+    # The protocol uses a private copy of stdout; fd 1 is pointed at stderr so output
+    # written below the sys.stdout level (C extensions, os.system) cannot corrupt it.
+    # Requests likewise come in on a private copy of stdin, so input() in a snippet sees EOF.
+    protocol = os.fdopen(os.dup(1), "w", encoding = "utf-8")
+    os.dup2(2, 1)
+    requests = os.fdopen(os.dup(0), "r", encoding = "utf-8")
+    os.dup2(os.open(os.devnull, os.O_RDONLY), 0)
+    sys.stdin = open(os.devnull, "r")
+
+    import contextlib
+    import io
+    import traceback
+
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import numpy  # noqa: F401  (warm import)
+    import pandas  # noqa: F401  (warm import)
+    import pyarrow  # noqa: F401  (warm import)
+    from artifact_store import load_artifact
+
+    try:
+        import resource
+    except ImportError:  # not available on Windows; runs without CPU/memory limits
+        resource = None
+    if resource is not None and memory_mb > 0:
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    def reply(message: Dict[str, Any]) -> None:
+        protocol.write(json.dumps(message) + "\n")
+        protocol.flush()
+
+    reply({"ready": True})
+    for line in requests:
+        request = json.loads(line)
+        if resource is not None and request.get("cpu_seconds"):
+            usage = resource.getrusage(resource.RUSAGE_SELF)
+            soft = int(usage.ru_utime + usage.ru_stime) + int(request["cpu_seconds"])
+            resource.setrlimit(resource.RLIMIT_CPU, (soft, soft + 1))
+        stdout = io.StringIO()
+        error = None
+        try:
+            with contextlib.redirect_stdout(stdout):
+                exec(request["code"], {"__name__": "__main__", "load_artifact": load_artifact})
+        except MemoryError:
+            error = "MemoryError: snippet exceeded the sandbox memory limit"
+        except BaseException:
+            error = traceback.format_exc(limit = 5)
+        finally:
+            plt.close("all")
+        reply({"ok": error is None, "stdout": stdout.getvalue(), "error": error})
+
+
+if __name__ == "__main__" and len(sys.argv) > 1 and sys.argv[1] == "--worker":
+    _worker_main(int(sys.argv[2]))
@@ -0,0 +1,94 @@
+# Offline stand-ins for the chat models and agents used by the graph nodes.
+# They sleep for a fixed latency instead of calling the API, so the benchmarks
+# can drive the real graph without network access or API spend.
+import asyncio
+import json
+import re
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+
+class StubChatModel:
+    """Drop-in for ChatOpenAI: `reply(messages) -> str` builds the response content.
+    `per_1k_chars` adds latency per 1000 prompt characters, to model prompt processing."""
+
+    def __init__(self, reply, latency: float = 0.0, per_1k_chars: float = 0.0):
+        self.reply = reply
+        self.latency = latency
+        self.per_1k_chars = per_1k_chars
+        self.calls = 0
+        self.prompt_chars = 0
+
+    def _delay(self, input) -> float:
+        chars = len(_prompt_text(input.get("messages", []) if isinstance(input, dict) else input))
+        self.prompt_chars += chars
+        return self.latency + self.per_1k_chars * chars / 1000
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self._delay(input))
+        return AIMessage(content = self.reply(input))
+
+    def invoke(self, input, config=None, **kwargs):
+        self.calls += 1
+        time.sleep(self._delay(input))
+        return AIMessage(content = self.reply(input))
+
+
+class StubAgent(StubChatModel):
+    """Drop-in for a compiled `create_agent` graph: appends one reply to the input messages."""
+
+    def _result(self, input):
+        messages = input.get("messages", []) if isinstance(input, dict) else input
+        if isinstance(messages, str):
+            messages = [HumanMessage(content = messages)]
+        messages = list(messages or [])
+        return {"messages": messages + [AIMessage(content = self.reply(messages))]}
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self._delay(input))
+        return self._result(input)
+
+    def invoke(self, input, config=None, **kwargs):
+        self.calls += 1
+        time.sleep(self._delay(input))
+        return self._result(input)
+
+
+def _prompt_text(messages) -> str:
+    if isinstance(messages, str):
+        return messages
+    return "\n".join(str(getattr(m, "content", m)) for m in messages or [])
+
+
+def make_planner_reply(data_agent: str, chart: bool = True):
+    """Planner stub: a fixed plan of data step -> chart (optional) -> final step."""
+    steps = [{"agent": data_agent, "action": "Fetch the data needed for the question."}]
+    if chart:
+        steps.append({"agent": "chart_generator", "action": "Chart the data."})
+        steps.append({"agent": "chart_summarizer", "action": "Summarize the chart."})
+    else:
+        steps.append({"agent": "synthesizer", "action": "Answer the question."})
+    plan = {str(i): step for i, step in enumerate(steps, start = 1)}
+    return lambda messages: json.dumps(plan)
+
+
+def executor_reply(messages) -> str:
+    """Executor stub: always routes to the agent assigned to the current plan step."""
+    match = re.search(r"Current plan step \.*: .*?'agent': '(\w+)'", _prompt_text(messages))
+    goto = match.group(1) if match else "synthesizer"
+    return json.dumps({"replan": False, "goto": goto, "reason": "Following the plan.", "query": "stub query"})
+
+
+def data_reply(messages) -> str:
+    return "Results:\n| name | value |\n| A | 10 |\n| B | 20 |\n| C | 30 |"
+
+
+def chart_reply(messages) -> str:
+    return "Chart saved.\nCHART_PATH: stub_chart.png\nCHART_NOTES: C has the highest value."
+
+
+def summary_reply(messages) -> str:
+    return "C leads with 30, followed by B and A."
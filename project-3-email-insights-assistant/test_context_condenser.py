@@ -0,0 +1,37 @@
+import json
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+
+from context_condenser import condense_tool_output
+from text2sql_agent import query_result_content
+
+
+def _records(rows):
+    return [{"_id": {"$oid": f"{i:024x}"}, "sender": f"sender{i % 40}@example.com", "count": i} for i in range(rows)]
+
+
+def test_framed_query_result_is_condensed():
+    records = _records(500)
+    ref = {"artifact_id": "art-123", "rows": len(records)}
+    content = query_result_content(json.dumps(records), records, ref)
+    condensed = condense_tool_output(content, top_k = 5)
+    assert len(condensed) < len(content) // 5
+    assert condensed.startswith("500 documents; the first 50:")
+    assert condensed.endswith("Full result saved as artifact art-123 (500 rows).")
+    assert "| _id | sender | count |" in condensed
+    assert "45 more rows, 50 total" in condensed
+
+
+def test_small_query_result_keeps_artifact_note():
+    records = _records(3)
+    ref = {"artifact_id": "art-456", "rows": len(records)}
+    content = query_result_content(json.dumps(records), records, ref)
+    condensed = condense_tool_output(content)
+    assert condensed.splitlines()[0] == "| _id | sender | count |"
+    assert condensed.endswith("Full result saved as artifact art-456 (3 rows).")
+
+
+def test_prose_is_left_alone():
+    text = "No documents matched.\nTry a wider date range [e.g. 30 days]."
+    assert condense_tool_output(text) == text
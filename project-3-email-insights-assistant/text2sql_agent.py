@@ -1,81 +1,121 @@
 import os
+from functools import lru_cache
 from typing import  Literal
 
 from langchain_core.messages import AIMessage
 from prompts import MONGODB_AGENT_SYSTEM_PROMPT
 
-# MongoDB Agent Toolkit
-from langchain_mongodb.agent_toolkit.database import MongoDBDatabase
-from langchain_mongodb.agent_toolkit.toolkit import MongoDBDatabaseToolkit
 from langchain.messages import ToolMessage
 from langchain.agents.middleware.types import wrap_tool_call
-# LangChain Core
-from langchain_openai import ChatOpenAI
 
-import uuid
 from langchain.agents import create_agent
 # LangGraph Core
 from langgraph.graph import END, START, MessagesState, StateGraph
 from langgraph.prebuilt import ToolNode
-from pymongo import MongoClient
 from agent_state import State
+from llm_registry import get_llm
 from langgraph.types import Command
 from langchain_core.messages import HumanMessage
 
-print("📦 All dependencies installed successfully!")
-
-
-from pymongo.mongo_client import MongoClient
-from pymongo.server_api import ServerApi
-
 from text2sql_llmsummarizer import LLMSummarizingMongoDBSaver
+from artifact_store import collect_artifacts, get_artifact_store
+from telemetry import get_tool_middleware
 
-db = MongoDBDatabase.from_connection_string(os.getenv("MONGODB_URI"), database="email_objects")
+# Everything below that talks to MongoDB or OpenAI is built on first use and cached,
+# so importing this module (and the graph) is fast and needs no network.
 
-client = MongoClient(
-    os.getenv("MONGODB_URI"), appname="devrel.showcase.notebook.agent.text_to_mql_agent"
-)
-
-# Preview database collections
-print("\n📋 Available Collections:", list(db.get_usable_collection_names()))
-
-text2sql_llm = ChatOpenAI(model="gpt-5.1", temperature=0)
+@lru_cache(maxsize=None)
+def get_mongo_client():
+    from pymongo import MongoClient
+    return MongoClient(
+        os.getenv("MONGODB_URI"), appname="devrel.showcase.notebook.agent.text_to_mql_agent"
+    )
 
-toolkit = MongoDBDatabaseToolkit(db=db, llm=text2sql_llm)
+@lru_cache(maxsize=None)
+def get_database():
+    """MongoDBDatabase lists the collections when constructed, so this is the first network call."""
+    from langchain_mongodb.agent_toolkit.database import MongoDBDatabase
+    db = MongoDBDatabase(get_mongo_client(), database="email_objects")
+    print("\n📋 Available Collections:", list(db.get_usable_collection_names()))
+    return db
 
-tools = toolkit.get_tools()
+def get_text2sql_llm():
+    return get_llm("text2sql_agent", temperature=0)
 
-tool = {t.name: t for t in tools}
+@lru_cache(maxsize=None)
+def get_tools():
+    from langchain_mongodb.agent_toolkit.toolkit import MongoDBDatabaseToolkit
+    toolkit = MongoDBDatabaseToolkit(db=get_database(), llm=get_text2sql_llm())
+    return toolkit.get_tools()
 
 @wrap_tool_call
-def handle_tool_errors(request, handler):
+async def handle_tool_errors(request, handler):
     try:
-        return handler(request)
+        return await handler(request)
     except Exception as e:
         return ToolMessage(content=f"Tool Execution Error: {e}" + "Please check the syntax of the query and try again.", name=request.tool_call["name"], tool_call_id=request.tool_call["id"], status="error")
+# Query results longer than this many documents are shown to the model as a preview;
+# the full result is in the artifact store for chart_generator.
+ARTIFACT_INLINE_ROWS = int(os.getenv("ARTIFACT_INLINE_ROWS", "50"))
+
+def _query_records(content):
+    """Documents returned by mongodb_query (extended JSON), or None if it returned an error or no table."""
+    from bson import json_util
+    try:
+        records = json_util.loads(content) if isinstance(content, str) else None
+    except ValueError:
+        return None
+    if isinstance(records, list) and records and all(isinstance(r, dict) for r in records):
+        return records
+    return None
+
+def query_result_content(content, records, ref):
+    """The mongodb_query output the model sees once the result is saved as an artifact:
+    the first ARTIFACT_INLINE_ROWS documents and a note with the artifact id."""
+    if len(records) > ARTIFACT_INLINE_ROWS:
+        from bson import json_util
+        content = f"{len(records)} documents; the first {ARTIFACT_INLINE_ROWS}:\n" + json_util.dumps(records[:ARTIFACT_INLINE_ROWS], indent=2)
+    return content + f"\n\nFull result saved as artifact {ref['artifact_id']} ({ref['rows']} rows)."
+
+@wrap_tool_call
+async def register_query_results(request, handler):
+    """Save mongodb_query results as table artifacts so chart_generator loads them by id."""
+    result = await handler(request)
+    if request.tool_call["name"] != "mongodb_query" or not isinstance(result, ToolMessage) or result.status == "error":
+        return result
+    records = _query_records(result.content)
+    if records is None:
+        return result
+    query = request.tool_call["args"].get("query", "")
+    collection = query.split(".")[1] if query.count(".") >= 2 else "query"
+    ref = get_artifact_store().put_table(records, name=f"{collection}_result", source="text2sql_agent", description=query[:300])
+    content = query_result_content(result.content, records, ref)
+    return ToolMessage(content=content, artifact=ref, name=result.name, tool_call_id=result.tool_call_id)
+
 def create_react_agent_with_enhanced_memory():
-    """Create ReAct agent with LLM-powered summarizing checkpointer"""
+    """Create the ReAct agent. Run inside text2sql_node it is a subgraph of the main graph
+    and is checkpointed by the graph's checkpointer (see checkpointing.py)."""
     system_message = MONGODB_AGENT_SYSTEM_PROMPT
-    # summarizing_checkpointer = LLMSummarizingMongoDBSaver(client, text2sql_llm)
 
     return create_agent(
-        text2sql_llm,
-        tools=tools,
+        get_text2sql_llm(),
+        tools=get_tools(),
         system_prompt=system_message,
-        middleware=[handle_tool_errors],
-        # checkpointer=summarizing_checkpointer,
+        middleware=[get_tool_middleware(), handle_tool_errors, register_query_results],
     )
 
-text2sql_agent_with_memory = create_react_agent_with_enhanced_memory()
+@lru_cache(maxsize=None)
+def get_text2sql_agent():
+    return create_react_agent_with_enhanced_memory()
 
-def text2sql_node(state: State) -> Command[Literal['executor']]:
+async def text2sql_node(state: State) -> Command[Literal['executor']]:
     """Text-to-SQL agent node"""
     agent_query = state.get("agent_query")
-    config = {"configurable": {"thread_id": uuid.uuid4()}}
     # print(f"Agent query: {agent_query}")
-    result = text2sql_agent_with_memory.invoke({"messages": [HumanMessage(content=agent_query)]}, config)
+    result = await get_text2sql_agent().ainvoke({"messages": [HumanMessage(content=agent_query)]})
     # print(f"Text2SQL agent result: {result['messages'][-1].content}")
     return Command(update={
         "messages": result["messages"],
         "user_query": state.get("user_query", state["messages"][0].content),
+        "artifacts": (state.get("artifacts") or []) + collect_artifacts(result["messages"]),
     }, goto="executor")
\ No newline at end of file
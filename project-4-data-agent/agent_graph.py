@@ -6,7 +6,14 @@ from webresearch_agent import web_researcher_node
 from charting_agent import chart_generator_node
 from chart_summary_agent import chart_summary_node
 from synthesizer_agent import synthesizer_node
+from final_stage import final_merge_node
+from llm_registry import usage_report
+from telemetry import instrument_node, run_span
+from checkpointing import get_checkpointer, resume_run, run_config, thread_id_of
 from dotenv import load_dotenv
+from functools import lru_cache
+import argparse
+import asyncio
 import os
 
 _ = load_dotenv(override=True)
@@ -15,36 +22,84 @@ os.environ["OPENAI_API_KEY"] = openai_api_key
 tavily_api_key = os.getenv("TAVILY_API_KEY")
 os.environ["TAVILY_API_KEY"] = tavily_api_key
 
-workflow = StateGraph(State)
-workflow.add_node("planner", planner_node)
-workflow.add_node("executor", executor_node)
-workflow.add_node("web_researcher", web_researcher_node)
-workflow.add_node("chart_generator", chart_generator_node)
-workflow.add_node("chart_summarizer", chart_summary_node)
-workflow.add_node("synthesizer", synthesizer_node)
+@lru_cache(maxsize=None)
+def get_graph():
+    """Compile the graph on first use. The nodes build their LLM clients and agents
+    lazily as well, so importing this module needs no network. With a checkpointer
+    (see checkpointing.py) every step is saved and a failed run can be resumed."""
+    workflow = StateGraph(State)
+    workflow.add_node("planner", instrument_node("planner", planner_node))
+    workflow.add_node("executor", instrument_node("executor", executor_node))
+    workflow.add_node("web_researcher", instrument_node("web_researcher", web_researcher_node))
+    workflow.add_node("chart_generator", instrument_node("chart_generator", chart_generator_node))
+    workflow.add_node("chart_summarizer", instrument_node("chart_summarizer", chart_summary_node))
+    workflow.add_node("synthesizer", instrument_node("synthesizer", synthesizer_node))
+    workflow.add_node("final_merge", instrument_node("final_merge", final_merge_node))
 
-workflow.add_edge(START, "planner")
+    workflow.add_edge(START, "planner")
 
-graph = workflow.compile()
+    return workflow.compile(checkpointer=get_checkpointer())
 
+def draw_graph(path="agent_graph.png"):
+    """Render the graph diagram to a PNG (requires pygraphviz)."""
+    png_bytes = get_graph().get_graph().draw_png()
 
-png_bytes = graph.get_graph().draw_png()
-
-with open("agent_graph.png", "wb") as f:
-    f.write(png_bytes)
+    with open(path, "wb") as f:
+        f.write(png_bytes)
+    return path
 
 from langchain_core.messages import HumanMessage
-import json
 
-query = "Chart the current market capitalization of the top 5 banks in the US?"
-print(f"Query: {query}")
+DEFAULT_ENABLED_AGENTS = ["web_researcher", "chart_generator", "chart_summarizer", "synthesizer"]
+
+def build_initial_state(query, enabled_agents=None):
+    return {
+        "messages": [HumanMessage(content=query)],
+        "user_query": query,
+        "enabled_agents": list(enabled_agents or DEFAULT_ENABLED_AGENTS),
+    }
+
+async def arun_query(query, enabled_agents=None, thread_id=None):
+    """Async entry point: runs one query through the graph without holding a thread
+    for the whole multi-step run, so concurrent queries interleave on one event loop.
+    The run is checkpointed under `thread_id` (a new id by default); if it fails,
+    aresume_query(thread_id) continues from the last successful step."""
+    config = run_config(thread_id)
+    try:
+        with run_span(thread_id_of(config), query=query[:200]):
+            return await get_graph().ainvoke(build_initial_state(query, enabled_agents), config)
+    except Exception:
+        if get_checkpointer() is not None:
+            print(f"Run {thread_id_of(config)} failed; resume it with: python agent_graph.py --resume {thread_id_of(config)}")
+        raise
+
+async def aresume_query(thread_id):
+    """Finish a checkpointed run, reusing the steps that already succeeded."""
+    with run_span(thread_id, resumed=True):
+        return await resume_run(get_graph(), thread_id)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Data agent")
+    parser.add_argument("query", nargs="?", default="Chart the current market capitalization of the top 5 banks in the US?")
+    parser.add_argument("--draw-graph", nargs="?", const="agent_graph.png", metavar="PATH",
+                        help="Write the graph diagram to PATH (default: agent_graph.png) and exit.")
+    parser.add_argument("--resume", metavar="THREAD_ID",
+                        help="Resume a failed run from its last checkpoint instead of starting a new one.")
+    args = parser.parse_args()
+    if args.draw_graph:
+        print(f"Graph diagram written to {draw_graph(args.draw_graph)}")
+        raise SystemExit(0)
+
+    if args.resume:
+        asyncio.run(aresume_query(args.resume))
+    else:
+        query = args.query
+        print(f"Query: {query}")
 
-state = {
-            "messages": [HumanMessage(content=query)],
-            "user_query": query,
-            "enabled_agents": ["web_researcher", "chart_generator", 
-                               "chart_summarizer", "synthesizer"],
-        }
-graph.invoke(state)
+        asyncio.run(arun_query(query))
 
-print("--------------------------------")
\ No newline at end of file
+    print("--------------------------------")
+    print("LLM usage by node:")
+    for node, usage in usage_report().items():
+        print(f"  {node}: {usage['calls']} calls, {usage['avg_latency_s']:.2f}s avg, "
+              f"{usage['input_tokens']} in / {usage['output_tokens']} out tokens")
@@ -12,6 +12,10 @@ class State(MessagesState):
     last_reason: Optional[str] # Explains the executor’s decision to help maintain continuity and provide traceability.
     replan_flag: Optional[bool] # Set by the executor to indicate that the planner should revise the plan.
     replan_attempts: Optional[Dict[int, Dict[int, int]]] # Replan attempts tracked per step number.
+    artifacts: Optional[List[Dict[str, Any]]] # References (id, name, schema) to tables the data agents saved in the artifact store.
+    final_answer: Optional[str] # The answer shown to the user, written by the last node.
+    chart_summary: Optional[str] # Final stage (parallel mode): chart_summarizer's part of the answer.
+    synthesis: Optional[str] # Final stage (parallel mode): synthesizer's part of the answer.
 
 # Note: State inherits from MessagesState, which is defined with a single messages key that keeps 
 # track of the list of messages shared among agents.
@@ -0,0 +1,75 @@
+# Concurrency benchmark for the async graph entry point.
+# Every LLM and agent is swapped for a fixed-latency stub, so the numbers show
+# how well concurrent queries overlap on one event loop, not model speed.
+#
+#   python benchmark_async.py --latency 0.2 --concurrency 1 2 4 8 16
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+# Keep the benchmark's runs out of the default checkpoint file.
+os.environ["CHECKPOINT_PATH"] = os.path.join(tempfile.mkdtemp(), "checkpoints.sqlite")
+os.environ.setdefault("TAVILY_API_KEY", "stub")
+
+from agent_graph import arun_query
+import chart_summary_agent
+import charting_agent
+import webresearch_agent
+from llm_registry import override_llm
+from stub_llm import (
+    StubAgent,
+    StubChatModel,
+    chart_reply,
+    data_reply,
+    executor_reply,
+    make_planner_reply,
+    summary_reply,
+)
+
+
+def install_stubs(latency: float) -> None:
+    # Plain LLM nodes resolve their model through the registry; agent nodes are
+    # replaced at their module-level getter since the agent wraps the model.
+    override_llm("planner", StubChatModel(make_planner_reply("web_researcher"), latency))
+    override_llm("executor", StubChatModel(executor_reply, latency))
+    override_llm("synthesizer", StubChatModel(summary_reply, latency))
+    override_llm("chart_summarizer", StubChatModel(summary_reply, latency))
+    data_agent = StubAgent(data_reply, latency)
+    webresearch_agent.get_web_search_agent = lambda: data_agent
+    chart_agent = StubAgent(chart_reply, latency)
+    charting_agent.get_chart_agent = lambda: chart_agent
+    summary_agent = StubAgent(summary_reply, latency)
+    chart_summary_agent.get_chart_summary_agent = lambda: summary_agent
+
+
+async def run_batch(concurrency: int, serial: bool) -> float:
+    queries = [f"Chart the market capitalization of bank #{i}" for i in range(concurrency)]
+    start = time.perf_counter()
+    if serial:
+        for query in queries:
+            await arun_query(query)
+    else:
+        await asyncio.gather(*(arun_query(query) for query in queries))
+    return time.perf_counter() - start
+
+
+async def main(latency: float, levels: list[int]) -> None:
+    install_stubs(latency)
+
+    print(f"Stub LLM latency: {latency:.3f}s per call")
+    print(f"{'queries':>8} {'serial s':>10} {'concurrent s':>13} {'q/s serial':>11} {'q/s concurrent':>15} {'speedup':>8}")
+    for n in levels:
+        serial = await run_batch(n, serial = True)
+        concurrent = await run_batch(n, serial = False)
+        print(f"{n:>8} {serial:>10.2f} {concurrent:>13.2f} {n / serial:>11.2f} {n / concurrent:>15.2f} {serial / concurrent:>7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Throughput of concurrent graph runs with stub LLMs")
+    parser.add_argument("--latency", type = float, default = 0.2, help = "Seconds each stub LLM/agent call sleeps")
+    parser.add_argument("--concurrency", type = int, nargs = "+", default = [1, 2, 4, 8, 16])
+    args = parser.parse_args()
+    asyncio.run(main(args.latency, args.concurrency))
@@ -0,0 +1,90 @@
+# Wall-clock time of one research step: the serial ReAct loop vs RESEARCH_MODE=parallel.
+#   serial     what the agent does today: a model call to choose each search, the search,
+#              the raw results appended to the conversation, and a final answer call
+#              (queries + 1 model calls, queries searches one after another)
+#   parallel   parallel_research: one expansion call, all searches at once, merge and
+#              dedupe, one summary call
+# Both use the same sub-queries, the offline stub search backend with --search-latency and
+# stub models whose latency grows with the prompt. The search cache is off.
+#
+#   python benchmark_parallel_research.py --queries 4 --search-latency 0.8 --llm-latency 0.5
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+import parallel_research
+import search_cache
+from llm_registry import override_llm
+from stub_llm import StubChatModel, StubSearchBackend
+
+QUERY = "Compare the market cap and revenue of the largest US banks"
+SUB_QUERIES = ["JPMorgan market cap revenue", "Bank of America market cap revenue", "Wells Fargo market cap revenue",
+               "Citigroup market cap revenue", "Goldman Sachs market cap revenue", "Morgan Stanley market cap revenue"]
+
+
+def summary_reply(messages) -> str:
+    return json.dumps({"answer": "JPMorgan is the largest by market cap [1].", "tables": []})
+
+
+async def serial(queries, llm, backend) -> float:
+    start = time.perf_counter()
+    messages = [HumanMessage(content = QUERY)]
+    for i, query in enumerate(queries):
+        await llm.ainvoke(messages)
+        messages.append(AIMessage(content = "", tool_calls = [{"name": "tavily_search", "args": {"query": query}, "id": f"c{i}"}]))
+        response = await backend.search(query)
+        messages.append(ToolMessage(content = json.dumps(response), tool_call_id = f"c{i}"))
+    await llm.ainvoke(messages)
+    return time.perf_counter() - start
+
+
+async def parallel() -> float:
+    start = time.perf_counter()
+    await parallel_research.parallel_research(QUERY)
+    return time.perf_counter() - start
+
+
+async def main(queries: int, search_latency: float, llm_latency: float, per_1k_chars: float, runs: int) -> None:
+    sub_queries = SUB_QUERIES[:queries]
+    backend = StubSearchBackend(search_latency)
+    search_cache.get_search_backend = lambda: backend
+    search_cache.get_search_cache = lambda: None
+    models = {
+        "serial agent": StubChatModel(summary_reply, llm_latency, per_1k_chars),
+        "web_research_expand": StubChatModel(lambda m: json.dumps({"queries": sub_queries}), llm_latency, per_1k_chars),
+        "web_researcher": StubChatModel(summary_reply, llm_latency, per_1k_chars),
+    }
+    override_llm("web_research_expand", models["web_research_expand"])
+    override_llm("web_researcher", models["web_researcher"])
+
+    print(f"{queries} sub-queries, search {search_latency:.2f}s, model {llm_latency:.2f}s + {per_1k_chars:.3f}s per 1k chars")
+    print(f"{'mode':>9} {'median s':>9} {'model calls':>12} {'searches':>9} {'prompt chars':>13}")
+    for mode in ("serial", "parallel"):
+        backend.calls = 0
+        for model in models.values():
+            model.calls = model.prompt_chars = 0
+        if mode == "serial":
+            timings = [await serial(sub_queries, models["serial agent"], backend) for _ in range(runs)]
+        else:
+            timings = [await parallel() for _ in range(runs)]
+        calls = sum(model.calls for model in models.values()) / runs
+        chars = sum(model.prompt_chars for model in models.values()) / runs
+        print(f"{mode:>9} {statistics.median(timings):>9.2f} {calls:>12.0f} {backend.calls / runs:>9.0f} {chars:>13,.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Serial ReAct research vs parallel multi-query research")
+    parser.add_argument("--queries", type = int, default = 4, help = f"Sub-queries (max {len(SUB_QUERIES)})")
+    parser.add_argument("--search-latency", type = float, default = 0.8)
+    parser.add_argument("--llm-latency", type = float, default = 0.5)
+    parser.add_argument("--per-1k-chars", type = float, default = 0.02)
+    parser.add_argument("--runs", type = int, default = 3)
+    args = parser.parse_args()
+    asyncio.run(main(args.queries, args.search_latency, args.llm_latency, args.per_1k_chars, args.runs))
@@ -0,0 +1,63 @@
+# Outbound searches, latency and characters handed to the model for a research session,
+# with the plain backend vs the cached, deduplicating web_search tool.
+# The session is two web_researcher runs (the second one after a replan) whose searches
+# overlap and repeat with different spelling, against the offline stub backend.
+#
+#   python benchmark_search_cache.py --latency 0.5
+import argparse
+import asyncio
+import json
+import time
+
+import search_cache
+from search_cache import SearchResultCache, cached_search, compact_response, search_session
+from stub_llm import StubSearchBackend
+
+RUNS = [
+    ["US bank market cap 2024", "largest US banks by market cap", "JPMorgan market cap", "us bank  market cap 2024?"],
+    ["Largest US banks by market cap", "JPMorgan market cap", "Bank of America market cap", "Wells Fargo market cap"],
+]
+
+
+async def plain(backend) -> int:
+    chars = 0
+    for queries in RUNS:
+        for query in queries:
+            chars += len(json.dumps(await backend.search(query)))
+    return chars
+
+
+async def cached(backend, cache) -> int:
+    chars = 0
+    for queries in RUNS:
+        with search_session() as session:
+            for query in queries:
+                response = await cached_search(query, backend = backend, cache = cache)
+                chars += len(json.dumps(compact_response(response, session)))
+        print(f"  run: {session.report()}")
+    return chars
+
+
+async def main(latency: float) -> None:
+    print(f"Stub search latency {latency:.2f}s, {sum(len(q) for q in RUNS)} searches over {len(RUNS)} runs")
+    rows = []
+    backend = StubSearchBackend(latency, search_cache.SEARCH_MAX_RESULTS)
+    start = time.perf_counter()
+    chars = await plain(backend)
+    rows.append(("plain", backend.calls, time.perf_counter() - start, chars))
+
+    backend = StubSearchBackend(latency, search_cache.SEARCH_MAX_RESULTS)
+    start = time.perf_counter()
+    chars = await cached(backend, SearchResultCache(":memory:"))
+    rows.append(("cached + dedupe", backend.calls, time.perf_counter() - start, chars))
+
+    print(f"{'mode':>16} {'backend calls':>14} {'seconds':>8} {'chars to model':>15}")
+    for mode, calls, seconds, chars in rows:
+        print(f"{mode:>16} {calls:>14} {seconds:>8.2f} {chars:>15,}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Web search cache and dedupe with a stub backend")
+    parser.add_argument("--latency", type = float, default = 0.5, help = "Seconds per stub search")
+    args = parser.parse_args()
+    asyncio.run(main(args.latency))
@@ -0,0 +1,61 @@
+# Cold-start benchmark for agent_graph.
+# Each run is a fresh interpreter that imports agent_graph and compiles the graph.
+# The API keys are dummies and MONGODB_URI points at a closed local port, so any
+# network call left on the import path shows up as an error or a timeout here.
+#
+#   python benchmark_startup.py --runs 5
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+CHILD = """
+import json, time
+t0 = time.perf_counter()
+import agent_graph
+t1 = time.perf_counter()
+agent_graph.get_graph()
+t2 = time.perf_counter()
+print(json.dumps({"import": t1 - t0, "compile": t2 - t1}))
+"""
+
+
+def run_once(cwd: Path) -> dict:
+    env = os.environ.copy()
+    env.setdefault("OPENAI_API_KEY", "stub")
+    env.setdefault("TAVILY_API_KEY", "stub")
+    env["MONGODB_URI"] = "mongodb://127.0.0.1:9/?serverSelectionTimeoutMS=500"
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-c", CHILD],
+        cwd = cwd,
+        env = env,
+        capture_output = True,
+        text = True,
+    )
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(f"agent_graph failed to start:\n{proc.stderr}")
+    timings = json.loads(proc.stdout.strip().splitlines()[-1])
+    timings["process"] = wall
+    return timings
+
+
+def main(runs: int) -> None:
+    cwd = Path(__file__).resolve().parent
+    results = [run_once(cwd) for _ in range(runs)]
+    print(f"{'phase':>10} {'median s':>10} {'min s':>8} {'max s':>8}")
+    for phase in ("import", "compile", "process"):
+        values = [r[phase] for r in results]
+        print(f"{phase:>10} {statistics.median(values):>10.3f} {min(values):>8.3f} {max(values):>8.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Import and graph-compile time of agent_graph in fresh processes")
+    parser.add_argument("--runs", type = int, default = 5)
+    args = parser.parse_args()
+    main(args.runs)
@@ -0,0 +1,113 @@
+# Durable checkpoints for graph runs. The compiled graph saves its state after every
+# step under the run's thread id. If a step fails late (the synthesizer after minutes of
+# planning, searching and charting), resume_run(thread_id) continues from the last
+# successful step: finished steps, and nodes of the failed step that did succeed, are
+# read back from the checkpoint instead of repeating their LLM and database calls.
+#
+#   CHECKPOINTER             sqlite (default, needs langgraph-checkpoint-sqlite) | mongo | memory | off
+#   CHECKPOINT_PATH          SQLite file for CHECKPOINTER=sqlite (default .checkpoints.sqlite)
+#   CHECKPOINT_KEEP_RUNS     runs kept in the SQLite file; older ones are pruned when it is
+#                            opened (default 200, 0 = keep everything)
+#   CHECKPOINT_MONGODB_URI   MongoDB for CHECKPOINTER=mongo (default MONGODB_URI)
+#   CHECKPOINT_DB            MongoDB database for CHECKPOINTER=mongo (default checkpointing_db)
+import asyncio
+import os
+import sqlite3
+import uuid
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+def _sqlite_saver(path: str):
+    """SqliteSaver with the async interface the graph needs. The blocking calls run in a
+    worker thread (as MongoDBSaver does), so one connection serves every event loop."""
+    from langgraph.checkpoint.sqlite import SqliteSaver
+
+    class ThreadedSqliteSaver(SqliteSaver):
+        async def aget_tuple(self, config):
+            return await asyncio.to_thread(self.get_tuple, config)
+
+        async def alist(self, config, *, filter = None, before = None, limit = None):
+            for item in await asyncio.to_thread(lambda: list(self.list(config, filter = filter, before = before, limit = limit))):
+                yield item
+
+        async def aput(self, config, checkpoint, metadata, new_versions):
+            return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+        async def aput_writes(self, config, writes, task_id, task_path = ""):
+            return await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+        async def adelete_thread(self, thread_id):
+            return await asyncio.to_thread(self.delete_thread, thread_id)
+
+    Path(path).parent.mkdir(parents = True, exist_ok = True)
+    conn = sqlite3.connect(path, check_same_thread = False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    saver = ThreadedSqliteSaver(conn)
+    keep = int(os.getenv("CHECKPOINT_KEEP_RUNS", "200"))
+    if keep:
+        saver.setup()
+        prune_checkpoints(conn, keep)
+    return saver
+
+
+def prune_checkpoints(conn: sqlite3.Connection, keep: int) -> int:
+    """Delete every run but the `keep` most recent ones; returns how many were deleted.
+    Checkpoint ids are time-ordered (uuid6), so a run's newest id dates its last step."""
+    stale = conn.execute(
+        "SELECT thread_id FROM checkpoints GROUP BY thread_id ORDER BY MAX(checkpoint_id) DESC LIMIT -1 OFFSET ?",
+        (keep,),
+    ).fetchall()
+    for table in ("checkpoints", "writes"):
+        conn.executemany(f"DELETE FROM {table} WHERE thread_id = ?", stale)
+    conn.commit()
+    return len(stale)
+
+
+@lru_cache(maxsize = None)
+def get_checkpointer():
+    backend = os.getenv("CHECKPOINTER", "sqlite").lower()
+    if backend == "sqlite":
+        try:
+            return _sqlite_saver(os.getenv("CHECKPOINT_PATH", ".checkpoints.sqlite"))
+        except ImportError:
+            print("langgraph-checkpoint-sqlite is not installed; checkpoints are kept in memory only")
+            backend = "memory"
+    if backend == "mongo":
+        from pymongo import MongoClient
+        from langgraph.checkpoint.mongodb import MongoDBSaver
+        client = MongoClient(os.getenv("CHECKPOINT_MONGODB_URI") or os.getenv("MONGODB_URI"))
+        return MongoDBSaver(client, db_name = os.getenv("CHECKPOINT_DB", "checkpointing_db"))
+    if backend == "memory":
+        from langgraph.checkpoint.memory import InMemorySaver
+        return InMemorySaver()
+    if backend in ("off", "none", "0"):
+        return None
+    raise ValueError(f"Unknown CHECKPOINTER: {backend!r} (expected sqlite, mongo, memory or off)")
+
+
+def new_thread_id() -> str:
+    return uuid.uuid4().hex
+
+
+def run_config(thread_id: Optional[str] = None) -> Dict[str, Any]:
+    """Config for one run; a new thread id unless an existing run is being resumed."""
+    return {"configurable": {"thread_id": thread_id or new_thread_id()}}
+
+
+def thread_id_of(config: Dict[str, Any]) -> str:
+    return config["configurable"]["thread_id"]
+
+
+async def resume_run(graph, thread_id: str):
+    """Continue a failed or interrupted run from its last checkpoint and return the final
+    state. A run that already finished returns its saved state without running anything."""
+    config = run_config(thread_id)
+    snapshot = await graph.aget_state(config)
+    if not snapshot.values:
+        raise ValueError(f"No checkpoint for thread {thread_id!r}")
+    if not snapshot.next:
+        return snapshot.values
+    print(f"Resuming run {thread_id} at {', '.join(snapshot.next)}")
+    return await graph.ainvoke(None, config)
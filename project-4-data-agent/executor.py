@@ -5,12 +5,13 @@ from langgraph.graph import END
 from langchain_core.messages import HumanMessage
 from langgraph.types import Command
 from agent_state import State
-from planner import reasoning_llm
+from planner import JSON_MODE
+from llm_registry import get_llm
 import json
 
 MAX_REPLANS = 3
 
-def executor_node(state: State) -> Command[Literal["web_researcher", "chart_generator", "chart_summarizer", "synthesizer"]]:
+async def executor_node(state: State) -> Command[Literal["web_researcher", "chart_generator", "chart_summarizer", "synthesizer"]]:
     plan: Dict[str, Any] = state.get("plan", {})
     step: int = state.get("current_step", 0)
     print(f"Plan: {plan}")
@@ -27,7 +28,7 @@ def executor_node(state: State) -> Command[Literal["web_researcher", "chart_gene
         )
     
     #1) Build the prompt (using executor_prompt function call) and call the LLM
-    llm_reply = reasoning_llm.invoke([executor_prompt(state)])
+    llm_reply = await get_llm("executor", model_kwargs = JSON_MODE).ainvoke([executor_prompt(state)])
 
     try:
         content_str = llm_reply.content if isinstance(llm_reply.content, str) else str(llm_reply.content)
@@ -1,9 +1,21 @@
-from typing import Annotated
+import os
+from functools import lru_cache
+from typing import Annotated, Any, List
 from langchain.tools import tool
-from langchain_experimental.utilities.python import PythonREPL
+from artifact_store import load_artifact, save_table
+from sandbox_pool import SandboxError, get_sandbox_pool
 
+# Chart code runs in a pool of pre-warmed worker subprocesses with a timeout and CPU/memory
+# limits (see sandbox_pool.py). PYTHON_REPL_BACKEND=inprocess restores the old shared
+# in-process PythonREPL.
+PYTHON_REPL_BACKEND = os.getenv("PYTHON_REPL_BACKEND", "sandbox")
+
+
+@lru_cache(maxsize = None)
+def _inprocess_repl():
+    from langchain_experimental.utilities.python import PythonREPL
+    return PythonREPL(_globals = {"load_artifact": load_artifact})
 
-repl = PythonREPL()
 
 @tool
 def python_repl_tool(
@@ -11,9 +23,21 @@ def python_repl_tool(
 ):
     """Use this to execute python code. You will be used to execute python code
     that generates charts. Only print the chart once.
+    Tables from earlier steps are available via load_artifact("<artifact_id>"),
+    which returns a pandas DataFrame.
+    Variables and imports do not carry over between calls: each snippet must import,
+    load and plot everything it needs.
     This is visible to the user."""
     try:
-        result = repl.run(code)
+        if PYTHON_REPL_BACKEND == "inprocess":
+            result = _inprocess_repl().run(code)
+        else:
+            run = get_sandbox_pool().run(code)
+            if not run["ok"]:
+                return f"Failed to execute. Error: {run['error']}\nStdout: {run['stdout']}"
+            result = run["stdout"]
+    except SandboxError as e:
+        return f"Failed to execute. Error: {e}"
     except BaseException as e:
         return f"Failed to execute. Error: {repr(e)}"
     result_str = (
@@ -23,3 +47,24 @@ def python_repl_tool(
         result_str
         + "\n\nIf you have completed all tasks, respond with FINAL ANSWER."
     )
+
+
+def make_save_table_tool(source: str):
+    """save_table tool for a data agent; tables it saves are tagged with `source`."""
+
+    @tool(response_format = "content_and_artifact")
+    def save_table_tool(
+        name: Annotated[str, "Short snake_case name for the table, e.g. top_us_banks_market_cap."],
+        columns: Annotated[List[str], "Column names, in order. Put units in the name, e.g. market_cap_usd_bn."],
+        rows: Annotated[List[List[Any]], "Table rows, one value per column. Use plain numbers for numeric values."],
+        description: Annotated[str, "One sentence on what the table holds, with the as-of date and source."] = "",
+    ):
+        """Save figures you found as a table so the chart generator can load them by id
+        instead of re-reading your text. Call this once per table before you finish."""
+        try:
+            ref = save_table(name, columns, rows, source = source, description = description)
+        except Exception as e:
+            return f"Failed to save table. Error: {repr(e)}", None
+        return f"Saved table {ref['name']} as artifact {ref['artifact_id']} ({ref['rows']} rows).", ref
+
+    return save_table_tool
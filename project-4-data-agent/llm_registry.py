@@ -0,0 +1,435 @@
+# Central registry for the chat models used by the graph nodes.
+# Every node resolves its model with get_llm("<node>", ...) so that all of them:
+#   - share one keep-alive HTTP connection pool (sync and async),
+#   - go through one global token-bucket rate limiter and one concurrency gate,
+#   - record per-node latency and token usage (see usage_report()), and report every call
+#     to telemetry.py (spans, metrics and the trace file, with HTTP retries and cost).
+#
+# Limits are read from the environment when the first model is built:
+#   LLM_MAX_CONCURRENCY       max in-flight LLM calls across all nodes (default 8)
+#   LLM_REQUESTS_PER_SECOND   token-bucket refill rate (default 5)
+#   LLM_MAX_BURST             token-bucket size (default 10)
+#   LLM_MAX_CONNECTIONS       HTTP pool size (default 20)
+#   LLM_MAX_RETRIES           retries on 429/5xx inside the OpenAI client (default 2)
+#
+# Responses can be cached (see llm_cache.py). The cache is opt-in: with it on, the planner
+# and executor (not pinned to temperature 0) return the same plan for the same prompt, which
+# is what recording and replay want but not what a normal run wants. Nodes opt out with
+# get_llm(..., cache=False) or LLM_CACHE_SKIP_NODES.
+#   LLM_CACHE                 off (default) | memory | sqlite (sqlite by default in replay)
+#   LLM_CACHE_PATH            SQLite file for LLM_CACHE=sqlite (default .llm_cache.sqlite)
+#   LLM_CACHE_MAX_ENTRIES     size limit (default 1024 in memory, 10000 on disk)
+#   LLM_CACHE_TTL             seconds before an entry expires, 0 = never (default 86400;
+#                             ignored in replay, where recorded responses never expire)
+#   LLM_CACHE_SKIP_NODES      comma-separated nodes that never use the cache
+#   LLM_CACHE_REPLAY          1 = serve only recorded responses; a cache miss raises instead
+#                             of calling the API (offline replay of a recorded SQLite run)
+import asyncio
+import os
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+import httpx
+from langchain_core.caches import BaseCache
+from langchain_core.rate_limiters import InMemoryRateLimiter
+
+import telemetry
+from llm_cache import LRUResponseCache, SQLiteResponseCache
+
+DEFAULT_MODEL = "gpt-5.1"
+
+
+def _env_number(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+@dataclass
+class NodeUsage:
+    calls: int = 0
+    errors: int = 0
+    latency_s: float = 0.0
+    max_latency_s: float = 0.0
+    queue_wait_s: float = 0.0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_hits: int = 0
+    cache_misses: int = 0
+
+
+class ReplayMissError(LookupError):
+    """Raised in replay mode when a call has no recorded response."""
+
+
+class ConcurrencyGate:
+    """Global cap on in-flight LLM calls that works from threads and from any event loop.
+
+    asyncio.Semaphore is bound to one loop, and the Streamlit app starts a fresh loop for
+    every submit, so async callers poll a thread semaphore with exponential backoff instead.
+    """
+
+    def __init__(self, limit: int):
+        self._semaphore = threading.BoundedSemaphore(limit)
+
+    @contextmanager
+    def hold(self):
+        self._semaphore.acquire()
+        try:
+            yield
+        finally:
+            self._semaphore.release()
+
+    @asynccontextmanager
+    async def ahold(self, initial_backoff: float = 0.005, max_backoff: float = 0.25):
+        backoff = initial_backoff
+        while not self._semaphore.acquire(blocking = False):
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, max_backoff)
+        try:
+            yield
+        finally:
+            self._semaphore.release()
+
+
+class _PerLoopTransport(httpx.AsyncBaseTransport):
+    """Async keep-alive pool shared by every model, kept per event loop.
+
+    httpx async connections cannot outlive the loop that opened them, so each live loop gets
+    its own pool (dropped with the loop) while all nodes on that loop share it.
+    """
+
+    def __init__(self, limits: httpx.Limits):
+        self._limits = limits
+        self._pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncHTTPTransport]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _pool(self) -> httpx.AsyncHTTPTransport:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            pool = self._pools.get(loop)
+            if pool is None:
+                pool = self._pools[loop] = httpx.AsyncHTTPTransport(limits = self._limits)
+            return pool
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        telemetry.http_attempt()
+        return await self._pool().handle_async_request(request)
+
+    async def aclose(self) -> None:
+        with self._lock:
+            pool = self._pools.pop(asyncio.get_running_loop(), None)
+        if pool is not None:
+            await pool.aclose()
+
+
+class _CountingTransport(httpx.HTTPTransport):
+    """Sync keep-alive pool that counts requests, so retries show up in telemetry."""
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        telemetry.http_attempt()
+        return super().handle_request(request)
+
+
+class _NodeCache(BaseCache):
+    """Per-node view of the registry's response cache: counts hits and misses for `node`
+    and always forwards to the current backend, so set_response_cache() applies to
+    models (and agents) that were already built."""
+
+    def __init__(self, node: str):
+        self.node = node
+
+    def lookup(self, prompt, llm_string):
+        backend = _registry.response_cache()
+        if backend is None:
+            return None
+        value = backend.lookup(prompt, llm_string)
+        _registry.record_cache(self.node, hit = value is not None)
+        return value
+
+    async def alookup(self, prompt, llm_string):
+        backend = _registry.response_cache()
+        if backend is None:
+            return None
+        value = await backend.alookup(prompt, llm_string)
+        _registry.record_cache(self.node, hit = value is not None)
+        return value
+
+    def update(self, prompt, llm_string, return_val):
+        backend = _registry.response_cache()
+        if backend is not None:
+            backend.update(prompt, llm_string, return_val)
+
+    async def aupdate(self, prompt, llm_string, return_val):
+        backend = _registry.response_cache()
+        if backend is not None:
+            await backend.aupdate(prompt, llm_string, return_val)
+
+    def clear(self, **kwargs):
+        backend = _registry.response_cache()
+        if backend is not None:
+            backend.clear(**kwargs)
+
+
+class _GatedCalls:
+    """Mixed into ChatOpenAI: holds the registry's concurrency gate and records usage per node."""
+
+    def _check_replay(self) -> None:
+        # BaseChatModel consults the cache before calling _generate/_stream, so reaching
+        # them in replay mode means there is no recorded response (or the node opted out).
+        if _registry.replay_only:
+            raise ReplayMissError(f"No recorded LLM response for node {self.node!r} (LLM_CACHE_REPLAY=1)")
+
+    def _record(self, started: float, acquired: float, message: Any = None, failed: bool = False,
+                attempts: Optional[list] = None) -> None:
+        usage = getattr(message, "usage_metadata", None) or {}
+        now = time.perf_counter()
+        _registry.record(
+            self.node,
+            latency = now - acquired,
+            queue_wait = acquired - started,
+            input_tokens = usage.get("input_tokens", 0),
+            output_tokens = usage.get("output_tokens", 0),
+            failed = failed,
+        )
+        telemetry.record_llm_call(
+            self.node, self.model_name,
+            started = time.time() - (now - started),
+            latency = now - acquired,
+            queue_wait = acquired - started,
+            input_tokens = usage.get("input_tokens", 0),
+            output_tokens = usage.get("output_tokens", 0),
+            retries = max(attempts[0] - 1, 0) if attempts else None,
+            failed = failed,
+        )
+
+    def _generate(self, messages, stop = None, run_manager = None, **kwargs):
+        self._check_replay()
+        started = time.perf_counter()
+        with _registry.gate.hold(), telemetry.count_http_attempts() as attempts:
+            acquired = time.perf_counter()
+            try:
+                result = super()._generate(messages, stop = stop, run_manager = run_manager, **kwargs)
+            except Exception:
+                self._record(started, acquired, failed = True, attempts = attempts)
+                raise
+        self._record(started, acquired, result.generations[0].message if result.generations else None, attempts = attempts)
+        return result
+
+    async def _agenerate(self, messages, stop = None, run_manager = None, **kwargs):
+        self._check_replay()
+        started = time.perf_counter()
+        async with _registry.gate.ahold():
+            acquired = time.perf_counter()
+            with telemetry.count_http_attempts() as attempts:
+                try:
+                    result = await super()._agenerate(messages, stop = stop, run_manager = run_manager, **kwargs)
+                except Exception:
+                    self._record(started, acquired, failed = True, attempts = attempts)
+                    raise
+        self._record(started, acquired, result.generations[0].message if result.generations else None, attempts = attempts)
+        return result
+
+    def _stream(self, *args, **kwargs):
+        self._check_replay()
+        started = time.perf_counter()
+        with _registry.gate.hold():
+            acquired = time.perf_counter()
+            final = None
+            try:
+                for chunk in super()._stream(*args, **kwargs):
+                    final = chunk.message if final is None else final + chunk.message
+                    yield chunk
+            except Exception:
+                self._record(started, acquired, failed = True)
+                raise
+        self._record(started, acquired, final)
+
+    async def _astream(self, *args, **kwargs):
+        self._check_replay()
+        started = time.perf_counter()
+        async with _registry.gate.ahold():
+            acquired = time.perf_counter()
+            final = None
+            try:
+                async for chunk in super()._astream(*args, **kwargs):
+                    final = chunk.message if final is None else final + chunk.message
+                    yield chunk
+            except Exception:
+                self._record(started, acquired, failed = True)
+                raise
+        self._record(started, acquired, final)
+
+
+@lru_cache(maxsize = None)
+def _registered_chat_class():
+    # langchain_openai is imported on first use, not when the graph is imported.
+    from langchain_openai import ChatOpenAI
+
+    class RegisteredChatOpenAI(_GatedCalls, ChatOpenAI):
+        node: str = "default"
+
+    return RegisteredChatOpenAI
+
+
+class LLMRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._models: Dict[Any, Any] = {}
+        self._overrides: Dict[str, Any] = {}
+        self._usage: Dict[str, NodeUsage] = {}
+        self._shared: Optional[Dict[str, Any]] = None
+        self.gate: Optional[ConcurrencyGate] = None
+        self._cache: Optional[BaseCache] = None
+        self._cache_configured = False
+        self.replay_only = os.getenv("LLM_CACHE_REPLAY") == "1"
+        self.cache_skip_nodes = {n.strip() for n in os.getenv("LLM_CACHE_SKIP_NODES", "").split(",") if n.strip()}
+
+    def response_cache(self) -> Optional[BaseCache]:
+        with self._lock:
+            if not self._cache_configured:
+                self._cache = _cache_from_env()
+                self._cache_configured = True
+            return self._cache
+
+    def set_response_cache(self, cache: Optional[BaseCache]) -> None:
+        with self._lock:
+            if self.replay_only and getattr(cache, "ttl", 0):
+                # A replay must not expire (and delete) the responses it replays.
+                cache.ttl = 0
+            self._cache = cache
+            self._cache_configured = True
+
+    def _shared_resources(self) -> Dict[str, Any]:
+        # Built once, on the first get_llm() call, so importing the graph stays offline.
+        if self._shared is None:
+            import openai
+
+            limits = httpx.Limits(
+                max_connections = int(_env_number("LLM_MAX_CONNECTIONS", 20)),
+                max_keepalive_connections = int(_env_number("LLM_MAX_CONNECTIONS", 20)),
+                keepalive_expiry = 60,
+            )
+            self.gate = ConcurrencyGate(int(_env_number("LLM_MAX_CONCURRENCY", 8)))
+            self._shared = {
+                "http_client": openai.DefaultHttpxClient(transport = _CountingTransport(limits = limits)),
+                "http_async_client": openai.DefaultAsyncHttpxClient(transport = _PerLoopTransport(limits)),
+                "rate_limiter": InMemoryRateLimiter(
+                    requests_per_second = _env_number("LLM_REQUESTS_PER_SECOND", 5),
+                    check_every_n_seconds = 0.05,
+                    max_bucket_size = _env_number("LLM_MAX_BURST", 10),
+                ),
+                "max_retries": int(_env_number("LLM_MAX_RETRIES", 2)),
+            }
+        return self._shared
+
+    def get(self, node: str, model: str = DEFAULT_MODEL, cache: bool = True, **params: Any):
+        with self._lock:
+            if node in self._overrides:
+                return self._overrides[node]
+            use_cache = cache and node not in self.cache_skip_nodes
+            key = (node, model, use_cache, repr(sorted(params.items())))
+            llm = self._models.get(key)
+            if llm is None:
+                llm = self._models[key] = _registered_chat_class()(
+                    model = model,
+                    node = node,
+                    cache = _NodeCache(node) if use_cache else False,
+                    **self._shared_resources(),
+                    **params,
+                )
+            return llm
+
+    def override(self, node: str, llm: Any) -> None:
+        with self._lock:
+            self._overrides[node] = llm
+
+    def clear_overrides(self) -> None:
+        with self._lock:
+            self._overrides.clear()
+
+    def record(self, node: str, latency: float, queue_wait: float, input_tokens: int, output_tokens: int, failed: bool) -> None:
+        with self._lock:
+            usage = self._usage.setdefault(node, NodeUsage())
+            usage.calls += 1
+            usage.errors += int(failed)
+            usage.latency_s += latency
+            usage.max_latency_s = max(usage.max_latency_s, latency)
+            usage.queue_wait_s += queue_wait
+            usage.input_tokens += input_tokens or 0
+            usage.output_tokens += output_tokens or 0
+
+    def record_cache(self, node: str, hit: bool) -> None:
+        with self._lock:
+            usage = self._usage.setdefault(node, NodeUsage())
+            if hit:
+                usage.cache_hits += 1
+            else:
+                usage.cache_misses += 1
+
+    def usage_report(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            report = {}
+            for node, usage in self._usage.items():
+                row = asdict(usage)
+                row["avg_latency_s"] = usage.latency_s / usage.calls if usage.calls else 0.0
+                report[node] = row
+            return report
+
+    def reset_usage(self) -> None:
+        with self._lock:
+            self._usage.clear()
+
+
+def _cache_from_env() -> Optional[BaseCache]:
+    replay = os.getenv("LLM_CACHE_REPLAY") == "1"
+    backend = os.getenv("LLM_CACHE", "sqlite" if replay else "off").lower()
+    ttl = 0 if replay else _env_number("LLM_CACHE_TTL", 86400)
+    if backend == "memory":
+        return LRUResponseCache(max_entries = int(_env_number("LLM_CACHE_MAX_ENTRIES", 1024)), ttl = ttl)
+    if backend == "sqlite":
+        return SQLiteResponseCache(
+            os.getenv("LLM_CACHE_PATH", ".llm_cache.sqlite"),
+            max_entries = int(_env_number("LLM_CACHE_MAX_ENTRIES", 10000)),
+            ttl = ttl,
+        )
+    if backend in ("off", "none", "0"):
+        return None
+    raise ValueError(f"Unknown LLM_CACHE backend: {backend!r} (expected memory, sqlite or off)")
+
+
+_registry = LLMRegistry()
+
+
+def get_llm(node: str, model: str = DEFAULT_MODEL, cache: bool = True, **params: Any):
+    """Return the shared chat model for `node`; extra params (temperature, model_kwargs, ...)
+    are passed to ChatOpenAI and distinguish cached instances. `cache=False` opts the node
+    out of the response cache."""
+    return _registry.get(node, model, cache, **params)
+
+
+def set_response_cache(cache: Optional[BaseCache]) -> None:
+    """Swap the response cache backend for every model (None disables caching)."""
+    _registry.set_response_cache(cache)
+
+
+def override_llm(node: str, llm: Any) -> None:
+    """Serve `llm` for `node` instead of a real client (stubs for benchmarks and replays)."""
+    _registry.override(node, llm)
+
+
+def clear_overrides() -> None:
+    _registry.clear_overrides()
+
+
+def usage_report() -> Dict[str, Dict[str, Any]]:
+    """Per-node call counts, latency, queue wait and token usage since start or reset_usage()."""
+    return _registry.usage_report()
+
+
+def reset_usage() -> None:
+    _registry.reset_usage()
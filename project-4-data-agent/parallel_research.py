@@ -0,0 +1,137 @@
+# Parallel multi-query research for the web researcher (RESEARCH_MODE=parallel).
+# The ReAct agent searches one query at a time, with a model call between searches.
+# Here the work takes two model calls whatever the number of searches:
+#   1. expand      one JSON call turns agent_query into up to RESEARCH_MAX_QUERIES
+#                  complementary sub-queries
+#   2. search      all sub-queries run concurrently through search_cache (cached, so
+#                  repeats across runs cost nothing)
+#   3. merge       results are grouped by normalized URL and ranked by reciprocal rank
+#                  fusion (pages that several sub-queries find rank higher), then
+#                  deduplicated by content and trimmed
+#   4. summarize   one JSON call writes the answer from the ranked sources and returns
+#                  chartable figures as tables, which are saved as artifacts
+#
+#   RESEARCH_MODE          agent (default) | parallel
+#   RESEARCH_MAX_QUERIES   sub-queries per research step (default 4)
+#   RESEARCH_MAX_SOURCES   merged results passed to the summarizer (default 12)
+import asyncio
+import json
+import os
+from typing import Any, Dict, List, Tuple
+
+from langchain_core.messages import HumanMessage
+
+from artifact_store import save_table
+from llm_registry import get_llm
+from planner import JSON_MODE
+from search_cache import SearchSession, cached_search, dedupe_results, normalize_url, search_session
+from telemetry import span
+
+RESEARCH_MODE = os.getenv("RESEARCH_MODE", "agent")
+RESEARCH_MAX_QUERIES = int(os.getenv("RESEARCH_MAX_QUERIES", "4"))
+RESEARCH_MAX_SOURCES = int(os.getenv("RESEARCH_MAX_SOURCES", "12"))
+
+# Reciprocal rank fusion constant; 60 is the usual choice.
+RRF_K = 60
+
+
+def expand_prompt(query: str, max_queries: int) -> str:
+    return f"""
+        You plan web searches for a research task. Write at most {max_queries} short,
+        complementary search queries that together cover the task (different entities,
+        metrics or angles; no rephrasings of the same query).
+        Respond with a JSON object: {{"queries": ["...", "..."]}}
+
+        Task: {query}
+    """
+
+
+def summary_prompt(query: str, sources: List[Dict[str, Any]]) -> str:
+    listing = "\n".join(
+        f"[{i}] {s.get('title', '')} ({s.get('url', '')})\n{s.get('content', '')}"
+        for i, s in enumerate(sources, start = 1)
+    )
+    return f"""
+        You are the Researcher. Answer the task using only the sources below and cite
+        them as [n]. Say what could not be found instead of guessing.
+        Respond with a JSON object:
+          "answer": the findings, with the key figures,
+          "tables": figures that could be charted, as a list of
+                    {{"name": "...", "description": "...", "columns": [...], "rows": [[...], ...]}}
+                    with numeric values as numbers (an empty list if there are none).
+
+        Task: {query}
+
+        Sources:
+        {listing}
+    """
+
+
+async def expand_queries(query: str, max_queries: int = RESEARCH_MAX_QUERIES) -> List[str]:
+    llm = get_llm("web_research_expand", temperature = 0, model_kwargs = JSON_MODE)
+    reply = await llm.ainvoke([HumanMessage(content = expand_prompt(query, max_queries))])
+    try:
+        data = json.loads(reply.content)
+    except ValueError:
+        data = None
+    queries = data.get("queries") if isinstance(data, dict) else None
+    if not isinstance(queries, list):
+        queries = []
+    queries = [q.strip() for q in queries if isinstance(q, str) and q.strip()][:max_queries]
+    return queries or [query]
+
+
+def merge_results(responses: List[Dict[str, Any]], session: SearchSession,
+                  max_sources: int = RESEARCH_MAX_SOURCES) -> List[Dict[str, Any]]:
+    """Fuse the sub-queries' result lists into one ranking and drop duplicates."""
+    fused: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+    for response in responses:
+        results = sorted(response.get("results") or [], key = lambda r: r.get("score") or 0, reverse = True)
+        for rank, result in enumerate(results):
+            url = normalize_url(str(result.get("url", "")))
+            score, best = fused.get(url, (0.0, result))
+            if (result.get("score") or 0) > (best.get("score") or 0):
+                best = result
+            fused[url] = (score + 1 / (RRF_K + rank + 1), best)
+    ranked = [dict(result, score = round(score, 5)) for score, result in fused.values()]
+    kept, dropped = dedupe_results(ranked, session)
+    session.dropped += dropped + sum(len(r.get("results") or []) for r in responses) - len(ranked)
+    return kept[:max_sources]
+
+
+async def _traced_search(query: str) -> Dict[str, Any]:
+    with span("tool", "web_search", query = query[:200]):
+        return await cached_search(query)
+
+
+async def parallel_research(query: str) -> Tuple[str, List[Dict[str, Any]]]:
+    """Research `query` with concurrent searches; returns (answer, artifact refs)."""
+    queries = await expand_queries(query)
+    with search_session() as session:
+        responses = await asyncio.gather(*(_traced_search(q) for q in queries), return_exceptions = True)
+        failed = [q for q, r in zip(queries, responses) if isinstance(r, BaseException) or "error" in r]
+        responses = [r for r in responses if isinstance(r, dict) and "error" not in r]
+        sources = merge_results(responses, session)
+    print(f"web_search: {len(queries)} parallel sub-queries, {session.report()}, {len(sources)} sources kept")
+    if failed:
+        print(f"web_search: failed sub-queries: {failed}")
+
+    llm = get_llm("web_researcher", temperature = 0, model_kwargs = JSON_MODE)
+    reply = await llm.ainvoke([HumanMessage(content = summary_prompt(query, sources))])
+    try:
+        data = json.loads(reply.content)
+    except ValueError:
+        data = None
+    if not isinstance(data, dict):
+        return reply.content, []
+    answer = str(data.get("answer") or "")
+    artifacts = []
+    for table in data.get("tables") or []:
+        try:
+            artifacts.append(save_table(table["name"], table["columns"], table["rows"], source = "web_researcher",
+                                        description = table.get("description", "")))
+        except Exception as e:
+            print(f"Skipping table from research summary: {e}")
+    if artifacts:
+        answer += "\n\nSaved tables: " + ", ".join(f"{ref['name']} ({ref['artifact_id']})" for ref in artifacts)
+    return answer, artifacts
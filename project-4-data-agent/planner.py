@@ -2,17 +2,17 @@
 from prompts import plan_prompt
 from langgraph.types import Command 
 from langchain_core.messages import HumanMessage
-from langchain_openai import ChatOpenAI
 from agent_state import State
 from typing import Literal, Dict, Any
+from llm_registry import get_llm
 import json
 
-reasoning_llm = ChatOpenAI(model = "gpt-5.1", model_kwargs = {"response_format": {"type": "json_object"}})
+JSON_MODE = {"response_format": {"type": "json_object"}}
 
-def planner_node(state: State) -> Command[Literal['executor']]:
+async def planner_node(state: State) -> Command[Literal['executor']]:
     """Runs the planning LLM and stores the resulting plan in the state."""
     #1. Invoke LLM with the planner prompt
-    llm_reply = reasoning_llm.invoke([plan_prompt(state)])
+    llm_reply = await get_llm("planner", model_kwargs = JSON_MODE).ainvoke([plan_prompt(state)])
 
     try:
         content_str =llm_reply.content if isinstance(llm_reply.content, str) else str(llm_reply.content)
@@ -0,0 +1,275 @@
+# Cached, deduplicating web search for the web researcher.
+#
+#   cache    responses are stored in SQLite keyed by the normalized query, the search
+#            parameters and the freshness window, so a repeated or reworded search
+#            ("US bank market cap?" / "us bank  market cap") is answered without a
+#            request. The window sets the TTL: time_range=day and topic=news expire
+#            within the hour, undated searches after SEARCH_CACHE_TTL.
+#   dedupe   before results reach the model, URLs are normalized (scheme, www, trailing
+#            slash, tracking parameters, fragment) and content is fingerprinted, so
+#            mirrors and syndicated copies are dropped, within one response and across
+#            the searches of one web_researcher run. Snippets are capped in length and
+#            raw_content/images are left out.
+#
+#   SEARCH_BACKEND             tavily (default) | stub (offline, see stub_llm.StubSearchBackend)
+#   SEARCH_CACHE               sqlite (default) | memory | off
+#   SEARCH_CACHE_PATH          SQLite file (default .search_cache.sqlite)
+#   SEARCH_CACHE_TTL           seconds for undated searches (default 86400)
+#   SEARCH_MAX_RESULTS         results per search (default 5)
+#   SEARCH_MAX_CONTENT_CHARS   snippet length passed to the model (default 1200)
+import contextlib
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Literal, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from langchain_core.tools import tool
+
+SEARCH_MAX_RESULTS = int(os.getenv("SEARCH_MAX_RESULTS", "5"))
+SEARCH_MAX_CONTENT_CHARS = int(os.getenv("SEARCH_MAX_CONTENT_CHARS", "1200"))
+
+# TTL per freshness window: a search restricted to the last day goes stale much sooner
+# than an undated one.
+FRESHNESS_TTL = {"day": 3600, "week": 6 * 3600, "month": 86400, "year": 7 * 86400}
+NEWS_TTL = 3600
+
+_TRACKING_PARAMS = re.compile(r"^(utm_\w+|gclid|fbclid|mc_cid|mc_eid|ref|ref_src|cmpid)$", re.IGNORECASE)
+# Response fields that only cost prompt space.
+_DROPPED_FIELDS = ("raw_content", "images", "favicon", "response_time", "request_id", "follow_up_questions", "usage")
+
+
+def normalize_query(query: str) -> str:
+    text = unicodedata.normalize("NFKC", query).lower()
+    text = re.sub(r"[^\w$%.+-]+", " ", text)
+    return re.sub(r"\s+", " ", text).strip(" .")
+
+
+def freshness_ttl(time_range: Optional[str], topic: str, default_ttl: float) -> float:
+    ttl = FRESHNESS_TTL.get(time_range, default_ttl)
+    return min(ttl, NEWS_TTL) if topic == "news" else ttl
+
+
+def search_key(query: str, **params: Any) -> str:
+    payload = json.dumps({"query": normalize_query(query), **params}, sort_keys = True, separators = (",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def normalize_url(url: str) -> str:
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query) if not _TRACKING_PARAMS.match(k)))
+    return urlunsplit(("", host, parts.path.rstrip("/") or "/", query, ""))
+
+
+def content_fingerprint(text: str, chars: int = 400) -> Optional[str]:
+    """Hash of the start of the normalized text; catches copies with different tails.
+    None when there is no text to compare."""
+    words = re.sub(r"\W+", " ", str(text or "").lower()).strip()
+    if not words:
+        return None
+    return hashlib.sha1(words[:chars].encode("utf-8")).hexdigest()
+
+
+class SearchResultCache:
+    """SQLite-backed search response cache with a TTL per entry (":memory:" for in-process)."""
+
+    def __init__(self, path: str | Path = ".search_cache.sqlite", max_entries: int = 5000):
+        self.path = str(path)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents = True, exist_ok = True)
+        self._conn = sqlite3.connect(self.path, check_same_thread = False)
+        if self.path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS searches (
+                   key TEXT PRIMARY KEY,
+                   query TEXT NOT NULL,
+                   response TEXT NOT NULL,
+                   expires_at REAL NOT NULL
+               )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS searches_expires ON searches (expires_at)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT response, expires_at FROM searches WHERE key = ?", (key,)).fetchone()
+            if row is None or row[1] < time.time():
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, query: str, response: Dict[str, Any], ttl: float) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO searches (key, query, response, expires_at) VALUES (?, ?, ?, ?)",
+                (key, query, json.dumps(response, default = str), now + ttl),
+            )
+            self._conn.execute("DELETE FROM searches WHERE expires_at < ?", (now,))
+            self._conn.execute(
+                """DELETE FROM searches WHERE key IN (
+                       SELECT key FROM searches ORDER BY expires_at DESC LIMIT -1 OFFSET ?
+                   )""",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM searches")
+            self._conn.commit()
+
+
+@dataclass
+class SearchSession:
+    """What one web_researcher run has already shown the model."""
+    urls: set = field(default_factory = set)
+    fingerprints: set = field(default_factory = set)
+    searches: int = 0
+    cache_hits: int = 0
+    dropped: int = 0
+
+    def report(self) -> str:
+        return f"{self.searches} searches, {self.cache_hits} from cache, {self.dropped} duplicate results dropped"
+
+
+_session: ContextVar[Optional[SearchSession]] = ContextVar("search_session", default = None)
+
+
+@contextlib.contextmanager
+def search_session():
+    """Scope for cross-search deduplication; results shown once are not repeated inside it."""
+    session = SearchSession()
+    token = _session.set(session)
+    try:
+        yield session
+    finally:
+        _session.reset(token)
+
+
+def dedupe_results(results: List[Dict[str, Any]], session: Optional[SearchSession] = None,
+                   max_content_chars: int = SEARCH_MAX_CONTENT_CHARS) -> tuple[List[Dict[str, Any]], int]:
+    """Drop results whose URL or content was already seen (here or earlier in the session)
+    and trim what is left. Returns (kept, number dropped)."""
+    session = session or SearchSession()
+    kept, dropped = [], 0
+    for result in sorted(results, key = lambda r: r.get("score") or 0, reverse = True):
+        url = normalize_url(str(result.get("url", "")))
+        # Results without content are deduplicated by URL only.
+        fingerprint = content_fingerprint(result.get("content"))
+        if url in session.urls or (fingerprint is not None and fingerprint in session.fingerprints):
+            dropped += 1
+            continue
+        session.urls.add(url)
+        if fingerprint is not None:
+            session.fingerprints.add(fingerprint)
+        item = {k: v for k, v in result.items() if k not in _DROPPED_FIELDS}
+        content = re.sub(r"\s+", " ", str(item.get("content") or "")).strip()
+        if len(content) > max_content_chars:
+            content = content[: max_content_chars - 1].rstrip() + "…"
+        item["content"] = content
+        kept.append(item)
+    return kept, dropped
+
+
+class TavilyBackend:
+    """Tavily through langchain_tavily, imported on first use."""
+
+    def __init__(self, max_results: int = SEARCH_MAX_RESULTS):
+        from langchain_tavily import TavilySearch
+        self._tool = TavilySearch(max_results = max_results)
+        self.calls = 0
+
+    async def search(self, query: str, topic: str = "general", time_range: Optional[str] = None) -> Dict[str, Any]:
+        self.calls += 1
+        args = {"query": query, "topic": topic}
+        if time_range:
+            args["time_range"] = time_range
+        return await self._tool.ainvoke(args)
+
+
+@lru_cache(maxsize = None)
+def get_search_backend():
+    backend = os.getenv("SEARCH_BACKEND", "tavily").lower()
+    if backend == "tavily":
+        return TavilyBackend()
+    if backend == "stub":
+        from stub_llm import StubSearchBackend
+        return StubSearchBackend(latency = float(os.getenv("SEARCH_STUB_LATENCY", "0.5")))
+    raise ValueError(f"Unknown SEARCH_BACKEND: {backend!r} (expected tavily or stub)")
+
+
+@lru_cache(maxsize = None)
+def get_search_cache() -> Optional[SearchResultCache]:
+    backend = os.getenv("SEARCH_CACHE", "sqlite").lower()
+    if backend == "sqlite":
+        return SearchResultCache(os.getenv("SEARCH_CACHE_PATH", ".search_cache.sqlite"))
+    if backend == "memory":
+        return SearchResultCache(":memory:")
+    if backend in ("off", "none", "0"):
+        return None
+    raise ValueError(f"Unknown SEARCH_CACHE backend: {backend!r} (expected sqlite, memory or off)")
+
+
+async def cached_search(query: str, topic: str = "general", time_range: Optional[str] = None,
+                        backend = None, cache = None) -> Dict[str, Any]:
+    """Search through the cache; returns the backend's response shape (query, results, ...)."""
+    backend = backend or get_search_backend()
+    cache = cache if cache is not None else get_search_cache()
+    session = _session.get()
+    if session is not None:
+        session.searches += 1
+    key = search_key(query, topic = topic, time_range = time_range, max_results = SEARCH_MAX_RESULTS)
+    response = cache.get(key) if cache is not None else None
+    if response is not None:
+        if session is not None:
+            session.cache_hits += 1
+        return response
+    response = await backend.search(query, topic = topic, time_range = time_range)
+    if cache is not None and isinstance(response, dict) and response.get("results") and "error" not in response:
+        ttl = freshness_ttl(time_range, topic, float(os.getenv("SEARCH_CACHE_TTL", "86400")))
+        cache.put(key, normalize_query(query), response, ttl)
+    return response
+
+
+def compact_response(response: Dict[str, Any], session: Optional[SearchSession] = None) -> Dict[str, Any]:
+    """Deduplicated, trimmed response for the model."""
+    if "error" in response:
+        return {"error": str(response["error"])}
+    results, dropped = dedupe_results(response.get("results") or [], session)
+    compact = {"query": response.get("query"), "results": results}
+    if response.get("answer"):
+        compact["answer"] = response["answer"]
+    if dropped:
+        compact["note"] = f"{dropped} result(s) omitted as duplicates of results already returned."
+        if session is not None:
+            session.dropped += dropped
+    return compact
+
+
+@tool
+async def web_search(query: str, topic: Literal["general", "news", "finance"] = "general",
+                     time_range: Optional[Literal["day", "week", "month", "year"]] = None) -> Dict[str, Any]:
+    """Search the web. Returns the top results (title, url, content snippet, score).
+    Use topic="news" or time_range for recent events. Results already returned by an
+    earlier search in this task are not repeated."""
+    response = await cached_search(query, topic = topic, time_range = time_range)
+    return compact_response(response, _session.get())
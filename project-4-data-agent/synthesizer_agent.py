@@ -1,20 +1,29 @@
 from langchain.agents import create_agent
-from langchain_openai import ChatOpenAI
 from prompts import agent_system_prompt
 from agent_state import State
 from langgraph.constants import END
 from langgraph.types import Command
 from langchain_core.messages import HumanMessage
 from typing import Literal
+from llm_registry import get_llm
+from context_condenser import build_context
+import os
 
-llm = ChatOpenAI(model = "gpt-5.1", temperature = 0)
+# condensed (default): relevant messages condensed to a token budget (context_condenser.py);
+# full: every selected message verbatim, as before.
+SYNTH_CONTEXT = os.getenv("SYNTH_CONTEXT", "condensed")
 
-def synthesizer_node(state: State) -> Command[Literal[END]]:
-    relevant_msgs = [
-        m.content for m in state.get("messages", [])
-        if getattr(m, "name", None) in ("web_researcher", "chart_generator", "chart_summarizer")
 
-    ]
+async def synthesizer_node(state: State) -> Command[Literal["final_merge", END]]:
+    if SYNTH_CONTEXT == "full":
+        relevant_context = ' '.join(
+            m.content for m in state.get("messages", [])
+            if getattr(m, "name", None) in ("web_researcher", "chart_generator", "chart_summarizer")
+        )
+    else:
+        # The agents' answers only (the researcher already digests its search results),
+        # deduplicated and within SYNTH_CONTEXT_TOKENS.
+        relevant_context = build_context(state.get("messages", []), include_tools = False)
 
     user_question = state.get("user_query", state.get("messages", [{}])[0].content if state.get("messages") else "")
 
@@ -34,16 +43,23 @@ def synthesizer_node(state: State) -> Command[Literal[END]]:
         """)
 
     summary_prompt = [
-        HumanMessage(content = (f"User question: {user_question}"
-                                f"Relevant context: {' '.join(relevant_msgs)}"
+        HumanMessage(content = (f"User question: {user_question}\n\n"
+                                f"Relevant context:\n{relevant_context}\n\n"
                                 f"Synthesis instructions: {synthesis_instructions}"))
     ]
 
-    llm_reply = llm.invoke(summary_prompt)
+    llm_reply = await get_llm("synthesizer", temperature = 0).ainvoke(summary_prompt)
     answer = llm_reply.content.strip()
     print(f'Synthesizer answer: {answer}')
 
 
+    if state.get("final_stage"):
+        # Running next to chart_summarizer; final_merge writes the final answer.
+        return Command(update = {
+            "messages": [HumanMessage(content = answer, name = "synthesizer")],
+            "synthesis": answer,
+        }, goto = "final_merge")
+
     goto = END
     return Command(update = {
         "messages": [HumanMessage(content = answer, name = "synthesizer")],
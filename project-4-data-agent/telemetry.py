@@ -0,0 +1,376 @@
+# Instrumentation for the agent graphs: every run, graph node, LLM call and agent tool call
+# is recorded with its wall time. LLM calls add tokens in/out, HTTP retries and an
+# estimated cost; executor steps add replans (replan_attempts). Records go to
+#   - OpenTelemetry: spans (run > node > llm / tool) and metrics (duration histograms per
+#     kind, token, retry, cost and replan counters) through the opentelemetry API. They are
+#     exported when the application configures an SDK (e.g. `opentelemetry-instrument`);
+#     with the API's default no-op providers they cost next to nothing. Without
+#     opentelemetry-api installed only the trace file is written.
+#   - a JSON-lines trace file, one record per run / node / llm / tool call. Records are
+#     queued and appended by a background thread, so a node never waits on the disk; when
+#     a write would take the file past TELEMETRY_TRACE_MAX_BYTES it is first moved to
+#     <trace>.1 (replacing the previous one), so the trace keeps at most about twice that.
+#
+#   TELEMETRY                   on (default) | off
+#   TELEMETRY_TRACE_PATH        trace file (default .telemetry/trace.jsonl)
+#   TELEMETRY_TRACE_MAX_BYTES   size at which the trace file is rotated (default 20 MB, 0 = never)
+#   LLM_PRICES             JSON {"<model>": [usd per 1M input tokens, usd per 1M output tokens]},
+#                          merged over MODEL_PRICES for the cost estimate
+#
+#   python telemetry.py [--trace PATH] [--last N]   p50/p95 time per node across runs
+import argparse
+import atexit
+import contextlib
+import functools
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextvars import ContextVar
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+TELEMETRY_ENABLED = os.getenv("TELEMETRY", "on") != "off"
+TELEMETRY_TRACE_PATH = os.getenv("TELEMETRY_TRACE_PATH", ".telemetry/trace.jsonl")
+TELEMETRY_TRACE_MAX_BYTES = int(os.getenv("TELEMETRY_TRACE_MAX_BYTES", str(20 * 1024 * 1024)))
+
+# USD per 1M tokens (input, output).
+MODEL_PRICES = {
+    "gpt-5.1": (1.25, 10.0),
+    "gpt-5": (1.25, 10.0),
+    "gpt-5-mini": (0.25, 2.0),
+    "gpt-4.1": (2.0, 8.0),
+    "gpt-4o": (2.5, 10.0),
+    "gpt-4o-mini": (0.15, 0.6),
+}
+
+_run: ContextVar[Optional[Dict[str, str]]] = ContextVar("telemetry_run", default = None)
+_node: ContextVar[Optional[str]] = ContextVar("telemetry_node", default = None)
+_http_attempts: ContextVar[Optional[List[int]]] = ContextVar("telemetry_http_attempts", default = None)
+_write_lock = threading.Lock()
+_write_queue: "queue.Queue[str]" = queue.Queue()
+_writer: Optional[threading.Thread] = None
+
+
+@lru_cache(maxsize = None)
+def _prices() -> Dict[str, tuple]:
+    prices = dict(MODEL_PRICES)
+    prices.update({model: tuple(p) for model, p in json.loads(os.getenv("LLM_PRICES", "{}")).items()})
+    return prices
+
+
+def llm_cost(model: str, input_tokens: int, output_tokens: int) -> Optional[float]:
+    price = _prices().get(model)
+    if price is None:
+        return None
+    return (input_tokens * price[0] + output_tokens * price[1]) / 1_000_000
+
+
+class _Otel:
+    def __init__(self, trace, metrics):
+        self.trace = trace
+        self.tracer = trace.get_tracer("agent_graph")
+        meter = metrics.get_meter("agent_graph")
+        self.durations = {
+            kind: meter.create_histogram(f"agent_graph.{kind}.duration", unit = "s", description = f"Wall time per {kind}")
+            for kind in ("run", "node", "llm", "tool")
+        }
+        self.tokens = meter.create_counter("agent_graph.llm.tokens", unit = "{token}", description = "LLM tokens by direction")
+        self.retries = meter.create_counter("agent_graph.llm.retries", description = "HTTP retries inside LLM calls")
+        self.cost = meter.create_counter("agent_graph.llm.cost", unit = "USD", description = "Estimated LLM cost")
+        self.replans = meter.create_counter("agent_graph.replans", description = "Replans requested by the executor")
+
+
+@lru_cache(maxsize = None)
+def _otel() -> Optional[_Otel]:
+    if not TELEMETRY_ENABLED:
+        return None
+    try:
+        from opentelemetry import metrics, trace
+    except ImportError:
+        return None
+    return _Otel(trace, metrics)
+
+
+def _otel_value(value: Any) -> Any:
+    if isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (list, tuple)) and all(isinstance(v, str) for v in value):
+        return list(value)
+    return json.dumps(value, default = str)
+
+
+def _append(lines: List[str]) -> None:
+    path = Path(TELEMETRY_TRACE_PATH)
+    path.parent.mkdir(parents = True, exist_ok = True)
+    text = "".join(lines)
+    if TELEMETRY_TRACE_MAX_BYTES and path.exists() \
+            and path.stat().st_size + len(text.encode("utf-8")) > TELEMETRY_TRACE_MAX_BYTES:
+        os.replace(path, path.with_name(path.name + ".1"))
+    with path.open("a", encoding = "utf-8") as f:
+        f.write(text)
+
+
+def _drain() -> None:
+    while True:
+        lines = [_write_queue.get()]
+        while True:
+            try:
+                lines.append(_write_queue.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            _append(lines)
+        except OSError as e:
+            print(f"telemetry: could not write {TELEMETRY_TRACE_PATH}: {e}")
+        for _ in lines:
+            _write_queue.task_done()
+
+
+def _write(record: Dict[str, Any]) -> None:
+    global _writer
+    _write_queue.put(json.dumps(record, default = str) + "\n")
+    if _writer is None:
+        with _write_lock:
+            if _writer is None:
+                _writer = threading.Thread(target = _drain, name = "telemetry-writer", daemon = True)
+                _writer.start()
+                atexit.register(flush)
+
+
+def flush() -> None:
+    """Wait until every queued record is in the trace file."""
+    if _writer is not None:
+        _write_queue.join()
+
+
+def _record(kind: str, name: str, start: float, duration: float, status: str, attrs: Dict[str, Any]) -> None:
+    run = _run.get() or {}
+    record = {"kind": kind, "name": name, "start": round(start, 6), "duration_s": round(duration, 6), "status": status,
+              "run_id": run.get("run_id"), "thread_id": run.get("thread_id")}
+    if kind in ("llm", "tool"):
+        record["node"] = _node.get()
+    record.update(attrs)
+    _write(record)
+
+    otel = _otel()
+    if otel is None:
+        return
+    labels = {"name": name, "status": status}
+    if record.get("node"):
+        labels["node"] = record["node"]
+    otel.durations[kind].record(duration, labels)
+    if kind == "llm":
+        otel.tokens.add(attrs.get("input_tokens") or 0, {**labels, "direction": "input"})
+        otel.tokens.add(attrs.get("output_tokens") or 0, {**labels, "direction": "output"})
+        if attrs.get("retries"):
+            otel.retries.add(attrs["retries"], labels)
+        if attrs.get("cost_usd"):
+            otel.cost.add(attrs["cost_usd"], labels)
+    if attrs.get("replan"):
+        otel.replans.add(1, labels)
+
+
+@contextlib.contextmanager
+def span(kind: str, name: str, **attributes: Any):
+    """Time the block as one `kind` record ("run", "node", "llm" or "tool"). Yields the
+    attribute dict, so the block can add to it (tokens, goto, ...)."""
+    attrs = dict(attributes)
+    if not TELEMETRY_ENABLED:
+        yield attrs
+        return
+    otel = _otel()
+    start, started = time.time(), time.perf_counter()
+    status = "ok"
+    with (otel.tracer.start_as_current_span(f"{kind} {name}") if otel else contextlib.nullcontext()) as otel_span:
+        try:
+            yield attrs
+        except BaseException as e:
+            status = "error"
+            attrs["error"] = f"{type(e).__name__}: {e}"[:300]
+            raise
+        finally:
+            duration = time.perf_counter() - started
+            if otel_span is not None:
+                otel_span.set_attributes({f"agent_graph.{k}": _otel_value(v) for k, v in attrs.items() if v is not None})
+            _record(kind, name, start, duration, status, attrs)
+
+
+@contextlib.contextmanager
+def run_span(thread_id: Optional[str] = None, **attributes: Any):
+    """One graph run; node, LLM and tool records inside it carry its run and thread id."""
+    token = _run.set({"run_id": uuid.uuid4().hex, "thread_id": thread_id})
+    try:
+        with span("run", "graph", **attributes) as attrs:
+            yield attrs
+    finally:
+        _run.reset(token)
+
+
+def _describe_command(result: Any, attrs: Dict[str, Any]) -> None:
+    goto = getattr(result, "goto", None)
+    if goto:
+        targets = goto if isinstance(goto, (list, tuple)) else [goto]
+        attrs["goto"] = [getattr(t, "node", t) for t in targets]
+    update = getattr(result, "update", None)
+    if isinstance(update, dict):
+        if update.get("replan_flag") and "planner" in attrs.get("goto", []):
+            attrs["replan"] = True
+        if update.get("replan_attempts"):
+            attrs["replan_attempts"] = {str(step): n for step, n in update["replan_attempts"].items()}
+
+
+def instrument_node(name: str, node):
+    """Wrap an async graph node so each execution is recorded. functools.wraps keeps the
+    signature and the Command[Literal[...]] annotation LangGraph reads the edges from."""
+
+    @functools.wraps(node)
+    async def instrumented(state, *args, **kwargs):
+        with span("node", name) as attrs:
+            token = _node.set(name)
+            try:
+                result = await node(state, *args, **kwargs)
+            finally:
+                _node.reset(token)
+            _describe_command(result, attrs)
+            return result
+
+    return instrumented
+
+
+def record_llm_call(llm_node: str, model: str, started: float, latency: float, queue_wait: float,
+                    input_tokens: int, output_tokens: int, retries: Optional[int], failed: bool) -> None:
+    """Record a finished LLM call (called by llm_registry with its own timings)."""
+    if not TELEMETRY_ENABLED:
+        return
+    attrs = {"model": model, "queue_wait_s": round(queue_wait, 6), "input_tokens": input_tokens,
+             "output_tokens": output_tokens, "retries": retries,
+             "cost_usd": llm_cost(model, input_tokens or 0, output_tokens or 0)}
+    status = "error" if failed else "ok"
+    otel = _otel()
+    if otel is not None:
+        end_ns = time.time_ns()
+        otel_span = otel.tracer.start_span(f"llm {llm_node}", start_time = end_ns - int((latency + queue_wait) * 1e9))
+        otel_span.set_attributes({f"agent_graph.{k}": _otel_value(v) for k, v in attrs.items() if v is not None})
+        if failed:
+            otel_span.set_status(otel.trace.Status(otel.trace.StatusCode.ERROR))
+        otel_span.end(end_time = end_ns)
+    _record("llm", llm_node, started, latency + queue_wait, status, attrs)
+
+
+@contextlib.contextmanager
+def count_http_attempts():
+    """Count the HTTP requests made inside the block (retries = attempts - 1)."""
+    attempts = [0]
+    token = _http_attempts.set(attempts)
+    try:
+        yield attempts
+    finally:
+        _http_attempts.reset(token)
+
+
+def http_attempt() -> None:
+    attempts = _http_attempts.get()
+    if attempts is not None:
+        attempts[0] += 1
+
+
+@lru_cache(maxsize = None)
+def get_tool_middleware():
+    """create_agent middleware that records every tool call (name, wall time, error status).
+    Built on first use, since it imports langchain.agents."""
+    from langchain.agents.middleware.types import wrap_tool_call
+
+    @wrap_tool_call
+    async def trace_tool_calls(request, handler):
+        with span("tool", request.tool_call["name"]) as attrs:
+            result = await handler(request)
+            if getattr(result, "status", None) == "error":
+                attrs["tool_error"] = True
+            return result
+
+    return trace_tool_calls
+
+
+# --- report ---------------------------------------------------------------------------
+
+def load_trace(path: str = TELEMETRY_TRACE_PATH, last_runs: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Records of the trace file, preceded by those of its rotated predecessor if any."""
+    flush()
+    records = []
+    rotated = f"{path}.1"
+    names = [name for name in (rotated, path) if os.path.exists(name)] or [path]
+    for name in names:
+        with open(name, encoding = "utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        continue
+    if last_runs:
+        run_ids = []
+        for record in records:
+            if record.get("run_id") and record["run_id"] not in run_ids:
+                run_ids.append(record["run_id"])
+        keep = set(run_ids[-last_runs:])
+        records = [r for r in records if r.get("run_id") in keep]
+    return records
+
+
+def percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    if not values:
+        return 0.0
+    position = (len(values) - 1) * q
+    low = int(position)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (position - low)
+
+
+def summarize(records: List[Dict[str, Any]]) -> str:
+    groups: Dict[tuple, List[Dict[str, Any]]] = defaultdict(list)
+    for record in records:
+        groups[(record.get("kind"), record.get("name"))].append(record)
+
+    lines = []
+    runs = groups.get(("run", "graph"), [])
+    if runs:
+        durations = [r["duration_s"] for r in runs]
+        lines.append(f"Runs: {len(runs)}  p50 {percentile(durations, 0.5):.2f}s  p95 {percentile(durations, 0.95):.2f}s  "
+                     f"errors {sum(r.get('status') == 'error' for r in runs)}")
+        lines.append("")
+
+    def table(kind: str, title: str, extra) -> None:
+        names = sorted((name for k, name in groups if k == kind),
+                       key = lambda n: -sum(r["duration_s"] for r in groups[(kind, n)]))
+        if not names:
+            return
+        lines.append((f"{title:<22} {'calls':>6} {'p50 s':>8} {'p95 s':>8} {'max s':>8} {'total s':>9} {'errors':>7} " + extra(None)).rstrip())
+        for name in names:
+            rows = groups[(kind, name)]
+            durations = [r["duration_s"] for r in rows]
+            lines.append((f"{name:<22} {len(rows):>6} {percentile(durations, 0.5):>8.2f} {percentile(durations, 0.95):>8.2f} "
+                          f"{max(durations):>8.2f} {sum(durations):>9.2f} {sum(r.get('status') == 'error' for r in rows):>7} " + extra(rows)).rstrip())
+        lines.append("")
+
+    table("node", "node", lambda rows: f"{'replans':>8}" if rows is None else f"{sum(bool(r.get('replan')) for r in rows):>8}")
+    table("llm", "llm (by model node)", lambda rows: (
+        f"{'tokens in':>10} {'tokens out':>11} {'retries':>8} {'cost $':>9}" if rows is None else
+        f"{sum(r.get('input_tokens') or 0 for r in rows):>10,} {sum(r.get('output_tokens') or 0 for r in rows):>11,} "
+        f"{sum(r.get('retries') or 0 for r in rows):>8} {sum(r.get('cost_usd') or 0 for r in rows):>9.4f}"))
+    table("tool", "tool", lambda rows: "")
+    return "\n".join(lines).rstrip()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "p50/p95 time per graph node, LLM node and tool from a telemetry trace")
+    parser.add_argument("--trace", default = TELEMETRY_TRACE_PATH, help = f"JSON-lines trace (default {TELEMETRY_TRACE_PATH})")
+    parser.add_argument("--last", type = int, metavar = "N", help = "Only the last N runs")
+    args = parser.parse_args()
+    print(summarize(load_trace(args.trace, args.last)))
@@ -1,32 +1,51 @@
 from langchain.agents import create_agent
 from typing import Literal
-from langchain_tavily import TavilySearch
-from langchain_openai import ChatOpenAI
+from functools import lru_cache
+from llm_registry import get_llm
 from langgraph.types import Command
 from langchain_core.messages import HumanMessage
 from agent_state import State
 from prompts import agent_system_prompt
-tavily_tool = TavilySearch(max_results = 5)
+from helper import make_save_table_tool
+from artifact_store import collect_artifacts
+from search_cache import search_session, web_search
+import parallel_research
+from telemetry import get_tool_middleware
 
-llm = ChatOpenAI(model = "gpt-5.1", temperature = 0)
+@lru_cache(maxsize = None)
+def get_web_search_agent():
+    llm = get_llm("web_researcher", temperature = 0)
 
+    return create_agent(
+        llm,
+        tools = [web_search, make_save_table_tool("web_researcher")],
+        middleware = [get_tool_middleware()],
+        system_prompt = agent_system_prompt(f"""
+            You are the Researcher. You can ONLY perform research 
+            by using the provided search tool (web_search). 
+            Do not repeat a search you have already made. 
+            When you find figures that could be charted, save them with 
+            save_table_tool (one call per table, numeric values as numbers). 
+            When you have found the necessary information, end your output.  
+            Do NOT attempt to take further actions.
+        """),
+    )
 
-web_search_agent = create_agent(
-    llm,
-    tools = [tavily_tool],
-    system_prompt = agent_system_prompt(f"""
-        You are the Researcher. You can ONLY perform research 
-        by using the provided search tool (tavily_tool). 
-        When you have found the necessary information, end your output.  
-        Do NOT attempt to take further actions.
-    """),
-)
-
-def web_researcher_node(state: State) -> Command[Literal["executor"]]:
+async def web_researcher_node(state: State) -> Command[Literal["executor"]]:
     agent_query = state.get("agent_query")
-    result = web_search_agent.invoke({"messages": agent_query})
+    if parallel_research.RESEARCH_MODE == "parallel":
+        answer, artifacts = await parallel_research.parallel_research(agent_query)
+        return Command(update={
+            "messages": [HumanMessage(content = answer, name = "web_researcher")],
+            "artifacts": (state.get("artifacts") or []) + artifacts,
+        }, goto = "executor")
+    with search_session() as session:
+        result = await get_web_search_agent().ainvoke({"messages": agent_query})
+    if session.searches:
+        print(f"web_search: {session.report()}")
     goto = "executor"
     result["messages"][-1] = HumanMessage(content = result["messages"][-1].content, name="web_researcher")
     return Command(update={
         "messages": result["messages"],
+        "artifacts": (state.get("artifacts") or []) + collect_artifacts(result["messages"]),
     }, goto = goto)
\ No newline at end of file